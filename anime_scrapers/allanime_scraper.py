@@ -7,6 +7,16 @@ import time
 import base64
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import httpx
+from scraper_utils.http_transport import get_transport
+from scraper_utils.pagination import page_result
+from scraper_utils.request_flow import Blocking, Cached, Request, REQUEST_ERRORS, TIMEOUT_ERRORS, run_async, run_sync
+from scraper_utils.ttl_cache import TTLCache
+from scraper_utils.expiry import streams_ttl
+from scraper_utils.stream_selection import quality_matches, select_streams
+from scraper_utils.hoster_health import HosterHealth, MAX_FANOUT
+from scraper_utils.mirrors import MirrorSelector, mirror_list, status_probe
 
 # --- Data Transfer Objects (Simulated using Dicts) ---
 # These match the structure implied by the Kotlin DTOs and JSON responses
@@ -20,6 +30,50 @@ VideoLink = Dict[str, Any]
 Track = Dict[str, str]
 FilterSearchParams = Dict[str, Any]
 
+# {site_url}/getVersion (which holds the episodeIframeHead) rarely changes, so it
+# is shared by every extractor thread and refreshed in the background
+VERSION_TTL = 60 * 60
+version_cache = TTLCache("allanime-version", ttl=VERSION_TTL, stale_ttl=24 * 3600, max_entries=8)
+
+# Stream resolution is cached at two levels: the decoded sourceUrls of an
+# episode, keyed by (showId, translationType, episodeString), and the videos
+# each hoster extractor returned, keyed by (server name, embed url). Both are
+# capped by the earliest expiry found in their urls, and empty results are
+# never cached so a failing hoster is retried on the next request.
+SOURCE_URLS_TTL = 30 * 60
+EXTRACTION_TTL = 20 * 60
+source_urls_cache = TTLCache("allanime-source-urls", ttl=SOURCE_URLS_TTL, max_entries=2048)
+extraction_cache = TTLCache("allanime-extractions", ttl=EXTRACTION_TTL, max_entries=4096)
+
+# Latency and success rate of every hoster, used to order the servers,
+# size the extraction fan-out and skip hosters that keep failing
+hoster_health = HosterHealth("allanime")
+
+# Equivalent API and site domains (comma separated in ALLANIME_API_MIRRORS /
+# ALLANIME_SITE_MIRRORS, the first one preferred). Requests go to the fastest
+# healthy mirror, measured from real responses and periodic probes. Any answer
+# below 500 means the API is up; the site has to serve getVersion.
+api_mirrors = MirrorSelector("allanime-api", mirror_list("ALLANIME_API_MIRRORS", ["https://api.allanime.day"]),
+                             probe=status_probe("/api"))
+site_mirrors = MirrorSelector("allanime-site", mirror_list("ALLANIME_SITE_MIRRORS", ["https://allanime.to", "https://allanime.day"]),
+                              probe=status_probe("/getVersion", max_status=299))
+
+
+def _observe_mirror(response: requests.Response, *args, **kwargs) -> None:
+    """requests response hook feeding API and site latencies to the mirror selectors."""
+    for selector in (api_mirrors, site_mirrors):
+        selector.observe(response.url, response.elapsed.total_seconds(), response.status_code < 500)
+
+
+def _source_urls_ttl(source_urls: List[Dict[str, Any]]) -> float:
+    if not source_urls:
+        return 0
+    return streams_ttl([{"url": source.get("sourceUrl", "")} for source in source_urls], SOURCE_URLS_TTL)
+
+
+def _extraction_ttl(videos: List[Any]) -> float:
+    return streams_ttl(videos, EXTRACTION_TTL) if videos else 0
+
 # --- Placeholder Extractors ---
 # (Keep placeholders as full implementation is complex and separate)
 class BaseExtractor:
@@ -28,11 +82,15 @@ class BaseExtractor:
         self.headers = headers if headers else {}
 
 class AllAnimeExtractor(BaseExtractor):
-    def __init__(self, session: requests.Session, headers: Dict[str, str], site_url: str):
+    def __init__(self, session: requests.Session, headers: Dict[str, str], site_mirrors: MirrorSelector):
         super().__init__(session, headers)
-        self.site_url = site_url
+        self.site_mirrors = site_mirrors
         self.json = json
 
+    @property
+    def site_url(self) -> str:
+        return self.site_mirrors.current()
+
     def bytes_into_human_readable(self, bytes_val: int) -> str:
         """Convert bytes to human readable format like Kotlin implementation"""
         kilobyte = 1000
@@ -53,6 +111,25 @@ class AllAnimeExtractor(BaseExtractor):
         else:
             return f"{bytes_val} bits/s"
 
+    def _fetch_version(self) -> Dict[str, Any]:
+        """Fetch {site_url}/getVersion. Raises if it has no episodeIframeHead."""
+        endpoint_response = self.session.get(f"{self.site_url}/getVersion", timeout=15)
+        endpoint_response.raise_for_status()
+        endpoint_data = endpoint_response.json()
+        if not endpoint_data.get('episodeIframeHead'):
+            raise ValueError(f"No episodeIframeHead found in version response: {endpoint_response.text[:200]}")
+        return endpoint_data
+
+    def episode_iframe_head(self) -> Optional[str]:
+        """The episodeIframeHead from getVersion, cached process-wide (see version_cache)."""
+        try:
+            return version_cache.get_or_load(self.site_url, self._fetch_version).get('episodeIframeHead')
+        except Exception as e:
+            print(f"❌ Failed to get version endpoint: {e}")
+            with open("error.txt", "a") as f:
+                f.write(f"\nFailed to get version endpoint: {e}")
+            return None
+
     def videoFromUrl(self, url: str, name: str) -> List[Dict[str, Any]]:
         """Implementation based on AllAnimeExtractor.kt"""
         print(f"📌 AllAnimeExtractor.videoFromUrl: {url}, Name: {name}")
@@ -60,22 +137,8 @@ class AllAnimeExtractor(BaseExtractor):
         
         try:
             # Get the endpoint from getVersion
-            endpoint_response = self.session.get(f"{self.site_url}/getVersion")
-            if endpoint_response.status_code != 200:
-                print(f"❌ Failed to get version endpoint: {endpoint_response.status_code}")
-                with open("error.txt", "a") as f:
-                    f.write(f"\nFailed to get version endpoint: {endpoint_response.status_code}")
-                    f.write(f"\nResponse: {endpoint_response.text}")
-                return []
-                
-            endpoint_data = endpoint_response.json()
-            episode_iframe_head = endpoint_data.get('episodeIframeHead')
-            
+            episode_iframe_head = self.episode_iframe_head()
             if not episode_iframe_head:
-                print("❌ No episodeIframeHead found in version response")
-                with open("error.txt", "a") as f:
-                    f.write("\nNo episodeIframeHead found in version response")
-                    f.write(f"\nResponse: {endpoint_response.text}")
                 return []
             
             # Replace /clock? with /clock.json? as in Kotlin code
@@ -651,14 +714,28 @@ class AllAnimeScraper:
     SEARCH_QUERY = "query ($search: SearchInput, $limit: Int, $page: Int, $translationType: VaildTranslationTypeEnumType, $countryOrigin: VaildCountryOriginEnumType) { shows(search: $search, limit: $limit, page: $page, translationType: $translationType, countryOrigin: $countryOrigin) { edges { _id name englishName nativeName thumbnail slugTime type season score availableEpisodesDetail } } }"
 # Note: Added more fields to SEARCH_QUERY based on parseAnime usage
 
-    DETAILS_QUERY = """query ($_id: String!) { show(_id: $_id) { _id name englishName nativeName thumbnail description genres studios season status score type availableEpisodesDetail } }"""
+    # Same as SEARCH_QUERY plus the total result count, for page-aware listings
+    SEARCH_PAGE_QUERY = SEARCH_QUERY.replace("{ edges {", "{ pageInfo { total } edges {", 1)
+
+    POPULAR_QUERY = "query ($type: RecommendationQueryType, $size: Int, $dateRange: Int, $page: Int) { queryPopular(type: $type, size: $size, dateRange: $dateRange, page: $page) { total recommendations { anyCard { _id name englishName nativeName thumbnail slugTime type } } } }"
+
+    DETAILS_FIELDS = "_id name englishName nativeName thumbnail description genres studios season status score type availableEpisodesDetail"
+    DETAILS_QUERY = "query ($_id: String!) { show(_id: $_id) { " + DETAILS_FIELDS + " } }"
 # Note: Added more fields to DETAILS_QUERY based on animeDetailsParse usage
 
+    # Most shows looked up in one aliased details query
+    DETAILS_BATCH_SIZE = 20
+
     EPISODES_QUERY = "query ($_id: String!) { show(_id: $_id) { _id availableEpisodesDetail } }"
 
     STREAMS_QUERY = "query ($showId: String!, $translationType: VaildTranslationTypeEnumType!, $episodeString: String!) { episode(showId: $showId, translationType: $translationType, episodeString: $episodeString) { sourceUrls } }"
 # Note: Simplified STREAMS_QUERY based on Kotlin usage (sourceUrls is the primary need)
 
+    # Episode urls are compact "showId:translationType:episodeString" tokens,
+    # expanded into a STREAMS_QUERY request by _episode_request
+    EPISODE_TOKEN_SEP = ":"
+    TRANSLATION_TYPES = ("sub", "dub", "raw")
+
     # Hoster Names (from Kotlin companion object)
     INTERAL_HOSTER_NAMES = [
         "Default", "Ac", "Ak", "Kir", "Rab", "Luf-mp4",
@@ -668,13 +745,15 @@ class AllAnimeScraper:
         "player", "vidstreaming", "okru", "mp4upload",
         "streamlare", "doodstream", "filemoon", "streamwish",
     ]
+    # Alt hosters _extract_server has a working extractor for (the others'
+    # extractors are disabled, as are player embeds)
+    EXTRACTED_ALT_HOSTERS = ("okru", "mp4upload")
 
     # --- Initialization ---
     def __init__(self):
         # Preferences (Mimicking Kotlin SharedPreferences)
         self.preferences = {
-            "preferred_domain": "https://api.allanime.day",
-            "preferred_site_domain": "https://allanime.to",
+            # Base urls are picked per request from api_mirrors / site_mirrors
             "preferred_sub": "sub",
             "preferred_title_style": "romaji",
             "preferred_quality": "1080",
@@ -683,22 +762,21 @@ class AllAnimeScraper:
             "alt_hoster_selection": {"player", "vidstreaming", "okru", "mp4upload", "streamlare", "doodstream", "filemoon", "streamwish"}
         }
 
-        self.base_url = self.preferences["preferred_domain"]
-        self.site_url = self.preferences["preferred_site_domain"]
         self.session = requests.Session()
+        self.session.hooks['response'].append(_observe_mirror)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
             'Accept': '*/*',
             # 'Content-Type': 'application/json', # Let requests handle this based on json=
-            'Origin': self.site_url,
-            'Referer': f"{self.site_url}/", # Referer should be site_url
+            'Origin': site_mirrors.preferred,
+            'Referer': f"{site_mirrors.preferred}/", # Referer should be site_url (see _post_headers)
         }
         
         # Define quality options (similar to Hanime)
         self.quality_list = ["1080p", "720p", "480p", "360p", "240p"]
 
         # Initialize extractors
-        self.all_anime_extractor = AllAnimeExtractor(self.session, self.headers, self.site_url)
+        self.all_anime_extractor = AllAnimeExtractor(self.session, self.headers, site_mirrors)
         self.gogo_stream_extractor = GogoStreamExtractor(self.session)
         self.dood_extractor = DoodExtractor(self.session)
         self.okru_extractor = OkruExtractor(self.session)
@@ -708,29 +786,71 @@ class AllAnimeScraper:
         self.streamwish_extractor = StreamWishExtractor(self.session, self.headers)
         self.playlist_utils = PlaylistUtils(self.session, self.headers)
 
+    @property
+    def base_url(self) -> str:
+        """API base url of the mirror currently in use."""
+        return api_mirrors.current()
+
+    @property
+    def site_url(self) -> str:
+        """Site base url of the mirror currently in use."""
+        return site_mirrors.current()
+
     # --- Private Helper Methods ---
 
     def _get_preference(self, key: str) -> Any:
         """Helper to get preference value."""
         return self.preferences.get(key)
 
-    def _build_post_request(self, data_object: Dict[str, Any]) -> requests.PreparedRequest:
-        """Builds a POST request with JSON payload, matching Kotlin's buildPost."""
-        # payload = json.dumps(data_object) # Use requests' json parameter instead
+    def _post_headers(self) -> Dict[str, str]:
+        """Headers for API POST requests."""
         post_headers = self.headers.copy()
         # post_headers['Content-Length'] = str(len(payload)) # requests calculates this
         # post_headers['Content-Type'] = 'application/json; charset=utf-8' # requests sets this with json=
-        post_headers['Host'] = urllib.parse.urlparse(self.base_url).netloc # Add Host header
+        # No Host header: the client derives it from the url, which may be an
+        # alternate API mirror when a request is hedged
+        post_headers['Origin'] = self.site_url
+        post_headers['Referer'] = f"{self.site_url}/"
+        return post_headers
 
+    def _build_post_request(self, data_object: Dict[str, Any]) -> requests.PreparedRequest:
+        """Builds a POST request with JSON payload, matching Kotlin's buildPost."""
+        # payload = json.dumps(data_object) # Use requests' json parameter instead
         # Use requests' json parameter for automatic serialization and Content-Type
         req = requests.Request(
             'POST',
             f"{self.base_url}/api",
-            headers=post_headers,
+            headers=self._post_headers(),
             json=data_object # Use json parameter here
         )
         return self.session.prepare_request(req)
 
+    def _api_request(self, data_object: Dict[str, Any], timeout: float = 20) -> Request:
+        """A flow's POST of a GraphQL document. The API mirror is picked when it is sent."""
+        return Request('POST', "/api", json=data_object, timeout=timeout)
+
+    def _send(self, request: Request) -> requests.Response:
+        """Send a flow's API request with the blocking session."""
+        return self.session.request(request.method, f"{self.base_url}{request.url}", headers=self._post_headers(),
+                                    **request.kwargs)
+
+    async def _async_send(self, request: Request) -> httpx.Response:
+        """Send a flow's API request through the shared transport.
+
+        A hedged request goes to the next fastest API mirror. With a single
+        API mirror (the default) there is no alternate, and the hedge repeats
+        the request on the same URL like on any other hedged host.
+        """
+        response = await get_transport().request(
+            request.method,
+            f"{self.base_url}{request.url}",
+            headers=self._post_headers(),
+            mirrors=[f"{mirror}{request.url}" for mirror in api_mirrors.alternates()],
+            **request.kwargs
+        )
+        api_mirrors.observe(str(response.url), response.elapsed.total_seconds(), response.status_code < 500)
+        return response
+
     def _parse_anime(self, response_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Parses anime list from search or latest updates response (like Kotlin's parseAnime)."""
         anime_list = []
@@ -926,7 +1046,7 @@ class AllAnimeScraper:
                     "dateRange": 7,
                     "page": page
                 },
-                "query": "query ($type: RecommendationQueryType, $size: Int, $dateRange: Int, $page: Int) { queryPopular(type: $type, size: $size, dateRange: $dateRange, page: $page) { recommendations { anyCard { _id name englishName nativeName thumbnail slugTime type } } } }"
+                "query": self.POPULAR_QUERY
             }
             
             request = self._build_post_request(data)
@@ -941,33 +1061,7 @@ class AllAnimeScraper:
             response.raise_for_status()
             
             response_data = response.json()
-            
-            # Process recommendations format
-            recommendations = response_data.get('data', {}).get('queryPopular', {}).get('recommendations', [])
-            
-            for rec in recommendations:
-                card = rec.get('anyCard')
-                if not card or '_id' not in card:
-                    continue
-                    
-                title = card.get('name', 'Unknown Title')
-                if self._get_preference("preferred_title_style") == "eng":
-                    title = card.get('englishName') or title
-                elif self._get_preference("preferred_title_style") == "native":
-                    title = card.get('nativeName') or title
-                    
-                thumbnail_url = card.get('thumbnail')
-                url = f"{card.get('_id')}<&sep>{card.get('slugTime', '')}<&sep>{self._slugify(card.get('name', ''))}"
-                anime_id = url  # This is the ID that will be used by get_anime_details
-                
-                results.append({
-                    'title': f"{title} [AllAnime]",
-                    'url': url,
-                    'id': anime_id,  # Add the ID explicitly to ensure it's available for details
-                    'poster': thumbnail_url,
-                    'source': 'allanime',
-                    'type': card.get('type')
-                })
+            results = self._parse_popular(response_data)
                 
             print(f"✅ Found {len(results)} popular anime from AllAnime")
             return results
@@ -988,6 +1082,110 @@ class AllAnimeScraper:
             
         return results
     
+    def _parse_popular(self, response_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Parses the recommendations format of the popular query."""
+        results = []
+        recommendations = response_data.get('data', {}).get('queryPopular', {}).get('recommendations', [])
+        
+        for rec in recommendations:
+            card = rec.get('anyCard')
+            if not card or '_id' not in card:
+                continue
+                
+            title = card.get('name', 'Unknown Title')
+            if self._get_preference("preferred_title_style") == "eng":
+                title = card.get('englishName') or title
+            elif self._get_preference("preferred_title_style") == "native":
+                title = card.get('nativeName') or title
+                
+            thumbnail_url = card.get('thumbnail')
+            url = f"{card.get('_id')}<&sep>{card.get('slugTime', '')}<&sep>{self._slugify(card.get('name', ''))}"
+            anime_id = url  # This is the ID that will be used by get_anime_details
+            
+            results.append({
+                'title': f"{title} [AllAnime]",
+                'url': url,
+                'id': anime_id,  # Add the ID explicitly to ensure it's available for details
+                'poster': thumbnail_url,
+                'source': 'allanime',
+                'type': card.get('type')
+            })
+        return results
+
+    def _post_page_query(self, data: Dict[str, Any], label: str) -> Optional[Dict[str, Any]]:
+        """Send a listing query and return the JSON response, or None on failure."""
+        try:
+            request = self._build_post_request(data)
+            response = self.session.send(request, timeout=20)
+            
+            if response.status_code == 400:
+                print(f"❌ AllAnime {label} request failed (400 Bad Request). Payload: {json.dumps(data)}")
+                print(f"Response Text: {response.text[:500]}")
+                return None
+            
+            response.raise_for_status()
+            return response.json()
+            
+        except requests.exceptions.Timeout:
+            print(f"❌ AllAnime {label} request timed out.")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ AllAnime {label} request failed: {e}")
+        except json.JSONDecodeError:
+            print(f"❌ Failed to parse JSON response from AllAnime {label} request.")
+        return None
+
+    def get_popular_anime_page(self, page=1, limit=20) -> Dict[str, Any]:
+        """Get one page of popular anime, requesting exactly `limit` cards."""
+        print(f"💫 Getting popular anime from AllAnime (page {page}, limit {limit})...")
+        data = {
+            "variables": {
+                "type": "anime",
+                "size": limit,
+                "dateRange": 7,
+                "page": page
+            },
+            "query": self.POPULAR_QUERY
+        }
+        response_data = self._post_page_query(data, "popular anime")
+        if response_data is None:
+            return page_result([], page, limit, has_next_page=False)
+        
+        results = self._parse_popular(response_data)
+        total = response_data.get('data', {}).get('queryPopular', {}).get('total')
+        return page_result(results, page, limit, total_results=total,
+                           has_next_page=page * limit < total if total is not None else None)
+
+    def _shows_page(self, variables: Dict[str, Any], page: int, limit: int, label: str) -> Dict[str, Any]:
+        """Run the shows query for one page and attach the total from pageInfo."""
+        variables = {**variables, "limit": limit, "page": page}
+        response_data = self._post_page_query({"variables": variables, "query": self.SEARCH_PAGE_QUERY}, label)
+        if response_data is None:
+            return page_result([], page, limit, has_next_page=False)
+        
+        results = self._parse_anime(response_data)
+        total = (response_data.get('data', {}).get('shows', {}).get('pageInfo') or {}).get('total')
+        return page_result(results, page, limit, total_results=total,
+                           has_next_page=page * limit < total if total is not None else None)
+
+    def get_latest_anime_page(self, page=1, limit=20) -> Dict[str, Any]:
+        """Get one page of latest updated anime."""
+        print(f"🆕 Getting latest anime from AllAnime (page {page}, limit {limit})...")
+        variables = {
+            "search": {
+                "allowAdult": False,
+                "allowUnknown": False,
+                "sortBy": "update"  # Sort by latest updates
+            },
+            "translationType": self._get_preference("preferred_sub"),
+            "countryOrigin": "ALL"
+        }
+        return self._shows_page(variables, page, limit, "latest anime")
+
+    def search_anime_page(self, query: str, page=1, limit=20) -> Dict[str, Any]:
+        """Search for anime, requesting exactly (page, limit) from the API."""
+        print(f"🔍 Searching for '{query}' on AllAnime (page {page}, limit {limit})...")
+        return self._shows_page(self._search_variables(query, page), page, limit, "search")
+
     def get_latest_anime(self, page=1, max_pages=5) -> List[Dict[str, Any]]:
         """Get latest anime from AllAnime."""
         print(f"🆕 Getting latest anime from AllAnime...")
@@ -1043,36 +1241,15 @@ class AllAnimeScraper:
             
         return results
 
-    def search_anime(self, query: str, filters: Optional[FilterSearchParams] = None, page=1, max_pages=5) -> List[Dict[str, Any]]:
-        """Search for anime on AllAnime by title or filters."""
+    def _search_flow(self, query: str, page: int, max_pages: int):
+        """Request flow of search_anime and async_search_anime (see scraper_utils.request_flow)."""
         print(f"🔍 Searching for '{query}' on AllAnime...")
         results = []
         current_page = page
         # Pagination is handled by the API returning results until empty, not explicit page limit needed here.
 
         try:
-            variables = {
-                "search": {
-                    "allowAdult": False, # Default values
-                    "allowUnknown": False
-                },
-                "limit": self.PAGE_SIZE,
-                "page": page,
-                "translationType": self._get_preference("preferred_sub"),
-                "countryOrigin": "ALL" # Default, filters might override
-            }
-            if query:
-                variables["search"]["query"] = query
-            else:
-                # TODO: Implement filter logic based on AllAnimeFilters.kt.txt
-                # This requires translating getSearchParameters and applying filter values
-                print("⚠️ Filter search is not yet implemented for AllAnime.")
-                # Example structure if filters were passed:
-                # if filters:
-                #     variables["search"]["season"] = filters.get("season", "all") # Example
-                #     variables["countryOrigin"] = filters.get("origin", "ALL") # Example
-                #     # ... add other filters (genres, types, year, sortBy)
-                pass # Proceed with default search if no query and filters not implemented
+            variables = self._search_variables(query, page)
 
             # Fetch multiple pages if requested
             while current_page <= max_pages:
@@ -1083,8 +1260,7 @@ class AllAnimeScraper:
                     "query": self.SEARCH_QUERY
                 }
 
-                request = self._build_post_request(data)
-                response = self.session.send(request, timeout=20) # Add timeout
+                response = yield self._api_request(data, timeout=20)
 
                 if response.status_code == 400:
                      print(f"❌ AllAnime search failed (400 Bad Request). Payload: {json.dumps(data)}")
@@ -1111,17 +1287,18 @@ class AllAnimeScraper:
                     
                 current_page += 1
 
-        except requests.exceptions.Timeout:
+        except TIMEOUT_ERRORS:
             print("❌ AllAnime search request timed out.")
-        except requests.exceptions.RequestException as e:
+        except REQUEST_ERRORS as e:
             print(f"❌ AllAnime search failed: {e}")
             with open("error.txt", "w") as ne:
                 ne.write(str(e))
             # Print response body if available for debugging
-            if e.response is not None:
-                print(f"Response status: {e.response.status_code}")
+            error_response = getattr(e, 'response', None)
+            if error_response is not None:
+                print(f"Response status: {error_response.status_code}")
                 try:
-                    print(f"Response body: {e.response.text[:500]}")
+                    print(f"Response body: {error_response.text[:500]}")
                 except Exception:
                     print("Could not read response body.")
         except json.JSONDecodeError:
@@ -1133,8 +1310,42 @@ class AllAnimeScraper:
 
         return results
 
-    def get_anime_details(self, url: str) -> Optional[Dict[str, Any]]:
-        """Get detailed information about an anime (like Kotlin's animeDetailsParse)."""
+    def search_anime(self, query: str, filters: Optional[FilterSearchParams] = None, page=1, max_pages=5) -> List[Dict[str, Any]]:
+        """Search for anime on AllAnime by title or filters."""
+        return run_sync(self._search_flow(query, page, max_pages), self._send)
+
+    async def async_search_anime(self, query: str, filters: Optional[FilterSearchParams] = None, page=1, max_pages=5) -> List[Dict[str, Any]]:
+        """Async variant of search_anime built on the shared transport."""
+        return await run_async(self._search_flow(query, page, max_pages), self._async_send)
+
+    def _search_variables(self, query: str, page: int) -> Dict[str, Any]:
+        """Build the GraphQL variables for a search request."""
+        variables = {
+            "search": {
+                "allowAdult": False, # Default values
+                "allowUnknown": False
+            },
+            "limit": self.PAGE_SIZE,
+            "page": page,
+            "translationType": self._get_preference("preferred_sub"),
+            "countryOrigin": "ALL" # Default, filters might override
+        }
+        if query:
+            variables["search"]["query"] = query
+        else:
+            # TODO: Implement filter logic based on AllAnimeFilters.kt.txt
+            # This requires translating getSearchParameters and applying filter values
+            print("⚠️ Filter search is not yet implemented for AllAnime.")
+            # Example structure if filters were passed:
+            # if filters:
+            #     variables["search"]["season"] = filters.get("season", "all") # Example
+            #     variables["countryOrigin"] = filters.get("origin", "ALL") # Example
+            #     # ... add other filters (genres, types, year, sortBy)
+            pass # Proceed with default search if no query and filters not implemented
+        return variables
+
+    def _details_flow(self, url: str):
+        """Request flow of get_anime_details and async_get_anime_details."""
         print(f"📝 Getting details for {url} from AllAnime...")
         try:
             anime_id = url
@@ -1142,66 +1353,20 @@ class AllAnimeScraper:
             variables = {"_id": anime_id}
             data = {"variables": variables, "query": self.DETAILS_QUERY}
 
-            request = self._build_post_request(data)
-            response = self.session.send(request, timeout=15)
+            response = yield self._api_request(data, timeout=15)
             response.raise_for_status()
 
             response_data: DetailsResult = response.json()
-            show = response_data.get('data', {}).get('show')
-
-            if not show:
-                print("❌ No details found for this anime.")
-                return None
-
-            # --- Parse details similar to Kotlin ---
-            title_style = self._get_preference("preferred_title_style")
-            title = show.get('name', 'Unknown Title')
-            if title_style == "eng":
-                title = show.get('englishName') or title
-            elif title_style == "native":
-                title = show.get('nativeName') or title
-
-            genres = show.get('genres') or []
-            status = self._parse_status(show.get('status'))
-            studios = show.get('studios') or []
-            author = studios[0] if studios else None # Kotlin uses first studio as author
-
-            description_raw = show.get('description', '')
-            description = 'No description available'
-            if description_raw:
-                # Basic HTML cleaning like Jsoup in Kotlin
-                temp_desc = description_raw.replace('<br>', '\n').replace('<br/>', '\n')
-                description = re.sub(r'<[^>]+>', '', temp_desc).strip() # Remove HTML tags
-
-            # Additional Info section
-            info = {'Status': status} # Start with status
-            show_type = show.get('type')
-            if show_type: info['Type'] = show_type
-            season_info = show.get('season')
-            if season_info:
-                info['Aired'] = f"{season_info.get('quarter', '-')} {season_info.get('year', '-')}"
-            score = show.get('score')
-            if score is not None: info['Score'] = f"{score}★"
-            if studios: info['Studios'] = ", ".join(studios)
-            # Add more fields if needed
-
-            return {
-                'id': anime_id,
-                'url': url, # Keep original URL for episode fetching
-                'title': f"{title} [AllAnime]", # Add source tag
-                'poster': show.get('thumbnail'),
-                'description': description,
-                'genres': ", ".join(genres),
-                'info': info,
-                'source': 'allanime'
-            }
+            return self._parse_details(response_data, url)
 
-        except requests.exceptions.Timeout:
+        except TIMEOUT_ERRORS:
             print("❌ AllAnime details request timed out.")
             return None
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to get anime details from AllAnime: {e} payload: {data} response: {response.text}")
-            with open("error.txt", "w") as n: n.write("Payload: " + str(data)); n.write("\nRespone Text:" + str(response.text))
+        except REQUEST_ERRORS as e:
+            error_response = getattr(e, 'response', None)
+            response_text = error_response.text if error_response is not None else ""
+            print(f"❌ Failed to get anime details from AllAnime: {e} payload: {data} response: {response_text}")
+            with open("error.txt", "w") as n: n.write("Payload: " + str(data)); n.write("\nRespone Text:" + str(response_text))
             return None
         except json.JSONDecodeError:
             print("❌ Failed to parse JSON response from AllAnime details.")
@@ -1212,99 +1377,147 @@ class AllAnimeScraper:
             print(traceback.format_exc())
             return None
 
-    def get_episodes(self, anime_details: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get episode list for an anime (like Kotlin's episodeListParse)."""
+    def get_anime_details(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get detailed information about an anime (like Kotlin's animeDetailsParse)."""
+        return run_sync(self._details_flow(url), self._send)
+
+    async def async_get_anime_details(self, url: str) -> Optional[Dict[str, Any]]:
+        """Async variant of get_anime_details built on the shared transport."""
+        return await run_async(self._details_flow(url), self._async_send)
+
+    def _batch_details_request(self, ids: List[str]) -> Dict[str, Any]:
+        """One GraphQL document looking up every id as an aliased show() field (s0, s1, ...)."""
+        params = ", ".join(f"$id{i}: String!" for i in range(len(ids)))
+        fields = " ".join(f"s{i}: show(_id: $id{i}) {{ {self.DETAILS_FIELDS} }}" for i in range(len(ids)))
+        return {
+            "variables": {f"id{i}": anime_id for i, anime_id in enumerate(ids)},
+            "query": f"query ({params}) {{ {fields} }}"
+        }
+
+    def _parse_batch_details(self, response_data: Dict[str, Any], ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Split an aliased details response back into per-id details (None if not found)."""
+        shows = response_data.get('data') or {}
+        return {
+            anime_id: self._parse_details({"data": {"show": shows.get(f"s{i}")}}, anime_id)
+            for i, anime_id in enumerate(ids)
+        }
+
+    def _batch_chunks(self, ids: List[str]) -> List[List[str]]:
+        return [ids[i:i + self.DETAILS_BATCH_SIZE] for i in range(0, len(ids), self.DETAILS_BATCH_SIZE)]
+
+    def _batch_details_flow(self, chunk: List[str]):
+        """Request flow looking up one chunk of ids. Returns {id: details or None}."""
+        try:
+            response = yield self._api_request(self._batch_details_request(chunk), timeout=20)
+            response.raise_for_status()
+            return self._parse_batch_details(response.json(), chunk)
+        except (*REQUEST_ERRORS, json.JSONDecodeError) as e:
+            print(f"❌ Failed to get batched details from AllAnime: {e}")
+            return {anime_id: None for anime_id in chunk}
+
+    def get_anime_details_batch(self, ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Details for several anime, DETAILS_BATCH_SIZE shows per request. Returns {id: details or None}."""
+        print(f"📝 Getting details for {len(ids)} anime from AllAnime...")
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for chunk in self._batch_chunks(ids):
+            results.update(run_sync(self._batch_details_flow(chunk), self._send))
+        return results
+
+    async def async_get_anime_details_batch(self, ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Async variant of get_anime_details_batch; the chunks are sent concurrently."""
+        print(f"📝 Getting details for {len(ids)} anime from AllAnime...")
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        chunk_flows = (run_async(self._batch_details_flow(chunk), self._async_send) for chunk in self._batch_chunks(ids))
+        for chunk_results in await asyncio.gather(*chunk_flows):
+            results.update(chunk_results)
+        return results
+
+    def _parse_details(self, response_data: DetailsResult, url: str) -> Optional[Dict[str, Any]]:
+        """Parse a DETAILS_QUERY response (like Kotlin's animeDetailsParse)."""
+        anime_id = url
+        show = response_data.get('data', {}).get('show')
+
+        if not show:
+            print("❌ No details found for this anime.")
+            return None
+
+        # --- Parse details similar to Kotlin ---
+        title_style = self._get_preference("preferred_title_style")
+        title = show.get('name', 'Unknown Title')
+        if title_style == "eng":
+            title = show.get('englishName') or title
+        elif title_style == "native":
+            title = show.get('nativeName') or title
+
+        genres = show.get('genres') or []
+        status = self._parse_status(show.get('status'))
+        studios = show.get('studios') or []
+        author = studios[0] if studios else None # Kotlin uses first studio as author
+
+        description_raw = show.get('description', '')
+        description = 'No description available'
+        if description_raw:
+            # Basic HTML cleaning like Jsoup in Kotlin
+            temp_desc = description_raw.replace('<br>', '\n').replace('<br/>', '\n')
+            description = re.sub(r'<[^>]+>', '', temp_desc).strip() # Remove HTML tags
+
+        # Additional Info section
+        info = {'Status': status} # Start with status
+        show_type = show.get('type')
+        if show_type: info['Type'] = show_type
+        season_info = show.get('season')
+        if season_info:
+            info['Aired'] = f"{season_info.get('quarter', '-')} {season_info.get('year', '-')}"
+        score = show.get('score')
+        if score is not None: info['Score'] = f"{score}★"
+        if studios: info['Studios'] = ", ".join(studios)
+        # Add more fields if needed
+
+        return {
+            'id': anime_id,
+            'url': url, # Keep original URL for episode fetching
+            'title': f"{title} [AllAnime]", # Add source tag
+            'poster': show.get('thumbnail'),
+            'description': description,
+            'genres': ", ".join(genres),
+            'info': info,
+            'source': 'allanime',
+            # DETAILS_QUERY already selects availableEpisodesDetail, so the
+            # episode list comes with the details and get_episodes reuses it
+            'episodes': self._parse_episodes(response_data)
+        }
+
+    def _episodes_flow(self, anime_details: Dict[str, Any]):
+        """Request flow of get_episodes and async_get_episodes."""
         if not anime_details or 'url' not in anime_details:
             print("❌ Invalid anime details. Cannot get episodes.")
             return []
 
+        if 'episodes' in anime_details:
+            # Already parsed from the details response, no second round trip
+            return anime_details['episodes']
+
         print(f"🎬 Getting episodes for {anime_details.get('title', 'anime')} from AllAnime...")
-        episodes = []
         try:
             anime_id = anime_details['url'].split("<&sep>")[0]
-            sub_pref = self._get_preference("preferred_sub")
 
             variables = {"_id": anime_id}
             data = {"variables": variables, "query": self.EPISODES_QUERY}
 
-            request = self._build_post_request(data)
-            response = self.session.send(request, timeout=15)
+            response = yield self._api_request(data, timeout=15)
             response.raise_for_status()
 
             response_data: SeriesResult = response.json()
-            show = response_data.get('data', {}).get('show')
-
-            if not show:
-                print("❌ No episode details found in API response.")
-                return []
-
-            available_episodes = show.get('availableEpisodesDetail', {})
-            
-            # Since we now get the whole object, we need to parse it differently
-            if isinstance(available_episodes, dict):
-                episode_list_raw = available_episodes.get(sub_pref, [])
-            else:
-                # Try to parse the string if it's not a dict
-                try:
-                    # It might be a JSON string
-                    if isinstance(available_episodes, str):
-                        available_episodes = json.loads(available_episodes)
-                        episode_list_raw = available_episodes.get(sub_pref, [])
-                    else:
-                        print(f"❌ Unexpected format for availableEpisodesDetail: {type(available_episodes)}")
-                        print(f"Data: {available_episodes}")
-                        episode_list_raw = []
-                except json.JSONDecodeError:
-                    print(f"❌ Could not parse availableEpisodesDetail as JSON: {available_episodes}")
-                    episode_list_raw = []
-
-            if not episode_list_raw:
-                print(f"❌ No '{sub_pref}' episodes found for this anime.")
-                # Optionally, try the other type if one is empty
-                other_pref = "dub" if sub_pref == "sub" else "sub"
-                
-                if isinstance(available_episodes, dict):
-                    episode_list_raw = available_episodes.get(other_pref, [])
-                    
-                if episode_list_raw:
-                    print(f"ℹ️ Found '{other_pref}' episodes instead.")
-                    sub_pref = other_pref # Switch preference for this fetch
-                else:
-                    return [] # Return empty if both are empty
-
-            show_id = show.get('_id') # Get show ID for stream query
+            return self._parse_episodes(response_data)
 
-            for ep_str in episode_list_raw:
-                # Construct JSON payload URL for get_video_sources
-                episode_payload = {
-                    "variables": {
-                        "showId": show_id,
-                        "translationType": sub_pref,
-                        "episodeString": ep_str
-                    },
-                    "query": self.STREAMS_QUERY
-                }
-                episode_url_json = json.dumps(episode_payload)
-
-                episodes.append({
-                    'number': ep_str, # Keep as string, matches Kotlin
-                    'title': f"Episode {ep_str} ({sub_pref})",
-                    'url': episode_url_json, # Store JSON payload as URL
-                    'source': 'allanime'
-                    # 'date' and 'thumbnail' not available in this API response
-                })
-
-            # Sort episodes numerically (handle floats like "0.5")
-            episodes.sort(key=lambda x: float(x['number']) if re.match(r'^-?\d+(\.\d+)?$', x['number']) else float('inf'))
-
-            return episodes
-
-        except requests.exceptions.Timeout:
+        except TIMEOUT_ERRORS:
             print("❌ AllAnime episodes request timed out.")
             return []
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to get episodes from AllAnime: {e} payload: {data} response: {response.text}")
-            with open("error.txt", "w") as n: n.write("Payload: " + str(data)); n.write("\nRespone Text:" + str(response.text))
+        except REQUEST_ERRORS as e:
+            error_response = getattr(e, 'response', None)
+            response_text = error_response.text if error_response is not None else ""
+            print(f"❌ Failed to get episodes from AllAnime: {e} payload: {data} response: {response_text}")
+            with open("error.txt", "w") as n: n.write("Payload: " + str(data)); n.write("\nRespone Text:" + str(response_text))
             
             return []
         except json.JSONDecodeError:
@@ -1316,16 +1529,112 @@ class AllAnimeScraper:
             print(traceback.format_exc())
             return []
 
-    def get_video_sources(self, episode_url_payload: str) -> List[Dict[str, Any]]:
-        """Get video sources for an episode (like Kotlin's getVideoList)."""
-        import concurrent.futures
-        from threading import Lock
+    def get_episodes(self, anime_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get episode list for an anime (like Kotlin's episodeListParse)."""
+        return run_sync(self._episodes_flow(anime_details), self._send)
+
+    async def async_get_episodes(self, anime_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Async variant of get_episodes built on the shared transport."""
+        return await run_async(self._episodes_flow(anime_details), self._async_send)
+
+    def _parse_episodes(self, response_data: SeriesResult) -> List[Dict[str, Any]]:
+        """Build the episode list from a show's availableEpisodesDetail."""
+        episodes = []
+        sub_pref = self._get_preference("preferred_sub")
+        show = response_data.get('data', {}).get('show')
+
+        if not show:
+            print("❌ No episode details found in API response.")
+            return []
+
+        available_episodes = show.get('availableEpisodesDetail', {})
         
+        # Since we now get the whole object, we need to parse it differently
+        if isinstance(available_episodes, dict):
+            episode_list_raw = available_episodes.get(sub_pref, [])
+        else:
+            # Try to parse the string if it's not a dict
+            try:
+                # It might be a JSON string
+                if isinstance(available_episodes, str):
+                    available_episodes = json.loads(available_episodes)
+                    episode_list_raw = available_episodes.get(sub_pref, [])
+                else:
+                    print(f"❌ Unexpected format for availableEpisodesDetail: {type(available_episodes)}")
+                    print(f"Data: {available_episodes}")
+                    episode_list_raw = []
+            except json.JSONDecodeError:
+                print(f"❌ Could not parse availableEpisodesDetail as JSON: {available_episodes}")
+                episode_list_raw = []
+
+        if not episode_list_raw:
+            print(f"❌ No '{sub_pref}' episodes found for this anime.")
+            # Optionally, try the other type if one is empty
+            other_pref = "dub" if sub_pref == "sub" else "sub"
+            
+            if isinstance(available_episodes, dict):
+                episode_list_raw = available_episodes.get(other_pref, [])
+                
+            if episode_list_raw:
+                print(f"ℹ️ Found '{other_pref}' episodes instead.")
+                sub_pref = other_pref # Switch preference for this fetch
+            else:
+                return [] # Return empty if both are empty
+
+        show_id = show.get('_id') # Get show ID for stream query
+
+        for ep_str in episode_list_raw:
+            episodes.append({
+                'number': ep_str, # Keep as string, matches Kotlin
+                'title': f"Episode {ep_str} ({sub_pref})",
+                'url': self._episode_token(show_id, sub_pref, ep_str), # Expanded by get_video_sources
+                'source': 'allanime'
+                # 'date' and 'thumbnail' not available in this API response
+            })
+
+        # Sort episodes numerically (handle floats like "0.5")
+        episodes.sort(key=lambda x: float(x['number']) if re.match(r'^-?\d+(\.\d+)?$', x['number']) else float('inf'))
+
+        return episodes
+
+    def _episode_token(self, show_id: str, translation_type: str, episode_string: str) -> str:
+        """Compact episode url, e.g. "ReooPAxPMsHM4KPMY:sub:12"."""
+        return self.EPISODE_TOKEN_SEP.join((show_id, translation_type, str(episode_string)))
+
+    def _episode_request(self, episode_url: str) -> Optional[Dict[str, Any]]:
+        """Build the STREAMS_QUERY request for an episode url.
+
+        Accepts the compact token from _episode_token as well as the full JSON
+        GraphQL payload episode urls used to carry. Only the variables of the
+        old form are used. Returns None if the url is neither.
+        """
+        episode_url = episode_url.strip()
+        if episode_url.startswith("{"):
+            variables = json.loads(episode_url).get("variables") or {}
+            parts = [variables.get("showId"), variables.get("translationType"), variables.get("episodeString")]
+        else:
+            parts = episode_url.rsplit(self.EPISODE_TOKEN_SEP, 2)
+
+        if len(parts) != 3 or not all(isinstance(part, str) and part for part in parts):
+            print(f"❌ Invalid AllAnime episode id: {episode_url[:100]}")
+            return None
+        show_id, translation_type, episode_string = parts
+        if translation_type not in self.TRANSLATION_TYPES:
+            print(f"❌ Invalid AllAnime translation type: {translation_type}")
+            return None
+
+        return {
+            "variables": {
+                "showId": show_id,
+                "translationType": translation_type,
+                "episodeString": episode_string
+            },
+            "query": self.STREAMS_QUERY
+        }
+
+    def _video_sources_flow(self, episode_url_payload: str, quality: Optional[str], max_streams: Optional[int]):
+        """Request flow of get_video_sources and async_get_video_sources."""
         print(f"🎥 Extracting video sources from AllAnime episode...")
-        video_sources = []
-        server_list: List[Tuple[Dict[str, Any], float]] = [] # Store as (server_info, priority)
-        extracted_video_list: List[Tuple[Dict[str, Any], float]] = [] # Store as (video_dict, priority)
-        extracted_video_list_lock = Lock()  # Lock for thread-safe appending to extracted_video_list
 
         try:
             # Log start of extraction to error.txt for debugging
@@ -1334,367 +1643,552 @@ class AllAnimeScraper:
                 f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"Episode payload (truncated): {episode_url_payload[:200]}...\n")
             
-            data = json.loads(episode_url_payload) # Parse the payload stored in the URL
-            request = self._build_post_request(data)
-            response = self.session.send(request, timeout=20)
+            data = self._episode_request(episode_url_payload) # Expand the episode token
+            if data is None:
+                return []
 
-            # Log API response details
+            # Concurrent misses for an episode share one upstream request
+            source_urls = yield Cached(source_urls_cache, self._episode_key(data),
+                                       lambda: self._source_urls_flow(data), ttl=_source_urls_ttl)
+            if not source_urls:
+                return []
+
+            # Hoster extractors use blocking sessions
+            return (yield Blocking(self._videos_from_source_urls, source_urls, data, quality, max_streams))
+
+        except TIMEOUT_ERRORS:
+            print("❌ AllAnime stream fetch request timed out.")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"\nError: Request timed out\n")
+            return []
+        except REQUEST_ERRORS as e:
+            print(f"❌ Failed to get video sources from AllAnime: {e}")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"\nRequest error: {e}\n")
+            return []
+        except json.JSONDecodeError:
+            print("❌ Failed to parse JSON payload/response for AllAnime video sources.")
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"API Response Status: {response.status_code}\n")
-                f.write(f"API Request URL: {request.url}\n")
-                f.write(f"API Request Headers: {request.headers}\n")
-                f.write(f"API Request Body: {request.body.decode('utf-8') if hasattr(request.body, 'decode') else request.body}\n\n")
+                f.write(f"\nJSON decode error\n")
+            return []
+        except Exception as e:
+            import traceback
+            trace = traceback.format_exc()
+            print(f"❌ An unexpected error occurred during AllAnime video source fetch: {e}")
+            print(trace)
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"\nUnexpected error: {e}\n")
+                f.write(f"{trace}\n")
+            return []
 
-            if response.status_code == 400:
-                 print(f"❌ AllAnime stream fetch failed (400 Bad Request). Payload: {json.dumps(data)}")
-                 print(f"Response Text: {response.text[:500]}")
-                 with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error 400 Bad Request\n")
-                    f.write(f"Response Text: {response.text}\n")
-                 return []
-            response.raise_for_status()
+    def get_video_sources(self, episode_url_payload: str, quality: Optional[str] = None,
+                          max_streams: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get video sources for an episode (like Kotlin's getVideoList).
+
+        quality/max_streams narrow the result and let extraction stop early
+        (see _videos_from_source_urls).
+        """
+        return run_sync(self._video_sources_flow(episode_url_payload, quality, max_streams), self._send)
+
+    async def async_get_video_sources(self, episode_url_payload: str, quality: Optional[str] = None,
+                                      max_streams: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Async variant of get_video_sources; the stream query goes through the shared transport."""
+        return await run_async(self._video_sources_flow(episode_url_payload, quality, max_streams), self._async_send)
+
+    def _episode_key(self, data: Dict[str, Any]) -> Tuple[str, str, str]:
+        """(showId, translationType, episodeString) of a STREAMS_QUERY request."""
+        variables = data["variables"]
+        return variables["showId"], variables["translationType"], variables["episodeString"]
+
+    def _decode_source_urls(self, raw_source_urls: List[Any]) -> List[Dict[str, Any]]:
+        """sourceUrls with every sourceUrl decrypted, ready to cache."""
+        return [
+            {**source, 'sourceUrl': self._decrypt_source(source.get('sourceUrl', ''))}
+            for source in raw_source_urls if isinstance(source, dict)
+        ]
+
+    def _source_urls_flow(self, data: Dict[str, Any]):
+        """POST the STREAMS_QUERY and return the decoded sourceUrls (empty on failure)."""
+        response = yield self._api_request(data, timeout=20)
+
+        # Log API response details
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"API Response Status: {response.status_code}\n")
+            f.write(f"API Request URL: {response.request.url}\n")
+            f.write(f"API Request Headers: {response.request.headers}\n")
+            f.write(f"API Request Body: {json.dumps(data)}\n\n")
+
+        if response.status_code == 400:
+             print(f"❌ AllAnime stream fetch failed (400 Bad Request). Payload: {json.dumps(data)}")
+             print(f"Response Text: {response.text[:500]}")
+             with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"Error 400 Bad Request\n")
+                f.write(f"Response Text: {response.text}\n")
+             return []
+        response.raise_for_status()
+
+        response_data = response.json()
+
+        return self._decode_source_urls(self._source_urls_from_response(response_data))
+
+    def _fetch_source_urls(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return run_sync(self._source_urls_flow(data), self._send)
+
+    def iter_video_sources(self, episode_url_payload: str, quality: Optional[str] = None,
+                           max_streams: Optional[int] = None):
+        """Like get_video_sources, but yields events as extraction goes.
+
+        Yields ("server", {...}) with each server's streams as soon as that
+        server is done, then ("done", {...}) with every stream sorted and
+        narrowed as get_video_sources would return them, plus per-server
+        timings. Closing the generator abandons servers still running.
+        """
+        data = self._episode_request(episode_url_payload)
+        if data is None:
+            yield "done", {"streams": [], "servers": {}}
+            return
+
+        source_urls = source_urls_cache.get_or_load(self._episode_key(data), lambda: self._fetch_source_urls(data),
+                                                    ttl=_source_urls_ttl)
+        extracted_video_list: List[Tuple[Dict[str, Any], float]] = []
+        servers: Dict[str, Dict[str, Any]] = {}
+        for server_tuple, video_tuples, seconds, error in self._iter_server_videos(source_urls or [], quality, max_streams):
+            extracted_video_list.extend(video_tuples)
+            server_name = server_tuple[0]['name']
+            streams = select_streams([video for video, _ in video_tuples], quality)
+            servers[server_name] = {
+                "status": "error" if error else ("ok" if streams else "empty"),
+                "streams": len(streams),
+                "timeMs": int(seconds * 1000),
+            }
+            if error:
+                servers[server_name]["error"] = error
+            yield "server", {"server": server_name, "streams": streams, "timeMs": int(seconds * 1000)}
 
-            response_data = response.json()
+        yield "done", {
+            "streams": select_streams(self._sort_videos(extracted_video_list), quality, max_streams),
+            "servers": servers,
+        }
 
-            # Add detailed debugging
-            print(f"DEBUG: Raw response: {json.dumps(response_data)[:300]}...")
+    def _source_urls_from_response(self, response_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Validate a STREAMS_QUERY response and return its raw sourceUrls (empty on failure)."""
+        # Add detailed debugging
+        print(f"DEBUG: Raw response: {json.dumps(response_data)[:300]}...")
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"Response Data: {json.dumps(response_data, indent=2)}\n\n")
+
+        data_obj = response_data.get('data')
+        if not data_obj:
+            print("❌ No 'data' field in API response.")
+            print(f"Full response: {response_data}")
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"Response Data: {json.dumps(response_data, indent=2)}\n\n")
+                f.write(f"Error: No 'data' field in API response\n")
+            return []
 
-            data_obj = response_data.get('data')
-            if not data_obj:
-                print("❌ No 'data' field in API response.")
-                print(f"Full response: {response_data}")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error: No 'data' field in API response\n")
-                return []
+        episode_data = data_obj.get('episode')
+        if not episode_data:
+            print("❌ No 'episode' field in data object.")
+            print(f"Data object: {data_obj}")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"Error: No 'episode' field in data object\n")
+            return []
 
-            episode_data = data_obj.get('episode')
-            if not episode_data:
-                print("❌ No 'episode' field in data object.")
-                print(f"Data object: {data_obj}")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error: No 'episode' field in data object\n")
-                return []
+        if not isinstance(episode_data, dict):
+            print(f"❌ 'episode' is not a dictionary. Type: {type(episode_data)}")
+            print(f"Episode data: {episode_data}")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"Error: 'episode' is not a dictionary. Type: {type(episode_data)}\n")
+            return []
 
-            if not isinstance(episode_data, dict):
-                print(f"❌ 'episode' is not a dictionary. Type: {type(episode_data)}")
-                print(f"Episode data: {episode_data}")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error: 'episode' is not a dictionary. Type: {type(episode_data)}\n")
-                return []
+        if 'sourceUrls' not in episode_data:
+            print("❌ 'sourceUrls' field not found in episode data.")
+            print(f"Episode data keys: {episode_data.keys()}")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"Error: 'sourceUrls' field not found in episode data\n")
+                f.write(f"Episode data keys: {episode_data.keys()}\n")
+            return []
 
-            if 'sourceUrls' not in episode_data:
-                print("❌ 'sourceUrls' field not found in episode data.")
-                print(f"Episode data keys: {episode_data.keys()}")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error: 'sourceUrls' field not found in episode data\n")
-                    f.write(f"Episode data keys: {episode_data.keys()}\n")
-                return []
+        raw_source_urls = episode_data.get('sourceUrls', [])
+        if not raw_source_urls:
+            print("❌ 'sourceUrls' is empty or null.")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"Error: 'sourceUrls' is empty or null\n")
+            return []
 
-            raw_source_urls = episode_data.get('sourceUrls', [])
-            if not raw_source_urls:
-                print("❌ 'sourceUrls' is empty or null.")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"Error: 'sourceUrls' is empty or null\n")
-                return []
+        print(f"DEBUG: Found {len(raw_source_urls)} raw sources.")
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"Found {len(raw_source_urls)} raw sources\n")
+            for i, source in enumerate(raw_source_urls):
+                f.write(f"Source {i+1}: {json.dumps(source, indent=2)}\n")
+
+        if not isinstance(raw_source_urls, list):
+             print(f"❌ Unexpected format for sourceUrls: {type(raw_source_urls)}")
+             with open('error.txt', 'a', encoding='utf-8') as f:
+                 f.write(f"Error: Unexpected format for sourceUrls: {type(raw_source_urls)}\n")
+             return []
 
-            print(f"DEBUG: Found {len(raw_source_urls)} raw sources.")
+        return raw_source_urls
+
+    def _has_extractor(self, s_name: str) -> bool:
+        """Whether _extract_server can extract anything from a selected server."""
+        return s_name.startswith("internal ") or s_name in self.EXTRACTED_ALT_HOSTERS
+
+    def _extract_server(self, s_name: str, s_url: str, s_raw_name: str) -> List[Any]:
+        """Run the extractor for one selected server and return what it found."""
+        local_videos = []
+        if s_name.startswith("internal "):
+            local_videos = self.all_anime_extractor.videoFromUrl(s_url, s_raw_name)
+        elif s_name.startswith("player@"):
+            print(f"Player type extraction not implemented for: {s_url}")
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"Found {len(raw_source_urls)} raw sources\n")
-                for i, source in enumerate(raw_source_urls):
-                    f.write(f"Source {i+1}: {json.dumps(source, indent=2)}\n")
+                f.write(f"Player type extraction not implemented\n")
+        elif s_name == "vidstreaming":
+            pass
+            #local_videos = self.gogo_stream_extractor.videosFromUrl(s_url.replace("//", "https://"))
+        elif s_name == "doodstream":
+            pass
+            #local_videos = self.dood_extractor.videosFromUrl(s_url)
+        elif s_name == "okru":
+            local_videos = self.okru_extractor.videosFromUrl(s_url)
+        elif s_name == "mp4upload":
+            local_videos = self.mp4upload_extractor.videosFromUrl(s_url, self.headers)
+        elif s_name == "streamlare":
+            pass
+            #local_videos = self.streamlare_extractor.videosFromUrl(s_url)
+        elif s_name == "filemoon":
+            pass
+            #local_videos = self.filemoon_extractor.videosFromUrl(s_url, prefix="Filemoon:")
+        elif s_name == "streamwish":
+            pass
+            #local_videos = self.streamwish_extractor.videosFromUrl(s_url, videoNameGen=lambda q: f"StreamWish:{q}")
+        return local_videos
+
+    def _videos_from_source_urls(self, raw_source_urls: List[Dict[str, Any]], data: Dict[str, Any],
+                                 quality: Optional[str] = None, max_streams: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Select servers from the decoded sourceUrls, extract their videos and sort them.
+
+        With max_streams, servers are tried in preference order and extraction
+        stops as soon as that many streams matching `quality` were found;
+        servers still running are abandoned (their results still fill the
+        extraction cache). The result is narrowed with select_streams.
+        """
+        extracted_video_list: List[Tuple[Dict[str, Any], float]] = [] # Store as (video_dict, priority)
+        for _, video_tuples, _, _ in self._iter_server_videos(raw_source_urls, quality, max_streams):
+            extracted_video_list.extend(video_tuples)
 
-            if not isinstance(raw_source_urls, list):
-                 print(f"❌ Unexpected format for sourceUrls: {type(raw_source_urls)}")
-                 with open('error.txt', 'a', encoding='utf-8') as f:
-                     f.write(f"Error: Unexpected format for sourceUrls: {type(raw_source_urls)}\n")
-                 return []
-
-            # --- Server Selection Logic (from Kotlin getVideoList) ---
-            hoster_selection = self._get_preference("hoster_selection")
-            alt_hoster_selection = self._get_preference("alt_hoster_selection")
-            mappings = {
-                "vidstreaming": ["vidstreaming", "https://gogo", "playgo1.cc", "playtaku", "vidcloud"],
-                "doodstream": ["dood"], "okru": ["ok.ru", "okru"],
-                "mp4upload": ["mp4upload.com"], "streamlare": ["streamlare.com"],
-                "filemoon": ["filemoon", "moonplayer"], "streamwish": ["wish"],
-            }
+        video_sources = self._sort_videos(extracted_video_list)
+        video_sources = select_streams(video_sources, quality, max_streams)
 
-            temp_server_list = []
-            for video_source in raw_source_urls:
-                 # Ensure video_source is a dictionary
-                 if not isinstance(video_source, dict):
-                     print(f"Skipping invalid video source item: {video_source}")
-                     with open('error.txt', 'a', encoding='utf-8') as f:
-                         f.write(f"Skipping invalid video source item: {video_source}\n")
-                     continue
+        # --- Save to urls.txt ---
+        if video_sources:
+            with open('urls.txt', 'a', encoding='utf-8') as url_file:
+                try:
+                    ep_str = data.get('variables', {}).get('episodeString', 'Unknown Episode')
+                    url_file.write(f"\n==== AllAnime: Episode {ep_str} ({self._get_preference('preferred_sub')}) ====\n")
+                except Exception:
+                    url_file.write(f"\n==== AllAnime: Unknown Episode ====\n")
+
+                for stream in video_sources:
+                    q = stream.get('quality', 'Unknown Quality')
+                    u = stream.get('url', 'No URL')
+                    url_file.write(f"{q}: {u}\n")
+                    for sub in stream.get('subtitles', []):
+                         lang = sub.get('language', 'Unknown')
+                         sub_url = sub.get('url', 'No URL')
+                         url_file.write(f"  Subtitle ({lang}): {sub_url}\n")
+
+            print(f"✅ Found {len(video_sources)} video streams and saved to urls.txt")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"\n✅ Successfully found {len(video_sources)} video streams\n")
+        else:
+            print("ℹ️ No video streams found after processing servers.")
+            with open('error.txt', 'a', encoding='utf-8') as f:
+                f.write(f"\n❌ No video streams found after processing servers\n")
+
+        return video_sources
+
+    def _select_servers(self, raw_source_urls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+        """Pick the servers we can extract from, as (server_info, priority) in the order to try them."""
+        # --- Server Selection Logic (from Kotlin getVideoList) ---
+        hoster_selection = self._get_preference("hoster_selection")
+        alt_hoster_selection = self._get_preference("alt_hoster_selection")
+        mappings = {
+            "vidstreaming": ["vidstreaming", "https://gogo", "playgo1.cc", "playtaku", "vidcloud"],
+            "doodstream": ["dood"], "okru": ["ok.ru", "okru"],
+            "mp4upload": ["mp4upload.com"], "streamlare": ["streamlare.com"],
+            "filemoon": ["filemoon", "moonplayer"], "streamwish": ["wish"],
+        }
 
-                 source_url_raw = video_source.get('sourceUrl', '')
-                 source_url = self._decrypt_source(source_url_raw)
-                 source_name_raw = video_source.get('sourceName', '')
-                 source_name = source_name_raw.lower()
-                 source_type = video_source.get('type', '')
-                 priority = float(video_source.get('priority', 0.0)) # Ensure float
+        temp_server_list = []
+        for video_source in raw_source_urls:
+             # Ensure video_source is a dictionary
+             if not isinstance(video_source, dict):
+                 print(f"Skipping invalid video source item: {video_source}")
+                 with open('error.txt', 'a', encoding='utf-8') as f:
+                     f.write(f"Skipping invalid video source item: {video_source}\n")
+                 continue
 
+             source_url_raw = video_source.get('sourceUrl', '')
+             source_url = self._decrypt_source(source_url_raw)
+             source_name_raw = video_source.get('sourceName', '')
+             source_name = source_name_raw.lower()
+             source_type = video_source.get('type', '')
+             priority = float(video_source.get('priority', 0.0)) # Ensure float
+
+             with open('error.txt', 'a', encoding='utf-8') as f:
+                 f.write(f"Processing source: {source_name_raw}\n")
+                 f.write(f"  Raw URL: {source_url_raw}\n")
+                 f.write(f"  Decrypted URL: {source_url}\n")
+                 f.write(f"  Type: {source_type}\n")
+                 f.write(f"  Priority: {priority}\n")
+
+             server_info = {'url': source_url, 'name': '', 'priority': priority, 'type': source_type, 'raw_name': source_name_raw}
+
+             # Check internal hosters
+             is_internal = False
+             if source_url.startswith("/apivtwo/"):
+                 for name in self.INTERAL_HOSTER_NAMES:
+                     if re.search(r'\b' + name.lower() + r'\b', source_name):
+                         if name.lower() in hoster_selection:
+                             server_info['name'] = f"internal {source_name_raw}"
+                             temp_server_list.append((server_info, priority))
+                             is_internal = True
+                             with open('error.txt', 'a', encoding='utf-8') as f:
+                                 f.write(f"  ✅ Added as internal host: {name.lower()}\n")
+                             break
+                 if is_internal: continue # Skip other checks if matched internal
+
+             # Check player type
+             if source_type == "player" and "player" in alt_hoster_selection:
+                 server_info['name'] = f"player@{source_name_raw}"
+                 temp_server_list.append((server_info, priority))
                  with open('error.txt', 'a', encoding='utf-8') as f:
-                     f.write(f"Processing source: {source_name_raw}\n")
-                     f.write(f"  Raw URL: {source_url_raw}\n")
-                     f.write(f"  Decrypted URL: {source_url}\n")
-                     f.write(f"  Type: {source_type}\n")
-                     f.write(f"  Priority: {priority}\n")
-
-                 server_info = {'url': source_url, 'name': '', 'priority': priority, 'type': source_type, 'raw_name': source_name_raw}
-
-                 # Check internal hosters
-                 is_internal = False
-                 if source_url.startswith("/apivtwo/"):
-                     for name in self.INTERAL_HOSTER_NAMES:
-                         if re.search(r'\b' + name.lower() + r'\b', source_name):
-                             if name.lower() in hoster_selection:
-                                 server_info['name'] = f"internal {source_name_raw}"
-                                 temp_server_list.append((server_info, priority))
-                                 is_internal = True
-                                 with open('error.txt', 'a', encoding='utf-8') as f:
-                                     f.write(f"  ✅ Added as internal host: {name.lower()}\n")
-                                 break
-                     if is_internal: continue # Skip other checks if matched internal
-
-                 # Check player type
-                 if source_type == "player" and "player" in alt_hoster_selection:
-                     server_info['name'] = f"player@{source_name_raw}"
+                     f.write(f"  ✅ Added as player: {source_name_raw}\n")
+                 continue # Skip other checks if matched player
+
+             # Check alternative hosters
+             matched_alt = False
+             for alt_hoster, url_matches in mappings.items():
+                 if alt_hoster in alt_hoster_selection and any(match in source_url for match in url_matches):
+                     server_info['name'] = alt_hoster
                      temp_server_list.append((server_info, priority))
+                     matched_alt = True
                      with open('error.txt', 'a', encoding='utf-8') as f:
-                         f.write(f"  ✅ Added as player: {source_name_raw}\n")
-                     continue # Skip other checks if matched player
-
-                 # Check alternative hosters
-                 matched_alt = False
-                 for alt_hoster, url_matches in mappings.items():
-                     if alt_hoster in alt_hoster_selection and any(match in source_url for match in url_matches):
-                         server_info['name'] = alt_hoster
-                         temp_server_list.append((server_info, priority))
-                         matched_alt = True
-                         with open('error.txt', 'a', encoding='utf-8') as f:
-                             f.write(f"  ✅ Added as alt hoster: {alt_hoster}\n")
-                         break
-                 
-                 if not matched_alt and not is_internal:
-                     with open('error.txt', 'a', encoding='utf-8') as f:
-                         f.write(f"  ❌ No matching hoster found, skipped\n")
+                         f.write(f"  ✅ Added as alt hoster: {alt_hoster}\n")
+                     break
+             
+             if not matched_alt and not is_internal:
+                 with open('error.txt', 'a', encoding='utf-8') as f:
+                     f.write(f"  ❌ No matching hoster found, skipped\n")
 
+        # Servers we have no extractor for would always come back empty and
+        # count against their hoster's health
+        unsupported = [server_tuple for server_tuple in temp_server_list if not self._has_extractor(server_tuple[0]['name'])]
+        if unsupported:
+            temp_server_list = [server_tuple for server_tuple in temp_server_list if self._has_extractor(server_tuple[0]['name'])]
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nSelected {len(temp_server_list)} servers for processing\n")
-                for i, (server, priority) in enumerate(temp_server_list):
-                    f.write(f"Server {i+1}: {server['name']} (priority: {priority})\n")
-
-            # --- Extract Videos from Selected Servers using thread pool ---
-            def extract_videos_from_server(server_tuple):
-                server_info, priority = server_tuple
-                s_name = server_info['name']
-                s_url = server_info['url']
-                s_raw_name = server_info['raw_name']  # Original name for internal extractor
-                local_videos = []
-
-                try:
-                    with open('error.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"\n[Thread] Extracting videos from: {s_name} ({s_url})\n")
-
-                    if s_name.startswith("internal "):
-                        pass
-                        #local_videos = self.all_anime_extractor.videoFromUrl(s_url, s_raw_name)
-                    elif s_name.startswith("player@"):
-                        print(f"Player type extraction not implemented for: {s_url}")
-                        with open('error.txt', 'a', encoding='utf-8') as f:
-                            f.write(f"Player type extraction not implemented\n")
-                    elif s_name == "vidstreaming":
-                        pass
-                        #local_videos = self.gogo_stream_extractor.videosFromUrl(s_url.replace("//", "https://"))
-                    elif s_name == "doodstream":
-                        pass
-                        #local_videos = self.dood_extractor.videosFromUrl(s_url)
-                    elif s_name == "okru":
-                        local_videos = self.okru_extractor.videosFromUrl(s_url)
-                    elif s_name == "mp4upload":
-                        local_videos = self.mp4upload_extractor.videosFromUrl(s_url, self.headers)
-                    elif s_name == "streamlare":
-                        pass
-                        #local_videos = self.streamlare_extractor.videosFromUrl(s_url)
-                    elif s_name == "filemoon":
-                        pass
-                        #local_videos = self.filemoon_extractor.videosFromUrl(s_url, prefix="Filemoon:")
-                    elif s_name == "streamwish":
-                        pass
-                        #local_videos = self.streamwish_extractor.videosFromUrl(s_url, videoNameGen=lambda q: f"StreamWish:{q}")
-
-                    with open('error.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"[Thread] Extracted {len(local_videos)} videos from {s_name}\n")
-                    
-                    video_tuples = []
-                    # Process videos from this server
-                    for video in local_videos:
-                        if isinstance(video, dict):
-                            video['source'] = 'allanime'  # Add source identifier
-                            video_tuples.append((video, priority))
-                        elif hasattr(video, 'videoUrl') and hasattr(video, 'videoTitle'):  # Handle Video object from placeholders
-                            video_dict = {
-                                'url': video.videoUrl,
-                                'quality': video.videoTitle,
-                                'headers': video.headers,
-                                'source': 'allanime',
-                                'subtitles': [{'url': sub.url, 'language': sub.lang} for sub in getattr(video, 'subtitleTracks', [])]
-                            }
-                            video_tuples.append((video_dict, priority))
-                    
-                    # Add to shared list with lock protection
-                    with extracted_video_list_lock:
-                        extracted_video_list.extend(video_tuples)
-                        
-                    return len(video_tuples)
-                    
-                except Exception as e:
-                    print(f"Error extracting videos from server {s_name} ({s_url}): {e}")
-                    import traceback
-                    trace = traceback.format_exc()
-                    print(trace)
-                    with open('error.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"[Thread] Error extracting videos: {e}\n")
-                        f.write(f"{trace}\n")
-                    return 0
-            
-            # Process servers in parallel using ThreadPoolExecutor with max 3 workers
-            print(f"⏳ Starting parallel extraction of {len(temp_server_list)} servers with max 3 workers...")
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                # Submit all tasks
-                future_to_server = {executor.submit(extract_videos_from_server, server_tuple): server_tuple for server_tuple in temp_server_list}
-                
-                # Process results as they complete
-                for future in concurrent.futures.as_completed(future_to_server):
-                    server_tuple = future_to_server[future]
-                    server_name = server_tuple[0]['name']
-                    try:
-                        count = future.result()
-                        print(f"✅ Extracted {count} videos from {server_name}")
-                    except Exception as e:
-                        print(f"❌ Server {server_name} generated an exception: {e}")
+                for server, _ in unsupported:
+                    f.write(f"  ❌ No extractor for {server['name']} ({server['raw_name']}), skipped\n")
+
+        # Try servers in the order their videos are sorted in (see _sort_videos),
+        # healthy and fast hosters first within that, minus the ones failing right now
+        pref_server = self._get_preference("preferred_server")
+        rank = None
+        if pref_server != "site_default":
+            rank = lambda server_tuple: pref_server not in server_tuple[0]['name'].lower()
+        else:
+            temp_server_list.sort(key=lambda server_tuple: -server_tuple[1], reverse=True)
+        selected = len(temp_server_list)
+        temp_server_list = hoster_health.plan(temp_server_list, lambda server_tuple: server_tuple[0]['name'], rank=rank)
+        if len(temp_server_list) < selected:
+            print(f"⏭️ Skipping {selected - len(temp_server_list)} failing hosters")
+
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"\nSelected {len(temp_server_list)} servers for processing\n")
+            for i, (server, priority) in enumerate(temp_server_list):
+                f.write(f"Server {i+1}: {server['name']} (priority: {priority})\n")
+
+        return temp_server_list
+
+    def _timed_extract_server(self, s_name: str, s_url: str, s_raw_name: str) -> List[Any]:
+        """_extract_server, recording the hoster's latency and outcome in hoster_health."""
+        started = time.time()
+        try:
+            videos = self._extract_server(s_name, s_url, s_raw_name)
+        except Exception as e:
+            hoster_health.record(s_name, time.time() - started, False, str(e))
+            raise
+        hoster_health.record(s_name, time.time() - started, bool(videos), None if videos else "No videos found")
+        return videos
+
+    def _extract_videos_from_server(self, server_tuple: Tuple[Dict[str, Any], float]) -> List[Tuple[Dict[str, Any], float]]:
+        """Extract one selected server's videos as (video_dict, priority) tuples. Raises on failure."""
+        server_info, priority = server_tuple
+        s_name = server_info['name']
+        s_url = server_info['url']
+        s_raw_name = server_info['raw_name']  # Original name for internal extractor
+        local_videos = []
 
-            print(f"🔄 Parallel extraction complete. Processing {len(extracted_video_list)} videos...")
+        try:
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nExtracted {len(extracted_video_list)} total videos\n")
+                f.write(f"\n[Thread] Extracting videos from: {s_name} ({s_url})\n")
 
-            # --- Sort Videos (like Kotlin's prioritySort) ---
-            pref_server = self._get_preference("preferred_server")
-            quality_pref = self._get_preference("preferred_quality")
-            sub_pref = self._get_preference("preferred_sub") # sub or dub
+            # Only embeds not resolved recently go out to the hoster
+            local_videos = extraction_cache.get_or_load(
+                (s_name, s_url), lambda: self._timed_extract_server(s_name, s_url, s_raw_name), ttl=_extraction_ttl
+            )
 
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nSorting videos with preferences:\n")
-                f.write(f"  Preferred server: {pref_server}\n")
-                f.write(f"  Preferred quality: {quality_pref}\n")
-                f.write(f"  Preferred sub/dub: {sub_pref}\n")
-
-            def sort_key(video_tuple: Tuple[Dict[str, Any], float]):
-                video_dict, server_priority = video_tuple
-                quality = video_dict.get('quality', '').lower()
-
-                # Score based on server preference
-                server_score = 0
-                if pref_server != "site_default":
-                    # Check if quality string contains the preferred server name (case-insensitive)
-                    if pref_server in quality:
-                        server_score = 1 # Higher score if preferred server matches
-                else:
-                    # Use server priority if prefServer is site_default
-                    # Higher priority value means lower preference in sorting (hence negative)
-                    server_score = -server_priority
-
-                # Score based on quality preference
-                quality_score = 0
-                if quality_pref in quality:
-                    quality_score = 1 # Higher score if preferred quality matches
-                    
-                # Enhanced quality scoring based on resolution
-                resolution_score = 0
-                # Extract resolution from quality string
-                resolution_match = re.search(r'(\d+)p', quality)
-                if resolution_match:
-                    res_value = int(resolution_match.group(1))
-                    # Map common resolutions to scores (higher is better)
-                    resolution_map = {
-                        2160: 5,  # 4K
-                        1440: 4,  # 2K
-                        1080: 3,  # 1080p
-                        720: 2,   # 720p
-                        480: 1,   # 480p
-                        360: 0,   # 360p
-                        240: -1,  # 240p
-                        144: -2   # 144p
+                f.write(f"[Thread] Extracted {len(local_videos)} videos from {s_name}\n")
+
+            video_tuples = []
+            # Process videos from this server
+            for video in local_videos:
+                if isinstance(video, dict):
+                    video['source'] = 'allanime'  # Add source identifier
+                    video_tuples.append((video, priority))
+                elif hasattr(video, 'videoUrl') and hasattr(video, 'videoTitle'):  # Handle Video object from placeholders
+                    video_dict = {
+                        'url': video.videoUrl,
+                        'quality': video.videoTitle,
+                        'headers': video.headers,
+                        'source': 'allanime',
+                        'subtitles': [{'url': sub.url, 'language': sub.lang} for sub in getattr(video, 'subtitleTracks', [])]
                     }
-                    resolution_score = resolution_map.get(res_value, 0)
-
-                # Score based on sub/dub preference (simple check in quality name)
-                sub_dub_score = 0
-                if sub_pref in quality:
-                    sub_dub_score = 1
-
-                # Return tuple for sorting (higher scores first)
-                return (server_score, quality_score, resolution_score, sub_dub_score)
+                    video_tuples.append((video_dict, priority))
 
-            sorted_video_tuples = sorted(extracted_video_list, key=sort_key, reverse=True)
-            video_sources = [v[0] for v in sorted_video_tuples] # Extract only the video dicts
+            return video_tuples
 
-            # --- Save to urls.txt ---
-            if video_sources:
-                with open('urls.txt', 'a', encoding='utf-8') as url_file:
-                    try:
-                        ep_str = data.get('variables', {}).get('episodeString', 'Unknown Episode')
-                        url_file.write(f"\n==== AllAnime: Episode {ep_str} ({self._get_preference('preferred_sub')}) ====\n")
-                    except Exception:
-                        url_file.write(f"\n==== AllAnime: Unknown Episode ====\n")
-
-                    for stream in video_sources:
-                        q = stream.get('quality', 'Unknown Quality')
-                        u = stream.get('url', 'No URL')
-                        url_file.write(f"{q}: {u}\n")
-                        for sub in stream.get('subtitles', []):
-                             lang = sub.get('language', 'Unknown')
-                             sub_url = sub.get('url', 'No URL')
-                             url_file.write(f"  Subtitle ({lang}): {sub_url}\n")
-
-                print(f"✅ Found {len(video_sources)} video streams and saved to urls.txt")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"\n✅ Successfully found {len(video_sources)} video streams\n")
-            else:
-                print("ℹ️ No video streams found after processing servers.")
-                with open('error.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"\n❌ No video streams found after processing servers\n")
-
-            return video_sources
-
-        except requests.exceptions.Timeout:
-            print("❌ AllAnime stream fetch request timed out.")
-            with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nError: Request timed out\n")
-            return []
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to get video sources from AllAnime: {e}")
-            with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nRequest error: {e}\n")
-            return []
-        except json.JSONDecodeError:
-            print("❌ Failed to parse JSON payload/response for AllAnime video sources.")
-            with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nJSON decode error\n")
-            return []
         except Exception as e:
+            print(f"Error extracting videos from server {s_name} ({s_url}): {e}")
             import traceback
             trace = traceback.format_exc()
-            print(f"❌ An unexpected error occurred during AllAnime video source fetch: {e}")
             print(trace)
             with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\nUnexpected error: {e}\n")
+                f.write(f"[Thread] Error extracting videos: {e}\n")
                 f.write(f"{trace}\n")
-            return []
+            raise
+
+    def _iter_server_videos(self, raw_source_urls: List[Dict[str, Any]], quality: Optional[str] = None,
+                            max_streams: Optional[int] = None):
+        """Extract the selected servers in parallel, yielding as each one finishes.
+
+        Yields (server_tuple, video_tuples, seconds, error) where error is None
+        or the reason the server failed. Stops after max_streams streams
+        matching `quality`; closing the generator early abandons the rest too.
+        """
+        import concurrent.futures
+
+        temp_server_list = self._select_servers(raw_source_urls)
+        if not temp_server_list:
+            return
+
+        def timed_extract(server_tuple):
+            started = time.time()
+            try:
+                return self._extract_videos_from_server(server_tuple), time.time() - started, None
+            except Exception as e:
+                return [], time.time() - started, str(e)
+
+        # Without a target every server is needed, so run as many as allowed at
+        # once. With one, run just enough of the best hosters that one should succeed.
+        if max_streams:
+            max_workers = hoster_health.fanout([server_tuple[0]['name'] for server_tuple in temp_server_list])
+        else:
+            max_workers = min(len(temp_server_list), MAX_FANOUT)
+        print(f"⏳ Starting parallel extraction of {len(temp_server_list)} servers with max {max_workers} workers...")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Submit all tasks, in preference order so the best servers start first
+            future_to_server = {executor.submit(timed_extract, server_tuple): server_tuple for server_tuple in temp_server_list}
+            matched = 0
+
+            # Process results as they complete
+            for future in concurrent.futures.as_completed(future_to_server):
+                server_tuple = future_to_server[future]
+                server_name = server_tuple[0]['name']
+                video_tuples, seconds, error = future.result()
+                if error:
+                    print(f"❌ Server {server_name} generated an exception: {error}")
+                else:
+                    print(f"✅ Extracted {len(video_tuples)} videos from {server_name}")
+                yield server_tuple, video_tuples, seconds, error
+
+                matched += sum(1 for video, _ in video_tuples if quality_matches(video, quality))
+                if max_streams and matched >= max_streams:
+                    print(f"⏩ Found {matched} matching streams, not waiting for the remaining servers")
+                    break
+        finally:
+            # Don't wait for abandoned servers, and drop the ones that haven't started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _sort_videos(self, extracted_video_list: List[Tuple[Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """Sort (video_dict, priority) tuples by the source preferences, best first."""
+        print(f"🔄 Sorting {len(extracted_video_list)} videos...")
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"\nExtracted {len(extracted_video_list)} total videos\n")
+
+        # --- Sort Videos (like Kotlin's prioritySort) ---
+        pref_server = self._get_preference("preferred_server")
+        quality_pref = self._get_preference("preferred_quality")
+        sub_pref = self._get_preference("preferred_sub") # sub or dub
+
+        with open('error.txt', 'a', encoding='utf-8') as f:
+            f.write(f"\nSorting videos with preferences:\n")
+            f.write(f"  Preferred server: {pref_server}\n")
+            f.write(f"  Preferred quality: {quality_pref}\n")
+            f.write(f"  Preferred sub/dub: {sub_pref}\n")
+
+        def sort_key(video_tuple: Tuple[Dict[str, Any], float]):
+            video_dict, server_priority = video_tuple
+            quality = video_dict.get('quality', '').lower()
+
+            # Score based on server preference
+            server_score = 0
+            if pref_server != "site_default":
+                # Check if quality string contains the preferred server name (case-insensitive)
+                if pref_server in quality:
+                    server_score = 1 # Higher score if preferred server matches
+            else:
+                # Use server priority if prefServer is site_default
+                # Higher priority value means lower preference in sorting (hence negative)
+                server_score = -server_priority
+
+            # Score based on quality preference
+            quality_score = 0
+            if quality_pref in quality:
+                quality_score = 1 # Higher score if preferred quality matches
+                
+            # Enhanced quality scoring based on resolution
+            resolution_score = 0
+            # Extract resolution from quality string
+            resolution_match = re.search(r'(\d+)p', quality)
+            if resolution_match:
+                res_value = int(resolution_match.group(1))
+                # Map common resolutions to scores (higher is better)
+                resolution_map = {
+                    2160: 5,  # 4K
+                    1440: 4,  # 2K
+                    1080: 3,  # 1080p
+                    720: 2,   # 720p
+                    480: 1,   # 480p
+                    360: 0,   # 360p
+                    240: -1,  # 240p
+                    144: -2   # 144p
+                }
+                resolution_score = resolution_map.get(res_value, 0)
+
+            # Score based on sub/dub preference (simple check in quality name)
+            sub_dub_score = 0
+            if sub_pref in quality:
+                sub_dub_score = 1
+
+            # Return tuple for sorting (higher scores first)
+            return (server_score, quality_score, resolution_score, sub_dub_score)
+
+        sorted_video_tuples = sorted(extracted_video_list, key=sort_key, reverse=True)
+        video_sources = [v[0] for v in sorted_video_tuples] # Extract only the video dicts
+        return video_sources
 
 
 # --- Basic Video class equivalent for type hinting ---
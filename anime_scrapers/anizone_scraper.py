@@ -3,7 +3,7 @@ import requests
 import json
 import re
 import urllib.parse
-from bs4 import BeautifulSoup
+from scraper_utils.html_parser import make_soup
 import time
 from datetime import datetime
 
@@ -207,7 +207,7 @@ class AniZoneSearcher:
                 return None
 
             # Parse the HTML
-            document = BeautifulSoup(response.text, 'html.parser')
+            document = make_soup(response.text)
 
             # Get the main info div
             info_div = document.select("div.flex.items-start > div")
@@ -289,7 +289,7 @@ class AniZoneSearcher:
                 return []
 
             # Parse the detail page to find episode section
-            detail_document = BeautifulSoup(detail_response.text, 'html.parser')
+            detail_document = make_soup(detail_response.text)
 
             # Reset load count and snapshot
             self.load_count = 0
@@ -491,7 +491,7 @@ class AniZoneSearcher:
                 return []
 
             # Parse the HTML
-            document = BeautifulSoup(response.text, 'html.parser')
+            document = make_soup(response.text)
 
             # Get episode info for the url.txt file
             episode_info = episode_url.split('/')[-1]
@@ -699,7 +699,7 @@ class AniZoneSearcher:
     def get_html_from_livewire(self, response_data, map_key):
         """Extract HTML from a Livewire response"""
         if "components" not in response_data or not response_data["components"]:
-            return BeautifulSoup("<html></html>", 'html.parser')
+            return make_soup("<html></html>")
 
         component = response_data["components"][0]
 
@@ -710,9 +710,9 @@ class AniZoneSearcher:
         # Parse HTML from effects
         if "effects" in component and "html" in component["effects"]:
             html_content = component["effects"]["html"].replace('\\\"', '"').replace('\\n', '')
-            return BeautifulSoup(html_content, 'html.parser')
+            return make_soup(html_content)
 
-        return BeautifulSoup("<html></html>", 'html.parser')
+        return make_soup("<html></html>")
 
     def get_snapshot_from_document(self, document):
         """Extract snapshot from a document"""
@@ -773,7 +773,7 @@ class AniZoneSearcher:
                     print(f"❌ Failed to get initial page: Status code {response.status_code}")
                     return None
 
-                document = BeautifulSoup(response.text, 'html.parser')
+                document = make_soup(response.text)
 
                 # Get the snapshot
                 self.snapshots[map_key] = self.get_snapshot_from_document(document)
@@ -856,7 +856,7 @@ class AniZoneSearcher:
                 retry_response = self.session.get(retry_url, headers=self.headers)
                 
                 if retry_response.status_code == 200:
-                    retry_document = BeautifulSoup(retry_response.text, 'html.parser')
+                    retry_document = make_soup(retry_response.text)
                     self.snapshots[map_key] = self.get_snapshot_from_document(retry_document)
                     
                     token_script = retry_document.select_one('script[data-csrf]')
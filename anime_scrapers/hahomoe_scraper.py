@@ -1,12 +1,25 @@
 import requests
-from bs4 import BeautifulSoup
+from scraper_utils.html_parser import elements_with_class, make_soup
 import sys
 import time
 import urllib.parse
 import re
 from typing import Dict, Any, List, Optional
+from scraper_utils.http_transport import get_transport
+from scraper_utils.pagination import fetch_window
+from scraper_utils.fanout import async_collect_pages, collect_pages
+from scraper_utils.request_flow import Request, run_async, run_sync
+
+# Listing and episode pages are parsed for their card list and pagination
+# only, so the rest of the page is never built into a tree
+LISTING_ELEMENTS = elements_with_class(["ul"], ["anime-loop", "pagination"])
+EPISODE_LIST_ELEMENTS = elements_with_class(["ul"], ["episode-loop", "pagination"])
 
 class HahoMoeSearcher:
+    # Anime cards per listing page; corrected from the first full page seen
+    LISTING_PAGE_SIZE = 15
+    HOST = "haho.moe"
+
     def __init__(self):
         self.base_url = "https://haho.moe"
         self.search_url = f"{self.base_url}/anime"
@@ -34,173 +47,284 @@ class HahoMoeSearcher:
         # Quality options
         self.quality_list = ["1080p", "720p", "480p", "360p"]
 
+        self.upstream_page_size = self.LISTING_PAGE_SIZE
+
     def search_anime(self, query, max_pages=5):
         """Search for anime on HahoMoe by title"""
         try:
             print(f"🔍 Searching for '{query}' on HahoMoe...")
 
-            # Build search parameters from active filters
-            search_params = self._get_search_parameters()
-            order_by, ordering = search_params[2], search_params[3]
-            sort_param = f"{order_by}{ordering}"
-
-            # Encode the query for the URL
-            encoded_query = urllib.parse.quote(query)
+            results = self._collect_listing(lambda n: self._build_search_url(query, n), 1, max_pages)
 
-            # Prepare tag filters
-            http_query = ""
-            if self.active_filters["included_tags"]:
-                included_tags = " ".join([f'genre:{tag}' for tag in self.active_filters["included_tags"]])
-                http_query += f" {included_tags}"
+            print(f"Total results found: {len(results)}")
+            return results
 
-            if self.active_filters["excluded_tags"]:
-                excluded_tags = " ".join([f'-genre:{tag}' for tag in self.active_filters["excluded_tags"]])
-                http_query += f" {excluded_tags}"
+        except Exception as e:
+            print(f"❌ HahoMoe search failed: {e}")
+            return []
 
-            results = []
-            current_page = 1
-            has_next_page = True
+    async def async_search_anime(self, query, max_pages=5):
+        """Async variant of search_anime built on the shared transport."""
+        try:
+            print(f"🔍 Searching for '{query}' on HahoMoe...")
 
-            while has_next_page and current_page <= max_pages:
-                # Create the search URL with params for current page
-                url = f"{self.search_url}?page={current_page}&s={sort_param}&q={encoded_query}"
+            results = await async_collect_pages(
+                lambda n: run_async(self._listing_flow(self._build_search_url(query, n)), self._async_send),
+                1, max_pages, self.HOST,
+                key=lambda anime: anime['url']
+            )
 
-                # Add tag filters if present
-                if http_query:
-                    url += f"&q={urllib.parse.quote(http_query.strip())}"
+            print(f"Total results found: {len(results)}")
+            return results
 
-                print(f"Fetching HahoMoe search results page {current_page}...")
-                response = self.session.get(url, headers=self.headers)
+        except Exception as e:
+            print(f"❌ HahoMoe search failed: {e}")
+            return []
 
-                if response.status_code != 200:
-                    print(f"❌ Search failed with status code: {response.status_code}")
-                    break
+    def _cookies(self):
+        """Session cookies as a plain dict, for requests made through the shared transport."""
+        return self.session.cookies.get_dict()
+
+    def _get_request(self, url, headers=None):
+        """GET request for a flow, with the scraper's headers by default."""
+        return Request("GET", url, headers=headers or self.headers)
+
+    def _send(self, request):
+        """Send a flow's request with the blocking session."""
+        return self.session.request(request.method, request.url, **request.kwargs)
+
+    async def _async_send(self, request):
+        """Send a flow's request through the shared transport, with the session's cookies."""
+        return await get_transport().request(request.method, request.url, cookies=self._cookies(), **request.kwargs)
+
+    def _build_search_url(self, query, page):
+        """Build the search URL for a page, including sort and tag filters."""
+        # Build search parameters from active filters
+        search_params = self._get_search_parameters()
+        order_by, ordering = search_params[2], search_params[3]
+        sort_param = f"{order_by}{ordering}"
+
+        # Encode the query for the URL
+        encoded_query = urllib.parse.quote(query)
+
+        # Prepare tag filters
+        http_query = ""
+        if self.active_filters["included_tags"]:
+            included_tags = " ".join([f'genre:{tag}' for tag in self.active_filters["included_tags"]])
+            http_query += f" {included_tags}"
+
+        if self.active_filters["excluded_tags"]:
+            excluded_tags = " ".join([f'-genre:{tag}' for tag in self.active_filters["excluded_tags"]])
+            http_query += f" {excluded_tags}"
+
+        url = f"{self.search_url}?page={page}&s={sort_param}&q={encoded_query}"
+
+        # Add tag filters if present
+        if http_query:
+            url += f"&q={urllib.parse.quote(http_query.strip())}"
+
+        return url
+
+    def _has_next_page(self, soup):
+        """Check the pagination element for a next page link."""
+        return soup.select_one('ul.pagination li.page-item a[rel=next]') is not None
+
+    def _total_pages(self, soup):
+        """Highest page number linked from the pagination element, if any."""
+        pages = []
+        for link in soup.select('ul.pagination li.page-item a'):
+            match = re.search(r'[?&]page=(\d+)', link.get('href', ''))
+            if match:
+                pages.append(int(match.group(1)))
+            elif link.text.strip().isdigit():
+                pages.append(int(link.text.strip()))
+        return max(pages) if pages else None
+
+    def _listing_flow(self, url):
+        """Fetch and parse one listing page along with its pagination info."""
+        response = yield self._get_request(url)
+        if response.status_code != 200:
+            raise Exception(f"Status code {response.status_code} for {url}")
+        return self._listing_page_data(response.text)
+
+    def _listing_upstream_page(self, url):
+        return run_sync(self._listing_flow(url), self._send)
+
+    def _listing_page_data(self, html):
+        """Anime cards and pagination info of a listing page."""
+        soup = make_soup(html, parse_only=LISTING_ELEMENTS)
+        results = self._parse_anime_list(soup)
+        has_next_page = self._has_next_page(soup)
+
+        return {
+            "results": results,
+            "hasNextPage": has_next_page,
+            "totalPages": self._total_pages(soup),
+            # Only a full page tells us the page size
+            "perPage": len(results) if has_next_page and results else None,
+        }
 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                search_results = soup.select('ul.anime-loop.loop > li > a')
+    def _collect_listing(self, page_url, first_page, max_pages):
+        """Fetch up to max_pages listing pages starting at first_page.
 
-                if not search_results:
-                    print(f"No results found on page {current_page}.")
-                    break
+        The first page gives the page count, the rest are fetched concurrently
+        and merged in order without duplicates.
+        """
+        return collect_pages(
+            lambda upstream_page: self._listing_upstream_page(page_url(upstream_page)),
+            first_page, max_pages, self.HOST,
+            key=lambda anime: anime['url']
+        )
 
-                # Process results on this page
-                page_results_count = 0
-                for result in search_results:
-                    try:
-                        title_elem = result.select_one('div.label > span, div span.thumb-title')
-                        title = title_elem.text.strip() if title_elem else "Unknown Title"
-                        url = result.get('href')
-                        full_url = self.base_url + url if not url.startswith('http') else url
-
-                        # Get the poster image
-                        poster_elem = result.select_one('img')
-                        poster = poster_elem.get('src') if poster_elem else "No poster available"
-
-                        # Try to get type and year if available
-                        additional_info = result.select_one('div.fd-infor')
-                        anime_type = "Unknown"
-                        year = "Unknown"
-
-                        if additional_info:
-                            type_elem = additional_info.select_one('.fdi-item:nth-child(1)')
-                            year_elem = additional_info.select_one('.fdi-item:nth-child(2)')
-
-                            if type_elem:
-                                anime_type = type_elem.text.strip()
-                            if year_elem:
-                                year = year_elem.text.strip()
-
-                        # Add source identifier to differentiate from other results
-                        results.append({
-                            'id': url.split('/')[-1],
-                            'title': f"{title} [HahoMoe]",
-                            'url': full_url + "?s=srt-d",  # Add sort parameter
-                            'poster': poster,
-                            'type': anime_type,
-                            'year': year,
-                            'source': 'hahomoe'
-                        })
-                        page_results_count += 1
-                    except Exception as e:
-                        print(f"Error processing a HahoMoe result: {e}")
-                        continue
-
-                print(f"Found {page_results_count} results on page {current_page}")
-
-                # Check if there's a next page
-                next_page_link = soup.select_one('ul.pagination li.page-item a[rel=next]')
-                if next_page_link:
-                    current_page += 1
-                else:
-                    has_next_page = False
+    def _listing_window(self, page_url, page, limit):
+        """Fetch the listing pages covering API page `page` of size `limit`.
 
-            print(f"Total results found: {len(results)}")
-            return results
+        page_url(n) builds the URL of upstream page n.
+        """
+        try:
+            window = fetch_window(
+                lambda upstream_page: self._listing_upstream_page(page_url(upstream_page)),
+                page, limit, self.upstream_page_size, host=self.HOST,
+                key=lambda anime: anime['url']
+            )
+            self.upstream_page_size = window.pop("perPage")
+            return window
 
         except Exception as e:
-            print(f"❌ HahoMoe search failed: {e}")
-            return []
-
-    def get_anime_details(self, url):
-        """Get detailed information about an anime"""
+            print(f"❌ Error fetching HahoMoe page {page}: {e}")
+            return {"results": [], "totalResults": 0, "hasNextPage": False}
+
+    def search_anime_page(self, query, page=1, limit=20):
+        """Search for anime, fetching only the upstream pages needed for (page, limit)."""
+        print(f"🔍 Searching for '{query}' on HahoMoe (page {page}, limit {limit})...")
+        return self._listing_window(lambda n: self._build_search_url(query, n), page, limit)
+
+    def get_popular_anime_page(self, page=1, limit=20):
+        """Get one page of popular anime (sorted by views)."""
+        print(f"💫 Getting popular anime from HahoMoe (page {page}, limit {limit})...")
+        return self._listing_window(lambda n: f"{self.base_url}/anime?s=vdy-d&page={n}", page, limit)
+
+    def get_latest_anime_page(self, page=1, limit=20):
+        """Get one page of latest anime (sorted by release date)."""
+        print(f"🆕 Getting latest anime from HahoMoe (page {page}, limit {limit})...")
+        return self._listing_window(lambda n: f"{self.base_url}/anime?s=rel-d&page={n}", page, limit)
+
+    def _parse_anime_list(self, soup):
+        """Parse the anime cards of a search or listing page."""
+        results = []
+        for anime in soup.select('ul.anime-loop.loop > li > a'):
+            try:
+                title_elem = anime.select_one('div.label > span, div span.thumb-title')
+                title = title_elem.text.strip() if title_elem else "Unknown Title"
+                url = anime.get('href')
+                full_url = self.base_url + url if not url.startswith('http') else url
+
+                # Get the poster image
+                poster_elem = anime.select_one('img')
+                poster = poster_elem.get('src') if poster_elem else "No poster available"
+
+                # Try to get type and year if available
+                additional_info = anime.select_one('div.fd-infor')
+                anime_type = "Unknown"
+                year = "Unknown"
+
+                if additional_info:
+                    type_elem = additional_info.select_one('.fdi-item:nth-child(1)')
+                    year_elem = additional_info.select_one('.fdi-item:nth-child(2)')
+
+                    if type_elem:
+                        anime_type = type_elem.text.strip()
+                    if year_elem:
+                        year = year_elem.text.strip()
+
+                # Add source identifier to differentiate from other results
+                results.append({
+                    'id': url.split('/')[-1],
+                    'title': f"{title} [HahoMoe]",
+                    'url': full_url + "?s=srt-d",  # Add sort parameter
+                    'poster': poster,
+                    'type': anime_type,
+                    'year': year,
+                    'source': 'hahomoe'
+                })
+            except Exception as e:
+                print(f"Error processing a HahoMoe result: {e}")
+                continue
+
+        return results
+
+    def _details_flow(self, url):
+        """Request flow of get_anime_details and async_get_anime_details (see scraper_utils.request_flow)."""
         try:
             print(f"📝 Getting details for {url} from HahoMoe...")
-            response = self.session.get(url, headers=self.headers)
+            response = yield self._get_request(url)
 
             if response.status_code != 200:
                 print(f"❌ Failed to get anime details: Status code {response.status_code}")
                 return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Get anime ID from URL
-            anime_id = url.split("/")[-1].split("?")[0]
-
-            # Get poster image
-            poster = soup.select_one('img.cover-image.img-thumbnail')
-            poster_url = poster.get('src') if poster else "No poster available"
-
-            # Get anime title
-            title = soup.select_one('li.breadcrumb-item.active')
-            title_text = title.text.strip() if title else "Unknown Title"
-
-            # Get synopsis/description
-            description = soup.select_one('div.card-body')
-            description_text = description.text.strip() if description else "No description available"
-
-            # Get additional info
-            info_div = soup.select_one('div.anisc-info')
-            info = {}
-            if info_div:
-                for item in info_div.select('div.item'):
-                    label = item.select_one('span.item-head')
-                    value = item.select_one('span.name') or item.select_one('div.text')
-                    if label and value:
-                        info[label.text.strip()] = value.text.strip()
-
-            # Get genres
-            genres = []
-            genre_elements = soup.select('li.genre span.value, div.genre-tree ul > li > a')
-            for genre_elem in genre_elements:
-                genres.append(genre_elem.text.strip())
-
-            return {
-                'id': anime_id,
-                'url': url,
-                'title': f"{title_text} [HahoMoe]",
-                'poster': poster_url,
-                'description': description_text,
-                'info': info,
-                'genres': ", ".join(genres),
-                'source': 'hahomoe'
-            }
+            return self._parse_anime_details(response.text, url)
 
         except Exception as e:
             print(f"❌ Failed to get anime details from HahoMoe: {e}")
             return None
 
-    def get_episodes(self, anime_details):
-        """Get episode list for an anime"""
+    def get_anime_details(self, url):
+        """Get detailed information about an anime"""
+        return run_sync(self._details_flow(url), self._send)
+
+    async def async_get_anime_details(self, url):
+        """Async variant of get_anime_details built on the shared transport."""
+        return await run_async(self._details_flow(url), self._async_send)
+
+    def _parse_anime_details(self, html, url):
+        """Parse an anime page into the details format"""
+        soup = make_soup(html)
+
+        # Get anime ID from URL
+        anime_id = url.split("/")[-1].split("?")[0]
+
+        # Get poster image
+        poster = soup.select_one('img.cover-image.img-thumbnail')
+        poster_url = poster.get('src') if poster else "No poster available"
+
+        # Get anime title
+        title = soup.select_one('li.breadcrumb-item.active')
+        title_text = title.text.strip() if title else "Unknown Title"
+
+        # Get synopsis/description
+        description = soup.select_one('div.card-body')
+        description_text = description.text.strip() if description else "No description available"
+
+        # Get additional info
+        info_div = soup.select_one('div.anisc-info')
+        info = {}
+        if info_div:
+            for item in info_div.select('div.item'):
+                label = item.select_one('span.item-head')
+                value = item.select_one('span.name') or item.select_one('div.text')
+                if label and value:
+                    info[label.text.strip()] = value.text.strip()
+
+        # Get genres
+        genres = []
+        genre_elements = soup.select('li.genre span.value, div.genre-tree ul > li > a')
+        for genre_elem in genre_elements:
+            genres.append(genre_elem.text.strip())
+
+        return {
+            'id': anime_id,
+            'url': url,
+            'title': f"{title_text} [HahoMoe]",
+            'poster': poster_url,
+            'description': description_text,
+            'info': info,
+            'genres': ", ".join(genres),
+            'source': 'hahomoe'
+        }
+
+    def _episodes_flow(self, anime_details):
+        """Request flow of get_episodes and async_get_episodes (see scraper_utils.request_flow)."""
         if not anime_details or 'url' not in anime_details:
             print("❌ Invalid anime details. Cannot get episodes.")
             return []
@@ -212,188 +336,220 @@ class HahoMoeSearcher:
             print(f"🎬 Getting episodes for anime from HahoMoe...")
 
             # First, get the page content
-            response = self.session.get(anime_url, headers=self.headers)
+            response = yield self._get_request(anime_url)
 
             if response.status_code != 200:
                 print(f"❌ Failed to get anime page: Status code {response.status_code}")
                 return []
 
-            # Process the first page
-            soup = BeautifulSoup(response.text, 'html.parser')
-            has_more_pages = True
             current_page = 1
+            while True:
+                page_episodes, next_page_url = self._parse_episode_page(response.text)
+                episodes.extend(page_episodes)
 
-            while has_more_pages:
-                # Get all episodes on current page
-                ep_elements = soup.select('ul.episode-loop > li > a')
-
-                for ep in ep_elements:
-                    try:
-                        ep_url = ep.get('href', '')
-                        if ep_url and not ep_url.startswith(('http://', 'https://')):
-                            ep_url = self.base_url + ep_url
-
-                        # Extract episode number
-                        ep_num_elem = ep.select_one('div.episode-number, div.episode-slug')
-                        ep_num_str = ep_num_elem.text.strip() if ep_num_elem else "Episode"
-                        ep_num = ep_num_str.replace("Episode ", "").strip()
-
-                        # Extract episode title
-                        ep_title_elem = ep.select_one('div.episode-label, div.episode-title')
-                        ep_title = ep_title_elem.text.strip() if ep_title_elem else ""
-
-                        if ep_title.lower() == "no title":
-                            ep_title = ""
-
-                        # Extract thumbnail if available
-                        thumbnail = ""
-                        if 'data-thumbnail' in ep.attrs:
-                            thumbnail = ep.get('data-thumbnail')
-
-                        # Extract date
-                        date_elem = ep.select_one('div.date')
-                        date = date_elem.text.strip() if date_elem else ""
-
-                        # Format the episode title
-                        full_title = f"Ep. {ep_num}"
-                        if ep_title:
-                            full_title += f": {ep_title}"
-
-                        episodes.append({
-                            'number': ep_num,
-                            'title': full_title,
-                            'url': ep_url,
-                            'thumbnail': thumbnail,
-                            'date': date,
-                            'source': 'hahomoe'
-                        })
-                    except Exception as e:
-                        print(f"Error processing an episode from HahoMoe: {e}")
-                        continue
-
-                # Check if there's a next page
-                next_page_link = soup.select_one('ul.pagination li.page-item a[rel=next]')
-
-                if next_page_link:
-                    next_page_url = next_page_link.get('href')
-                    if not next_page_url.startswith(('http://', 'https://')):
-                        next_page_url = self.base_url + next_page_url
-
-                    # Get the next page
-                    current_page += 1
-                    print(f"Loading episode page {current_page}...")
-
-                    response = self.session.get(next_page_url, headers=self.headers)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                    else:
-                        print(f"Failed to get next episode page: Status code {response.status_code}")
-                        has_more_pages = False
-                else:
-                    has_more_pages = False
-
-            # Sort episodes by number (descending)
-            episodes.sort(key=lambda x: float(x['number']) if x['number'].replace('.', '', 1).isdigit() else 0, reverse=True)
-
-            return episodes
+                if not next_page_url:
+                    break
+
+                # Get the next page
+                current_page += 1
+                print(f"Loading episode page {current_page}...")
+
+                response = yield self._get_request(next_page_url)
+                if response.status_code != 200:
+                    print(f"Failed to get next episode page: Status code {response.status_code}")
+                    break
+
+            return self._sort_episodes(episodes)
 
         except Exception as e:
             print(f"❌ Failed to get episodes from HahoMoe: {e}")
             return []
 
-    def get_video_sources(self, episode_url):
-        """Get video sources for a specific episode"""
+    def get_episodes(self, anime_details):
+        """Get episode list for an anime"""
+        return run_sync(self._episodes_flow(anime_details), self._send)
+
+    async def async_get_episodes(self, anime_details):
+        """Async variant of get_episodes built on the shared transport."""
+        return await run_async(self._episodes_flow(anime_details), self._async_send)
+
+    def _parse_episode_page(self, html):
+        """Parse one page of an anime's episode list.
+
+        Returns the episodes and the absolute URL of the next page (or None).
+        """
+        soup = make_soup(html, parse_only=EPISODE_LIST_ELEMENTS)
+        episodes = []
+
+        # Get all episodes on current page
+        for ep in soup.select('ul.episode-loop > li > a'):
+            try:
+                ep_url = ep.get('href', '')
+                if ep_url and not ep_url.startswith(('http://', 'https://')):
+                    ep_url = self.base_url + ep_url
+
+                # Extract episode number
+                ep_num_elem = ep.select_one('div.episode-number, div.episode-slug')
+                ep_num_str = ep_num_elem.text.strip() if ep_num_elem else "Episode"
+                ep_num = ep_num_str.replace("Episode ", "").strip()
+
+                # Extract episode title
+                ep_title_elem = ep.select_one('div.episode-label, div.episode-title')
+                ep_title = ep_title_elem.text.strip() if ep_title_elem else ""
+
+                if ep_title.lower() == "no title":
+                    ep_title = ""
+
+                # Extract thumbnail if available
+                thumbnail = ""
+                if 'data-thumbnail' in ep.attrs:
+                    thumbnail = ep.get('data-thumbnail')
+
+                # Extract date
+                date_elem = ep.select_one('div.date')
+                date = date_elem.text.strip() if date_elem else ""
+
+                # Format the episode title
+                full_title = f"Ep. {ep_num}"
+                if ep_title:
+                    full_title += f": {ep_title}"
+
+                episodes.append({
+                    'number': ep_num,
+                    'title': full_title,
+                    'url': ep_url,
+                    'thumbnail': thumbnail,
+                    'date': date,
+                    'source': 'hahomoe'
+                })
+            except Exception as e:
+                print(f"Error processing an episode from HahoMoe: {e}")
+                continue
+
+        # Check if there's a next page
+        next_page_url = None
+        next_page_link = soup.select_one('ul.pagination li.page-item a[rel=next]')
+        if next_page_link:
+            next_page_url = next_page_link.get('href')
+            if not next_page_url.startswith(('http://', 'https://')):
+                next_page_url = self.base_url + next_page_url
+
+        return episodes, next_page_url
+
+    def _sort_episodes(self, episodes):
+        """Sort episodes by number (descending)"""
+        episodes.sort(key=lambda x: float(x['number']) if x['number'].replace('.', '', 1).isdigit() else 0, reverse=True)
+        return episodes
+
+    def _video_sources_flow(self, episode_url):
+        """Request flow of get_video_sources and async_get_video_sources (see scraper_utils.request_flow)."""
         try:
             print(f"🎥 Extracting video sources from HahoMoe episode...")
 
             # Get the episode page content
-            response = self.session.get(episode_url, headers=self.headers)
+            response = yield self._get_request(episode_url)
 
             if response.status_code != 200:
                 print(f"❌ Failed to get episode page: Status code {response.status_code}")
                 return []
 
-            # Parse the page to find the iframe
-            soup = BeautifulSoup(response.text, 'html.parser')
-            iframe = soup.select_one('iframe')
-
-            if not iframe or not iframe.get('src'):
+            iframe_url = self._parse_iframe_url(response.text)
+            if not iframe_url:
                 print("❌ No iframe found on episode page")
                 return []
 
-            iframe_url = iframe.get('src')
-
             # Add referer header for the iframe request
             iframe_headers = self.headers.copy()
             iframe_headers['Referer'] = episode_url
 
             # Get the iframe content
-            iframe_response = self.session.get(iframe_url, headers=iframe_headers)
+            iframe_response = yield self._get_request(iframe_url, headers=iframe_headers)
 
             if iframe_response.status_code != 200:
                 print(f"❌ Failed to get iframe content: Status code {iframe_response.status_code}")
                 return []
 
-            # Parse the iframe to find video sources
-            iframe_soup = BeautifulSoup(iframe_response.text, 'html.parser')
-            sources = iframe_soup.select('source')
-
-            if not sources:
-                print("❌ No video sources found in iframe")
-                return []
-
-            video_sources = []
-            # Extract episode title from the URL to use in the file
-            episode_info = episode_url.split('/')[-1].split('?')[0]
-
-            # Store all available qualities
-            available_qualities = {
-                "1080p": None,
-                "720p": None,
-                "480p": None,
-                "360p": None
-            }
-
-            # First pass to collect all available qualities
-            for source in sources:
-                src = source.get('src')
-                title = source.get('title', 'Unknown')
-
-                if src and title in available_qualities:
-                    available_qualities[title] = src
-
-            # Open urls.txt file to append the stream URLs
-            with open('urls.txt', 'a') as url_file:
-                url_file.write(f"\n==== HahoMoe: {episode_info} ====\n")
-
-                # Add all available qualities to the video sources
-                for quality, url in available_qualities.items():
-                    if url:
-                        video_sources.append({
-                            'url': url,
-                            'quality': quality,
-                            'source': 'hahomoe'
-                        })
-
-                        # Write to the urls.txt file
-                        url_file.write(f"{quality}: {url}\n")
-
-                # Sort video sources by quality (highest first)
-                video_sources.sort(key=lambda x: {
-                    "1080p": 4,
-                    "720p": 3, 
-                    "480p": 2, 
-                    "360p": 1
-                }.get(x['quality'], 0), reverse=True)
-
-                print(f"✅ Saved {len(video_sources)} stream URLs with all available qualities to urls.txt")
-
-            return video_sources
+            return self._parse_video_sources(iframe_response.text, episode_url)
 
         except Exception as e:
             print(f"❌ Failed to get video sources from HahoMoe: {e}")
             return []
 
+    def get_video_sources(self, episode_url):
+        """Get video sources for a specific episode"""
+        return run_sync(self._video_sources_flow(episode_url), self._send)
+
+    async def async_get_video_sources(self, episode_url):
+        """Async variant of get_video_sources built on the shared transport."""
+        return await run_async(self._video_sources_flow(episode_url), self._async_send)
+
+    def _parse_iframe_url(self, html):
+        """Find the player iframe URL on an episode page"""
+        soup = make_soup(html)
+        iframe = soup.select_one('iframe')
+
+        if not iframe or not iframe.get('src'):
+            return None
+
+        return iframe.get('src')
+
+    def _parse_video_sources(self, iframe_html, episode_url):
+        """Parse the player iframe's <source> tags into video sources"""
+        iframe_soup = make_soup(iframe_html)
+        sources = iframe_soup.select('source')
+
+        if not sources:
+            print("❌ No video sources found in iframe")
+            return []
+
+        video_sources = []
+        # Extract episode title from the URL to use in the file
+        episode_info = episode_url.split('/')[-1].split('?')[0]
+
+        # Store all available qualities
+        available_qualities = {
+            "1080p": None,
+            "720p": None,
+            "480p": None,
+            "360p": None
+        }
+
+        # First pass to collect all available qualities
+        for source in sources:
+            src = source.get('src')
+            title = source.get('title', 'Unknown')
+
+            if src and title in available_qualities:
+                available_qualities[title] = src
+
+        # Open urls.txt file to append the stream URLs
+        with open('urls.txt', 'a') as url_file:
+            url_file.write(f"\n==== HahoMoe: {episode_info} ====\n")
+
+            # Add all available qualities to the video sources
+            for quality, url in available_qualities.items():
+                if url:
+                    video_sources.append({
+                        'url': url,
+                        'quality': quality,
+                        'source': 'hahomoe'
+                    })
+
+                    # Write to the urls.txt file
+                    url_file.write(f"{quality}: {url}\n")
+
+            # Sort video sources by quality (highest first)
+            video_sources.sort(key=lambda x: {
+                "1080p": 4,
+                "720p": 3, 
+                "480p": 2, 
+                "360p": 1
+            }.get(x['quality'], 0), reverse=True)
+
+            print(f"✅ Saved {len(video_sources)} stream URLs with all available qualities to urls.txt")
+
+        return video_sources
+
     # === New methods for filtering and sorting ===
 
     def _get_search_parameters(self, filters=None):
@@ -493,82 +649,12 @@ class HahoMoeSearcher:
         """Get popular anime (sorted by views)"""
         print(f"💫 Getting popular anime from HahoMoe starting from page {page}...")
 
-        all_results = []
-
         try:
             # Use views descending for popular
             self.active_filters["order_by"] = "vdy"
             self.active_filters["ordering"] = "-d"
 
-            current_page = page
-            has_next_page = True
-
-            while has_next_page and current_page < page + max_pages:
-                # Popular anime URL
-                url = f"{self.base_url}/anime?s=vdy-d&page={current_page}"
-
-                print(f"Fetching popular anime page {current_page}...")
-                response = self.session.get(url, headers=self.headers)
-
-                if response.status_code != 200:
-                    print(f"❌ Failed to get popular anime: Status code {response.status_code}")
-                    break
-
-                soup = BeautifulSoup(response.text, 'html.parser')
-                anime_elements = soup.select('ul.anime-loop.loop > li > a')
-
-                if not anime_elements:
-                    print(f"No anime found on page {current_page}")
-                    break
-
-                page_results_count = 0
-                for anime in anime_elements:
-                    try:
-                        title_elem = anime.select_one('div.label > span, div span.thumb-title')
-                        title = title_elem.text.strip() if title_elem else "Unknown Title"
-                        url = anime.get('href')
-                        full_url = self.base_url + url if not url.startswith('http') else url
-
-                        # Get the poster image
-                        poster_elem = anime.select_one('img')
-                        poster = poster_elem.get('src') if poster_elem else "No poster available"
-
-                        # Try to get type and year if available
-                        additional_info = anime.select_one('div.fd-infor')
-                        anime_type = "Unknown"
-                        year = "Unknown"
-
-                        if additional_info:
-                            type_elem = additional_info.select_one('.fdi-item:nth-child(1)')
-                            year_elem = additional_info.select_one('.fdi-item:nth-child(2)')
-
-                            if type_elem:
-                                anime_type = type_elem.text.strip()
-                            if year_elem:
-                                year = year_elem.text.strip()
-
-                        all_results.append({
-                            'id': url.split('/')[-1],
-                            'title': f"{title} [HahoMoe]",
-                            'url': full_url + "?s=srt-d",
-                            'poster': poster,
-                            'type': anime_type,
-                            'year': year,
-                            'source': 'hahomoe'
-                        })
-                        page_results_count += 1
-                    except Exception as e:
-                        print(f"Error processing popular anime result: {e}")
-                        continue
-
-                print(f"Found {page_results_count} popular anime on page {current_page}")
-
-                # Check if there's a next page
-                next_page_link = soup.select_one('ul.pagination li.page-item a[rel=next]')
-                if next_page_link:
-                    current_page += 1
-                else:
-                    has_next_page = False
+            all_results = self._collect_listing(lambda n: f"{self.base_url}/anime?s=vdy-d&page={n}", page, max_pages)
 
             print(f"Total popular anime found: {len(all_results)}")
             return all_results
@@ -581,78 +667,8 @@ class HahoMoeSearcher:
         """Get latest anime (sorted by release date)"""
         print(f"🆕 Getting latest anime from HahoMoe starting from page {page}...")
 
-        all_results = []
-
         try:
-            current_page = page
-            has_next_page = True
-
-            while has_next_page and current_page < page + max_pages:
-                # Latest anime URL (sorted by release date)
-                url = f"{self.base_url}/anime?s=rel-d&page={current_page}"
-
-                print(f"Fetching latest anime page {current_page}...")
-                response = self.session.get(url, headers=self.headers)
-
-                if response.status_code != 200:
-                    print(f"❌ Failed to get latest anime: Status code {response.status_code}")
-                    break
-
-                soup = BeautifulSoup(response.text, 'html.parser')
-                anime_elements = soup.select('ul.anime-loop.loop > li > a')
-
-                if not anime_elements:
-                    print(f"No anime found on page {current_page}")
-                    break
-
-                page_results_count = 0
-                for anime in anime_elements:
-                    try:
-                        title_elem = anime.select_one('div.label > span, div span.thumb-title')
-                        title = title_elem.text.strip() if title_elem else "Unknown Title"
-                        url = anime.get('href')
-                        full_url = self.base_url + url if not url.startswith('http') else url
-
-                        # Get the poster image
-                        poster_elem = anime.select_one('img')
-                        poster = poster_elem.get('src') if poster_elem else "No poster available"
-
-                        # Try to get type and year if available
-                        additional_info = anime.select_one('div.fd-infor')
-                        anime_type = "Unknown"
-                        year = "Unknown"
-
-                        if additional_info:
-                            type_elem = additional_info.select_one('.fdi-item:nth-child(1)')
-                            year_elem = additional_info.select_one('.fdi-item:nth-child(2)')
-
-                            if type_elem:
-                                anime_type = type_elem.text.strip()
-                            if year_elem:
-                                year = year_elem.text.strip()
-
-                        all_results.append({
-                            'id': url.split('/')[-1],
-                            'title': f"{title} [HahoMoe]",
-                            'url': full_url + "?s=srt-d",
-                            'poster': poster,
-                            'type': anime_type,
-                            'year': year,
-                            'source': 'hahomoe'
-                        })
-                        page_results_count += 1
-                    except Exception as e:
-                        print(f"Error processing latest anime result: {e}")
-                        continue
-
-                print(f"Found {page_results_count} latest anime on page {current_page}")
-
-                # Check if there's a next page
-                next_page_link = soup.select_one('ul.pagination li.page-item a[rel=next]')
-                if next_page_link:
-                    current_page += 1
-                else:
-                    has_next_page = False
+            all_results = self._collect_listing(lambda n: f"{self.base_url}/anime?s=rel-d&page={n}", page, max_pages)
 
             print(f"Total latest anime found: {len(all_results)}")
             return all_results
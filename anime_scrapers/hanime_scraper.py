@@ -1,9 +1,32 @@
-import time
 import json
 import re
 import requests
 from typing import Dict, Any, List, Optional
-from bs4 import BeautifulSoup
+from scraper_utils.html_parser import make_soup
+from scraper_utils.http_transport import get_transport
+from scraper_utils.fanout import collect_pages, fetch_pages, unique
+from scraper_utils.request_flow import Blocking, Request, run_async, run_sync
+from scraper_utils.ttl_cache import TTLCache
+from scraper_utils.expiry import streams_ttl
+
+# The /api/v8/video JSON holds a video's details, its franchise's episodes
+# and its stream manifest, so one fetch per video serves details, episodes
+# and get-episode. Entries are keyed by both the slug and the numeric id
+# (episode urls use the id) and never outlive the manifest's stream urls.
+VIDEO_TTL = 30 * 60
+video_cache = TTLCache("hanime-videos", ttl=VIDEO_TTL, max_entries=1024)
+
+
+# Raw search pages, so consecutive windows of a listing (see
+# _grouped_search_hits) don't request the pages before them again
+SEARCH_PAGES_TTL = 5 * 60
+search_pages_cache = TTLCache("hanime-search-pages", ttl=SEARCH_PAGES_TTL, max_entries=512)
+
+
+def _video_ttl(video_data):
+    streams = [stream for server in (video_data.get('videos_manifest') or {}).get('servers', [])
+               for stream in server.get('streams', [])]
+    return streams_ttl(streams, VIDEO_TTL)
 
 class Track:
     def __init__(self, url: str, lang: str):
@@ -24,7 +47,10 @@ class HanimeScraper:
 
     # Constants
     PAGE_SIZE = 26
+    # Hits per page of the search API (it also reports this as hitsPerPage)
+    SEARCH_HITS_PER_PAGE = 48
     SEARCH_URL = "https://search.htv-services.com/"
+    SEARCH_HOST = "search.htv-services.com"
     BASE_URL = "https://hanime.tv"
 
     # Preferences
@@ -57,6 +83,9 @@ class HanimeScraper:
             "preferred_quality": self.PREF_QUALITY_DEFAULT
         }
 
+        # Learned from the search API responses
+        self.upstream_page_size = self.SEARCH_HITS_PER_PAGE
+
         # Load all available tags
         self.available_tags = self.get_tags()
         self.available_brands = self.get_brands()
@@ -235,19 +264,24 @@ class HanimeScraper:
             else:
                 return title.strip()
 
-    def search_anime(self, query="", page=1, filters=None):
-        """Search for anime, similar to Kotlin's searchAnime."""
+    def _send(self, request):
+        """Send a flow's request with the blocking session."""
+        return self.session.request(request.method, request.url, **request.kwargs)
+
+    async def _async_send(self, request):
+        """Send a flow's request through the shared transport."""
+        return await get_transport().request(request.method, request.url, **request.kwargs)
+
+    def _search_flow(self, query, page, filters):
+        """Request flow of search_anime and async_search_anime (see scraper_utils.request_flow)."""
         print(f"🔍 Searching hanime for: '{query}'")
 
         results = []
         try:
-            data = {
-                "variables": {},
-                "query": ""
-            }
             data = self.search_request_body(query, page, filters)
 
-            response = self.session.post(
+            response = yield Request(
+                "POST",
                 self.SEARCH_URL,
                 headers=self.search_headers,
                 json=data,
@@ -265,6 +299,14 @@ class HanimeScraper:
             print(f"❌ Error searching hanime: {e}")
             return []
 
+    def search_anime(self, query="", page=1, filters=None):
+        """Search for anime, similar to Kotlin's searchAnime."""
+        return run_sync(self._search_flow(query, page, filters), self._send)
+
+    async def async_search_anime(self, query="", page=1, filters=None):
+        """Async variant of search_anime built on the shared transport."""
+        return await run_async(self._search_flow(query, page, filters), self._async_send)
+
     def _parse_search_json(self, response_data):
         """Parse search JSON response similar to Kotlin's parseSearchJson."""
         anime_list = []
@@ -272,8 +314,11 @@ class HanimeScraper:
         if not response_data:
             return anime_list
 
-        response = response_data
-        array = json.loads(response.get('hits', '[]'))
+        return self._parse_hits(json.loads(response_data.get('hits', '[]')))
+
+    def _parse_hits(self, array):
+        """Convert raw search hits to anime entries, keeping one entry per title."""
+        anime_list = []
 
         # Group by title and take first item of each group
         grouped_items = {}
@@ -307,103 +352,276 @@ class HanimeScraper:
                 'source': 'hanime',
             })
 
-        # Check for pagination
-        has_next_page = response.get('page', 0) < response.get('nbPages', 1) - 1
-
         return anime_list
 
-    def get_anime_details(self, url):
-        """Get anime details, similar to Kotlin's animeDetailsParse."""
-        print(f"📊 Getting anime details from hanime for URL: {url}")
+    def _search_upstream_page(self, query, upstream_page, filters=None):
+        """Fetch one page of raw search hits plus the pagination metadata."""
+        response = self.session.post(
+            self.SEARCH_URL,
+            headers=self.search_headers,
+            json=self.search_request_body(query, upstream_page, filters),
+            timeout=15
+        )
+        response.raise_for_status()
+        response_data = response.json()
 
-        try:
-            full_url = f"{self.BASE_URL}{url}"
-            response = self.session.get(full_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+        return {
+            "results": json.loads(response_data.get('hits', '[]')),
+            "hasNextPage": response_data.get('page', 0) < response_data.get('nbPages', 1) - 1,
+            "totalPages": response_data.get('nbPages'),
+            "totalResults": response_data.get('nbHits'),
+            "perPage": response_data.get('hitsPerPage'),
+        }
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+    def _cached_search_page(self, query, upstream_page, filters=None):
+        """_search_upstream_page through search_pages_cache, keyed by the request body."""
+        key = json.dumps(self.search_request_body(query, upstream_page, filters), sort_keys=True)
+        return search_pages_cache.get_or_load(key, lambda: self._search_upstream_page(query, upstream_page, filters))
 
-            title = self._get_title(soup.select_one("h1.tv-title").text)
-            thumbnail_url = soup.select_one("img.hvpi-cover").get("src")
-            author = soup.select_one("a.hvpimbc-text").text if soup.select_one("a.hvpimbc-text") else ""
+    def _grouped_search_hits(self, query, count, filters=None):
+        """The first `count` search hits grouped by title, as _parse_hits keeps them.
 
-            # Get description
-            description_elements = soup.select("div.hvpist-description p")
-            description = "\n\n".join([el.text for el in description_elements]) if description_elements else ""
+        A title sits where its first hit is, so grouping needs every upstream
+        page before a window. Pages are read from 1 until `count` titles are
+        grouped or upstream runs out, each batch sized for the titles still
+        missing and fetched concurrently.
+        Returns (hits, exhausted, raw hits read, upstream nbHits).
+        """
+        seen = set()
+        title_of = lambda hit: self._get_title(hit.get('name', ''))
+        first = self._cached_search_page(query, 1, filters)
+        self.upstream_page_size = first.get("perPage") or self.upstream_page_size
+        hits = unique(first["results"], title_of, seen)
+        raw = len(first["results"])
+        exhausted = not first["hasNextPage"] or not first["results"]
+        next_page = 2
+
+        while not exhausted and len(hits) < count:
+            last = next_page + -(-(count - len(hits)) // self.upstream_page_size) - 1
+            if first.get("totalPages"):
+                last = min(last, int(first["totalPages"]))
+            if last < next_page:
+                exhausted = True
+                break
+            pages = fetch_pages(lambda n: self._cached_search_page(query, n, filters),
+                                range(next_page, last + 1), self.SEARCH_HOST)
+            for _, data in pages:
+                raw += len(data["results"])
+                hits.extend(unique(data["results"], title_of, seen))
+                if not data["hasNextPage"] or not data["results"]:
+                    exhausted = True
+                    break
+            next_page = last + 1
 
-            # Get genres
-            genre_elements = soup.select("div.hvpis-text div.btn__content")
-            genres = ", ".join([el.text for el in genre_elements]) if genre_elements else ""
+        return hits, exhausted, raw, first.get("totalResults")
 
+    def _search_window(self, query, page, limit, filters=None):
+        """Fetch the search results for API page `page` of size `limit`.
+
+        Windows are cut from the hits grouped by title across pages (see
+        _grouped_search_hits), so every (page, limit), including the
+        upstream-page-sized ones main.stream_listing and cursor snapshots
+        ask for, lines up with the same list of titles. totalResults is exact
+        once upstream ran out and otherwise scales nbHits by the share of
+        hits that were distinct titles so far.
+        """
+        try:
+            end = page * limit
+            hits, exhausted, raw, total_hits = self._grouped_search_hits(query, end + 1, filters)
+            window = hits[end - limit:end]
+            total = len(hits)
+            if not exhausted and raw and total_hits:
+                total = max(total, round(int(total_hits) * len(hits) / raw))
             return {
-                'title': title,
-                'url': url,
-                'poster': thumbnail_url,
-                'description': description,
-                'author': author,
-                'genres': genres,
-                'info': {
-                    'Studio': author
-                },
-                'source': 'hanime'
+                "results": self._parse_hits(window),
+                "totalResults": total,
+                "hasNextPage": len(hits) > end,
             }
 
+        except Exception as e:
+            print(f"❌ Error fetching hanime page {page}: {e}")
+            return {"results": [], "totalResults": 0, "hasNextPage": False}
+
+    def search_anime_page(self, query="", page=1, limit=20, filters=None):
+        """Search for anime, fetching only the upstream pages needed for (page, limit)."""
+        print(f"🔍 Searching hanime for: '{query}' (page {page}, limit {limit})")
+        return self._search_window(query, page, limit, filters)
+
+    def _video_id(self, url):
+        """Slug or id of a video from a details url (/videos/hentai/{slug}) or an episode url (...?id={id})."""
+        if 'id=' in url:
+            return url.split('id=')[-1].split('&')[0]
+        return url.rstrip('/').split('/')[-1].split('?')[0]
+
+    def _video_api_url(self, video_id):
+        return f"{self.BASE_URL}/api/v8/video?id={video_id}"
+
+    def _cache_video(self, video_id, video_data):
+        """Store a v8 response under the id it was fetched by and the video's own slug and id."""
+        hentai_video = video_data.get('hentai_video') or {}
+        for key in {str(video_id), str(hentai_video.get('slug') or video_id), str(hentai_video.get('id') or video_id)}:
+            video_cache.set(key, video_data, ttl=_video_ttl)
+
+    def _video_flow(self, video_id):
+        """The v8 video JSON for a slug or id, from video_cache or hanime.tv."""
+        video_data = video_cache.get(str(video_id))
+        if video_data is None:
+            response = yield Request("GET", self._video_api_url(video_id), headers=self.headers, timeout=15)
+            response.raise_for_status()
+            video_data = response.json()
+            self._cache_video(video_id, video_data)
+        return video_data
+
+    def _parse_video_details(self, video_data, url):
+        """Anime details (with episodes) from a v8 video response."""
+        hentai_video = video_data.get('hentai_video') or {}
+        if not hentai_video.get('name'):
+            return None
+
+        description = hentai_video.get('description') or ''
+        # Paragraphs become blank lines, as on the video page
+        description = re.sub(r'</p>\s*<p[^>]*>', '\n\n', description)
+        description = re.sub(r'<[^>]*>', '', description).strip()
+        author = hentai_video.get('brand') or ''
+        genres = ", ".join(tag.get('text', '') for tag in hentai_video.get('hentai_tags') or [] if tag.get('text'))
+
+        return {
+            'title': self._get_title(hentai_video['name']),
+            'url': url,
+            'poster': hentai_video.get('cover_url') or hentai_video.get('poster_url'),
+            'description': description,
+            'author': author,
+            'genres': genres,
+            'info': {
+                'Studio': author
+            },
+            'source': 'hanime',
+            'episodes': self._parse_episodes_json(video_data, self._video_api_url(self._video_id(url)))
+        }
+
+    def _details_flow(self, url):
+        """Request flow of get_anime_details and async_get_anime_details (see scraper_utils.request_flow)."""
+        print(f"📊 Getting anime details from hanime for URL: {url}")
+
+        try:
+            details = self._parse_video_details((yield from self._video_flow(self._video_id(url))), url)
+            if details:
+                return details
+        except Exception as e:
+            print(f"⚠️ hanime v8 details failed, falling back to the video page: {e}")
+
+        try:
+            full_url = f"{self.BASE_URL}{url}"
+            response = yield Request("GET", full_url, headers=self.headers, timeout=15)
+            response.raise_for_status()
+
+            return self._parse_anime_details_html(response.text, url)
+
         except Exception as e:
             print(f"❌ Error getting anime details from hanime: {e}")
             return None
 
-    def get_episodes(self, anime_details):
-        """Get episode list, similar to Kotlin's episodeListParse."""
+    def get_anime_details(self, url):
+        """Get anime details, similar to Kotlin's animeDetailsParse.
+
+        Built from the v8 video JSON, falling back to the video page.
+        """
+        return run_sync(self._details_flow(url), self._send)
+
+    async def async_get_anime_details(self, url):
+        """Async variant of get_anime_details built on the shared transport."""
+        return await run_async(self._details_flow(url), self._async_send)
+
+    def _parse_anime_details_html(self, html, url):
+        """Parse the anime details out of a video page."""
+        soup = make_soup(html)
+
+        title = self._get_title(soup.select_one("h1.tv-title").text)
+        thumbnail_url = soup.select_one("img.hvpi-cover").get("src")
+        author = soup.select_one("a.hvpimbc-text").text if soup.select_one("a.hvpimbc-text") else ""
+
+        # Get description
+        description_elements = soup.select("div.hvpist-description p")
+        description = "\n\n".join([el.text for el in description_elements]) if description_elements else ""
+
+        # Get genres
+        genre_elements = soup.select("div.hvpis-text div.btn__content")
+        genres = ", ".join([el.text for el in genre_elements]) if genre_elements else ""
+
+        return {
+            'title': title,
+            'url': url,
+            'poster': thumbnail_url,
+            'description': description,
+            'author': author,
+            'genres': genres,
+            'info': {
+                'Studio': author
+            },
+            'source': 'hanime'
+        }
+
+    def _episodes_flow(self, anime_details):
+        """Request flow of get_episodes and async_get_episodes (see scraper_utils.request_flow)."""
         if not anime_details or 'url' not in anime_details:
             print("❌ Invalid anime details. Cannot get episodes.")
             return []
 
         print(f"🎬 Getting episodes for {anime_details.get('title', 'anime')} from hanime...")
 
+        if anime_details.get('episodes'):
+            return anime_details['episodes']
+
         try:
-            slug = anime_details['url'].split('/')[-1]
-            api_url = f"{self.BASE_URL}/api/v8/video?id={slug}"
+            slug = self._video_id(anime_details['url'])
+            return self._parse_episodes_json((yield from self._video_flow(slug)), self._video_api_url(slug))
 
-            response = self.session.get(api_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+        except Exception as e:
+            print(f"❌ Error getting episodes from hanime: {e}")
+            return []
+
+    def get_episodes(self, anime_details):
+        """Get episode list, similar to Kotlin's episodeListParse."""
+        return run_sync(self._episodes_flow(anime_details), self._send)
+
+    async def async_get_episodes(self, anime_details):
+        """Async variant of get_episodes built on the shared transport."""
+        return await run_async(self._episodes_flow(anime_details), self._async_send)
+
+    def _parse_episodes_json(self, response_data, api_url):
+        """Build the episode list from a v8 video response."""
+        episodes = []
+
+        # Extract franchise videos if any
+        franchise_videos = response_data.get('hentai_franchise_hentai_videos', [])
+
+        if franchise_videos:
+            for idx, video in enumerate(reversed(franchise_videos)):
+                episode_number = idx + 1
+                timestamp = (video.get('releasedAtUnix', 0) or 0) * 1000
+                video_id = video.get('id')
 
-            response_data = response.json()
-            episodes = []
-
-            # Extract franchise videos if any
-            franchise_videos = response_data.get('hentai_franchise_hentai_videos', [])
-
-            if franchise_videos:
-                for idx, video in enumerate(reversed(franchise_videos)):
-                    episode_number = idx + 1
-                    timestamp = (video.get('releasedAtUnix', 0) or 0) * 1000
-                    video_id = video.get('id')
-
-                    episodes.append({
-                        'title': f"Episode {episode_number}",
-                        'episode': episode_number,
-                        'url': f"{self.BASE_URL}/api/v8/video?id={video_id}",
-                        'date': timestamp,
-                        'source': 'hanime'
-                    })
-            else:
-                # If no franchise videos, use the current video as episode 1
                 episodes.append({
-                    'title': "Episode 1",
-                    'episode': 1,
-                    'url': api_url,
-                    'date': 0,
+                    'title': f"Episode {episode_number}",
+                    'episode': episode_number,
+                    'url': f"{self.BASE_URL}/api/v8/video?id={video_id}",
+                    'date': timestamp,
                     'source': 'hanime'
                 })
+        else:
+            # If no franchise videos, use the current video as episode 1
+            episodes.append({
+                'title': "Episode 1",
+                'episode': 1,
+                'url': api_url,
+                'date': 0,
+                'source': 'hanime'
+            })
 
-            return episodes
+        return episodes
 
-        except Exception as e:
-            print(f"❌ Error getting episodes from hanime: {e}")
-            return []
-
-    def get_video_sources(self, episode_url):
-        """Get video streams, similar to Kotlin's videoListParse."""
+    def _video_sources_flow(self, episode_url):
+        """Request flow of get_video_sources and async_get_video_sources (see scraper_utils.request_flow)."""
         print(f"🎥 Getting video streams from hanime: {episode_url}")
 
         try:
@@ -411,57 +629,69 @@ class HanimeScraper:
             self._set_auth_cookie()
 
             if self.auth_cookie:
-                video_list = self._fetch_premium_videos(episode_url)
+                # Premium pages are only reachable with the session's cookies
+                video_list = yield Blocking(self._fetch_premium_videos, episode_url)
             else:
-                # Regular video fetching
-                response = self.session.get(episode_url, headers=self.headers, timeout=15)
-                response.raise_for_status()
+                # Regular video fetching, usually already cached by details/episodes
+                video_list = self._videos_from_manifest((yield from self._video_flow(self._video_id(episode_url))))
 
-                response_data = response.json()
+            return self._to_video_sources(video_list)
 
-                # Extract videos from manifest
-                videos_manifest = response_data.get('videos_manifest', {})
-                servers = videos_manifest.get('servers', [])
+        except Exception as e:
+            print(f"❌ Error getting video streams from hanime: {e}")
+            return []
 
-                if not servers or len(servers) == 0:
-                    print("❌ No servers found in the manifest.")
-                    return []
+    def get_video_sources(self, episode_url):
+        """Get video streams, similar to Kotlin's videoListParse."""
+        return run_sync(self._video_sources_flow(episode_url), self._send)
 
-                # Get streams from first server
-                streams = servers[0].get('streams', [])
+    async def async_get_video_sources(self, episode_url):
+        """Async variant of get_video_sources built on the shared transport."""
+        return await run_async(self._video_sources_flow(episode_url), self._async_send)
 
-                # Filter out premium alert streams
-                streams = [s for s in streams if s.get('kind') != 'premium_alert']
+    def _videos_from_manifest(self, response_data):
+        """Extract the streams of the first server in a v8 video manifest."""
+        videos_manifest = response_data.get('videos_manifest', {})
+        servers = videos_manifest.get('servers', [])
 
-                video_list = []
-                for stream in streams:
-                    url = stream.get('url', '')
-                    height = stream.get('height', '')
-                    quality = f"{height}p"
+        if not servers or len(servers) == 0:
+            print("❌ No servers found in the manifest.")
+            return []
 
-                    video_list.append(Video(url, quality, url))
+        # Get streams from first server
+        streams = servers[0].get('streams', [])
 
-            # Create sources format for the CLI
-            video_sources = []
-            for video in video_list:
-                video_sources.append({
-                    'url': video.videoUrl,
-                    'quality': video.videoTitle
-                })
+        # Filter out premium alert streams
+        streams = [s for s in streams if s.get('kind') != 'premium_alert']
 
-            # Log and save to urls.txt
-            with open('urls.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\n==== Hanime: {len(video_sources)} quality options ====\n")
-                for source in video_sources:
-                    source_line = f"{source['quality']}: {source['url']}\n"
-                    f.write(source_line)
-                f.write("\n")
+        video_list = []
+        for stream in streams:
+            url = stream.get('url', '')
+            height = stream.get('height', '')
+            quality = f"{height}p"
 
-            return video_sources
+            video_list.append(Video(url, quality, url))
 
-        except Exception as e:
-            print(f"❌ Error getting video streams from hanime: {e}")
-            return []
+        return video_list
+
+    def _to_video_sources(self, video_list):
+        """Convert Video objects to the API format and log them to urls.txt."""
+        video_sources = []
+        for video in video_list:
+            video_sources.append({
+                'url': video.videoUrl,
+                'quality': video.videoTitle
+            })
+
+        # Log and save to urls.txt
+        with open('urls.txt', 'a', encoding='utf-8') as f:
+            f.write(f"\n==== Hanime: {len(video_sources)} quality options ====\n")
+            for source in video_sources:
+                source_line = f"{source['quality']}: {source['url']}\n"
+                f.write(source_line)
+            f.write("\n")
+
+        return video_sources
 
     def _fetch_premium_videos(self, episode_url):
         """Fetch premium videos if auth cookie is available."""
@@ -626,53 +856,56 @@ class HanimeScraper:
         """Get popular anime (sorted by likes) - returns all results without pagination."""
         print(f"💫 Getting popular anime from hanime...")
 
-        all_results = []
         max_pages = 5  # Fetching up to 5 pages to get more results
 
         try:
-            # Use the default filters (likes, desc sorting)
-            self.active_filters["order_by"] = "likes"
-            self.active_filters["ordering"] = "desc"
-
-            for current_page in range(1, max_pages + 1):
-                search_body = self.search_request_body("", current_page, None)
-
-                response = self.session.post(
-                    self.SEARCH_URL,
-                    headers=self.search_headers,
-                    json=search_body,
-                    timeout=15
-                )
-                response.raise_for_status()
-
-                # Debug the response data
-                response_data = response.json()
-                print(f"API Response hits sample: {response_data.get('hits', '')}...")
-
-                # Parse search results into anime list
-                page_results = self._parse_search_json(response_data)
-
-                if not page_results:
-                    break
-
-                all_results.extend(page_results)
-                print(f"Fetched page {current_page}, total results so far: {len(all_results)}")
+            # Per-call filters: the scraper is shared by concurrent requests,
+            # so self.active_filters must not be touched here
+            popular_filters = {
+                "included_tags": [],
+                "blacklisted_tags": [],
+                "brands": [],
+                "tags_mode": "AND",
+                "order_by": "likes",
+                "ordering": "desc"
+            }
 
-                # Add a small delay to avoid rate limiting
-                time.sleep(0.5)
+            all_results = self._collect_search_pages(popular_filters, max_pages)
 
             print(f"Found {len(all_results)} popular anime from hanime")
             return all_results
 
         except Exception as e:
             print(f"❌ Error getting popular anime from hanime: {e}")
-            return all_results if all_results else []
+            return []
+
+    def _collect_search_pages(self, filters, max_pages):
+        """Fetch up to max_pages of an empty-query search.
+
+        Page 1 tells us nbPages, the remaining pages are then fetched
+        concurrently. Hits are grouped by title across all pages.
+        """
+        hits = collect_pages(
+            lambda upstream_page: self._search_upstream_page("", upstream_page, filters),
+            1, max_pages, self.SEARCH_HOST,
+            key=lambda hit: hit.get('id') or hit.get('slug')
+        )
+        return self._parse_hits(hits)
+
+    def get_popular_anime_page(self, page=1, limit=20):
+        """Get one page of popular anime (sorted by likes)."""
+        print(f"💫 Getting popular anime from hanime (page {page}, limit {limit})...")
+        popular_filters = {
+            "tags_mode": "AND",
+            "order_by": "likes",
+            "ordering": "desc"
+        }
+        return self._search_window("", page, limit, popular_filters)
 
     def get_latest_anime(self, page=1):
         """Get latest anime (sorted by published date) - returns all results without pagination."""
         print(f"🆕 Getting latest anime from hanime...")
 
-        all_results = []
         max_pages = 5  # Fetching up to 5 pages to get more results
 
         try:
@@ -686,36 +919,21 @@ class HanimeScraper:
                 "ordering": "desc"
             }
 
-            for current_page in range(1, max_pages + 1):
-                search_body = self.search_request_body("", current_page, latest_filters)
-
-                response = self.session.post(
-                    self.SEARCH_URL,
-                    headers=self.search_headers,
-                    json=search_body,
-                    timeout=15
-                )
-                response.raise_for_status()
-
-                # Debug the response data
-                response_data = response.json()
-                print(f"API Response hits sample: {response_data.get('hits', '')[:100]}...")
-
-                # Parse search results into anime list
-                page_results = self._parse_search_json(response_data)
-
-                if not page_results:
-                    break
-
-                all_results.extend(page_results)
-                print(f"Fetched page {current_page}, total results so far: {len(all_results)}")
-
-                # Add a small delay to avoid rate limiting
-                time.sleep(0.5)
+            all_results = self._collect_search_pages(latest_filters, max_pages)
 
             print(f"Found {len(all_results)} latest anime from hanime")
             return all_results
 
         except Exception as e:
             print(f"❌ Error getting latest anime from hanime: {e}")
-            return all_results if all_results else []
\ No newline at end of file
+            return []
+
+    def get_latest_anime_page(self, page=1, limit=20):
+        """Get one page of latest anime (sorted by published date)."""
+        print(f"🆕 Getting latest anime from hanime (page {page}, limit {limit})...")
+        latest_filters = {
+            "tags_mode": "AND",
+            "order_by": "created_at_unix",
+            "ordering": "desc"
+        }
+        return self._search_window("", page, limit, latest_filters)
@@ -0,0 +1,84 @@
+"""
+Payload benchmark for AllAnime episode urls.
+
+Builds the episode list of a synthetic show with the old url format (the
+whole STREAMS_QUERY request serialized into every episode) and with the
+compact "showId:translationType:episodeString" tokens, then compares the
+size of the details response and the time to JSON-encode it.
+
+Usage:
+    python benchmarks/bench_allanime_episode_tokens.py [--episodes 1000] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anime_scrapers.allanime_scraper import AllAnimeScraper
+
+
+def legacy_episode_url(scraper, show_id, translation_type, episode_string):
+    """Episode url as get_episodes used to build it."""
+    return json.dumps({
+        "variables": {
+            "showId": show_id,
+            "translationType": translation_type,
+            "episodeString": episode_string
+        },
+        "query": scraper.STREAMS_QUERY
+    })
+
+
+def details_response(scraper, episodes):
+    return {
+        "id": "ReooPAxPMsHM4KPMY",
+        "title": "Benchmark Show [AllAnime]",
+        "description": "Synthetic show used to size the details response",
+        "source": "allanime",
+        "episodes": episodes,
+    }
+
+
+def measure(label, response, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = json.dumps(response)
+    encode_ms = (time.perf_counter() - start) * 1000 / repeat
+    size = len(payload.encode("utf-8"))
+    print(f"{label:<8} size={size / 1024:8.1f} KiB  encode={encode_ms:7.2f}ms")
+    return size, encode_ms
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=1000, help="Episodes in the synthetic show")
+    parser.add_argument("--repeat", type=int, default=50, help="Encodes per measurement")
+    args = parser.parse_args()
+
+    scraper = AllAnimeScraper()
+    show = {
+        "_id": "ReooPAxPMsHM4KPMY",
+        "availableEpisodesDetail": {"sub": [str(n) for n in range(args.episodes, 0, -1)], "dub": []},
+    }
+    episodes = scraper._parse_episodes({"data": {"show": show}})
+
+    legacy = [dict(episode) for episode in episodes]
+    for episode in legacy:
+        show_id, translation_type, episode_string = episode["url"].split(":")
+        episode["url"] = legacy_episode_url(scraper, show_id, translation_type, episode_string)
+
+    print(f"AllAnime details response with {len(episodes)} episodes")
+    old_size, old_ms = measure("legacy", details_response(scraper, legacy), args.repeat)
+    new_size, new_ms = measure("tokens", details_response(scraper, episodes), args.repeat)
+    print(f"size x{old_size / new_size:.1f} smaller, encode x{old_ms / max(new_ms, 1e-9):.1f} faster")
+
+    # Both forms must expand to the same stream request
+    assert scraper._episode_request(legacy[0]["url"]) == scraper._episode_request(episodes[0]["url"])
+    print(f"get-episode id: {len(legacy[0]['url'])} chars -> {len(episodes[0]['url'])} chars")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,98 @@
+"""
+Load benchmark for the per-source scraper dispatcher.
+
+Replaces the real scrapers in main.py with fakes that block for a fixed time
+(like a slow upstream fetch) and fires concurrent requests at several sources.
+It runs the same routes twice: once with scraper calls made directly on the
+event loop (the old behaviour) and once through the dispatcher.
+
+Usage:
+    python benchmarks/bench_dispatch.py [--delay 0.5] [--per-source 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class SlowMangaScraper:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def search_manga(self, query):
+        time.sleep(self.delay)
+        return [{"id": str(i), "title": f"{query} {i}"} for i in range(30)]
+
+
+class SlowAnimeScraper:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def search_anime(self, query):
+        time.sleep(self.delay)
+        return [{"title": f"{query} {i}", "url": f"/anime/{i}"} for i in range(30)]
+
+
+async def blocking_run(source, fn, *args, **kwargs):
+    """The pre-dispatcher behaviour: call the scraper on the event loop thread."""
+    return fn(*args, **kwargs)
+
+
+async def fire(per_source):
+    calls = []
+    for source in ("comick", "nhentai"):
+        for i in range(per_source):
+            calls.append(main.search_manga(q=f"q{i}", source=source, page=1, limit=20,
+                                           cursor=None, stream=None, accept=None))
+    for source in ("hanime", "hahomoe", "allanime"):
+        for i in range(per_source):
+            calls.append(main.search_anime(q=f"q{i}", source=source, page=1, limit=20,
+                                           cursor=None, stream=None, accept=None))
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(r["executionTimeMs"] for r in responses)
+    return elapsed, latencies
+
+
+def report(label, elapsed, latencies):
+    p50 = latencies[len(latencies) // 2]
+    print(f"{label:<12} requests={len(latencies):<4} wall={elapsed:6.2f}s  "
+          f"p50={p50}ms  max={latencies[-1]}ms")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.5, help="Simulated upstream latency in seconds")
+    parser.add_argument("--per-source", type=int, default=4, help="Concurrent requests per source")
+    args = parser.parse_args()
+
+    for source in ("comick", "nhentai"):
+        main.scrapers[source] = SlowMangaScraper(args.delay)
+    for source in ("hanime", "hahomoe", "allanime"):
+        main.anime_scrapers[source] = SlowAnimeScraper(args.delay)
+
+    total = args.per_source * 5
+    print(f"{total} concurrent requests across 5 sources, {args.delay}s simulated upstream latency")
+
+    dispatched_run = main.dispatcher.run
+    main.dispatcher.run = blocking_run
+    try:
+        report("on-loop", *asyncio.run(fire(args.per_source)))
+    finally:
+        main.dispatcher.run = dispatched_run
+
+    # Both runs use the same queries, so start the second one from a cold cache
+    main.response_cache.clear()
+    report("dispatcher", *asyncio.run(fire(args.per_source)))
+    print(f"ideal (fully parallel): {args.delay:.2f}s")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,102 @@
+"""
+HTML parser backend benchmark.
+
+Runs each scraper's real page parser (hahomoe listings and episode pages,
+nhentai listings, hanime video pages, anizone snapshots) once per
+BeautifulSoup backend, next to the time spent building the tree alone, and
+checks that every backend extracts the same data.
+Backends that aren't installed are skipped.
+
+Synthetic pages from benchmarks/sample_pages.py are used unless recorded ones
+are passed with `--page KIND=path.html`.
+
+Usage:
+    python benchmarks/bench_html_parsers.py [--repeat 50] [--backend lxml --backend html.parser] [--page hahomoe-listing=page.html ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from anime_scrapers.anizone_scraper import AniZoneSearcher
+from anime_scrapers.hahomoe_scraper import HahoMoeSearcher
+from anime_scrapers.hanime_scraper import HanimeScraper
+from manga_scrapers.nhentai import NHentaiScraper
+from sample_pages import load_pages
+from scraper_utils import html_parser
+from scraper_utils.html_parser import make_soup
+
+hahomoe = HahoMoeSearcher()
+nhentai = NHentaiScraper()
+hanime = HanimeScraper()
+anizone = AniZoneSearcher()
+
+
+def nhentai_listing(html):
+    soup = make_soup(html)
+    return nhentai._parse_search_results(soup), nhentai._last_page(soup)
+
+
+PARSERS = {
+    "hahomoe-listing": hahomoe._listing_page_data,
+    "hahomoe-episodes": hahomoe._parse_episode_page,
+    "nhentai-listing": nhentai_listing,
+    "hanime-video": lambda html: hanime._parse_anime_details_html(html, "https://hanime.tv/videos/hentai/video-1"),
+    "anizone-anime": lambda html: anizone.get_snapshot_from_document(make_soup(html)),
+}
+
+
+def available(backend):
+    try:
+        BeautifulSoup("", backend)
+        return True
+    except FeatureNotFound:
+        return False
+
+
+def measure(fn, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(html)
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="Parses per measurement")
+    parser.add_argument("--backend", action="append", help="Backends to compare (default: html.parser and lxml)")
+    parser.add_argument("--page", action="append", metavar="KIND=PATH", help="Use a recorded page for KIND")
+    args = parser.parse_args()
+
+    backends = [backend for backend in args.backend or ["html.parser", "lxml"] if available(backend)]
+    pages = load_pages(args.page)
+    baseline = backends[0]
+    totals = {backend: 0.0 for backend in backends}
+    mismatches = 0
+
+    for kind, html in pages.items():
+        print(f"{kind}: {len(html) / 1024:.1f} KiB")
+        results = {}
+        for backend in backends:
+            html_parser.BACKEND = backend
+            _, parse_ms = measure(make_soup, html, args.repeat)
+            results[backend], ms = measure(PARSERS[kind], html, args.repeat)
+            totals[backend] += ms
+            print(f"  {backend:12} {ms:8.3f}ms   (tree build {parse_ms:.3f}ms)")
+        for backend in backends[1:]:
+            if results[backend] != results[baseline]:
+                mismatches += 1
+                print(f"  ⚠️ {backend} extracted different data than {baseline}")
+
+    print("total:")
+    for backend in backends:
+        print(f"  {backend:12} {totals[backend]:8.3f}ms   x{totals[baseline] / max(totals[backend], 1e-9):.1f}")
+    print("same results across backends" if not mismatches else f"{mismatches} page(s) differ across backends")
+
+
+if __name__ == "__main__":
+    main_bench()
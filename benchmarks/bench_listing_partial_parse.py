@@ -0,0 +1,100 @@
+"""
+Partial parsing benchmark for listing pages.
+
+Runs the HahoMoe listing and episode page parsers and the nhentai listing
+parser twice: building the whole document tree, and building only the card
+list and pagination subtrees (the scrapers' parse_only strainers). Reports
+peak memory (tracemalloc) and CPU time per page and checks both extract the
+same data.
+
+Synthetic pages from benchmarks/sample_pages.py are used unless recorded ones
+are passed with `--page KIND=path.html`.
+
+Usage:
+    python benchmarks/bench_listing_partial_parse.py [--repeat 50] [--backend lxml] [--page nhentai-listing=page.html ...]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anime_scrapers.hahomoe_scraper as hahomoe_scraper
+import manga_scrapers.nhentai as nhentai_scraper
+from sample_pages import load_pages
+from scraper_utils import html_parser
+from scraper_utils.html_parser import make_soup
+
+hahomoe = hahomoe_scraper.HahoMoeSearcher()
+nhentai = nhentai_scraper.NHentaiScraper()
+
+
+def nhentai_listing(html):
+    soup = make_soup(html, parse_only=nhentai_scraper.LISTING_ELEMENTS)
+    return nhentai._parse_search_results(soup), soup.select_one("section.pagination > a.next") is not None, \
+        nhentai._last_page(soup)
+
+
+PARSERS = {
+    "hahomoe-listing": hahomoe._listing_page_data,
+    "hahomoe-episodes": hahomoe._parse_episode_page,
+    "nhentai-listing": nhentai_listing,
+}
+STRAINERS = [
+    (hahomoe_scraper, "LISTING_ELEMENTS"),
+    (hahomoe_scraper, "EPISODE_LIST_ELEMENTS"),
+    (nhentai_scraper, "LISTING_ELEMENTS"),
+]
+STRAINED = {(module, name): getattr(module, name) for module, name in STRAINERS}
+
+
+def use_strainers(enabled):
+    for module, name in STRAINERS:
+        setattr(module, name, STRAINED[(module, name)] if enabled else None)
+
+
+def measure(fn, html, repeat):
+    """(result, peak KiB of one parse, CPU ms per parse)"""
+    tracemalloc.start()
+    result = fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn(html)
+    return result, peak / 1024, (time.process_time() - start) * 1000 / repeat
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="Parses per CPU measurement")
+    parser.add_argument("--backend", default=html_parser.BACKEND, help="BeautifulSoup backend to parse with")
+    parser.add_argument("--page", action="append", metavar="KIND=PATH", help="Use a recorded page for KIND")
+    args = parser.parse_args()
+
+    html_parser.BACKEND = html_parser.resolve_backend(args.backend)
+    pages = load_pages(args.page)
+    print(f"backend: {html_parser.BACKEND}")
+    same = True
+
+    for kind, fn in PARSERS.items():
+        html = pages[kind]
+        use_strainers(False)
+        full, full_kib, full_ms = measure(fn, html, args.repeat)
+        use_strainers(True)
+        partial, partial_kib, partial_ms = measure(fn, html, args.repeat)
+        same = same and full == partial
+        print(f"{kind}: {len(html) / 1024:.1f} KiB")
+        print(f"  full tree   {full_ms:8.3f}ms CPU   peak {full_kib:8.1f} KiB")
+        print(f"  strained    {partial_ms:8.3f}ms CPU   peak {partial_kib:8.1f} KiB"
+              f"   x{full_ms / max(partial_ms, 1e-9):.1f} faster, x{full_kib / max(partial_kib, 1e-9):.1f} less memory")
+        print(f"  same result: {full == partial}")
+
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,145 @@
+"""
+Parse benchmark for nhentai gallery pages.
+
+Compares the old way of reading a gallery's embedded metadata (build a full
+BeautifulSoup tree, find the JSON.parse script, unescape it with regex
+substitutions) with scraper_utils.embedded_json.find_json_parse, which
+finds and decodes the JS string literal straight from the response bytes.
+
+Pass saved gallery pages (e.g. `curl https://nhentai.net/g/177013/ > g.html`)
+to measure real ones; without any, a synthetic page of a similar shape is
+used.
+
+Usage:
+    python benchmarks/bench_nhentai_gallery_parse.py [--repeat 50] [--num-pages 200] [page.html ...]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from scraper_utils.embedded_json import find_json_parse
+
+
+def legacy_extract(content):
+    """Gallery JSON as NHentaiScraper used to extract it."""
+    soup = BeautifulSoup(content.decode("utf-8", errors="replace"), "html.parser")
+    script_data = None
+    for script in soup.select("script"):
+        if script.string and "JSON.parse" in script.string:
+            script_data = script
+            break
+    if not script_data:
+        return None
+    json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
+    if not json_match:
+        return None
+    json_str = json_match.group(1)
+    json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
+    json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
+    return json.loads(json_str)
+
+
+def legacy_decode(content):
+    """legacy_extract's result, or the error it raised."""
+    try:
+        return legacy_extract(content)
+    except ValueError as e:
+        return f"error: {e}"
+
+
+def js_literal(text):
+    """Body of a JS string literal for text, escaped the way nhentai does (quotes and non-ASCII as \\uXXXX)."""
+    return "".join(f"\\u{ord(char):04x}" if char == '"' or ord(char) > 127 else
+                   "\\\\" if char == "\\" else char
+                   for char in text)
+
+
+def synthetic_page(num_pages):
+    """A gallery page shaped like nhentai's: tag links, one thumbnail per page and the JSON.parse blob."""
+    gallery = {
+        "id": 177013,
+        "media_id": "987560",
+        "title": {
+            "english": "Synthetic Gallery (Benchmark Edition)",
+            "japanese": "合成ギャラリー",
+            "pretty": "Synthetic Gallery",
+        },
+        "images": {
+            "pages": [{"t": "jpw"[i % 3], "w": 1280, "h": 1808} for i in range(num_pages)],
+            "cover": {"t": "j", "w": 350, "h": 494},
+            "thumbnail": {"t": "j", "w": 250, "h": 353},
+        },
+        "scanlator": "",
+        "upload_date": 1476793729,
+        "tags": [{"id": i, "type": "tag", "name": f"tag {i}", "url": f"/tag/tag-{i}/", "count": 1000 + i}
+                 for i in range(40)],
+        "num_pages": num_pages,
+        "num_favorites": 54321,
+    }
+    blob = js_literal(json.dumps(gallery, ensure_ascii=False))
+    tags = "".join(f'<a href="/tag/tag-{i}/" class="tag tag-{i}"><span class="name">tag {i}</span>'
+                   f'<span class="count">{i}K</span></a>' for i in range(40))
+    thumbs = "".join(
+        f'<div class="thumb-container"><a class="gallerythumb" href="/g/177013/{i + 1}/" rel="nofollow">'
+        f'<img class="lazyload" width="200" height="282" data-src="https://t3.nhentai.net/galleries/987560/{i + 1}t.jpg"'
+        f' src="data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7" />'
+        f'<noscript><img src="https://t3.nhentai.net/galleries/987560/{i + 1}t.jpg" width="200" height="282" /></noscript>'
+        f'</a></div>' for i in range(num_pages))
+    head = "".join(f'<meta name="m{i}" content="{"x" * 40}" /><link rel="preload" href="/static/{i}.js" />' for i in range(30))
+    return (
+        f'<!DOCTYPE html><html><head>{head}<title>Synthetic Gallery</title></head><body>'
+        f'<nav role="navigation">{"<a href=/>link</a>" * 30}</nav>'
+        f'<div class="container" id="bigcontainer"><div id="cover"><a href="/g/177013/1/">'
+        f'<img data-src="https://t3.nhentai.net/galleries/987560/cover.jpg" /></a></div>'
+        f'<div id="info"><h1 class="title">Synthetic Gallery</h1><section id="tags">'
+        f'<div class="tag-container field-name">Tags: <span class="tags">{tags}</span></div></section>'
+        f'<div>{num_pages} pages</div></div></div>'
+        f'<div class="container" id="thumbnail-container"><div class="thumbs">{thumbs}</div></div>'
+        f'<script>window._n_app = {{ media_server: 3, options: {{}} }};</script>'
+        f'<script>window._gallery = JSON.parse("{blob}");</script>'
+        f'<div id="comment-container">{"<div class=comment><p>comment text</p></div>" * 50}</div>'
+        f'</body></html>'
+    ).encode("utf-8")
+
+
+def measure(fn, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(content)
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Saved gallery pages to parse")
+    parser.add_argument("--repeat", type=int, default=50, help="Parses per measurement")
+    parser.add_argument("--num-pages", type=int, default=200, help="Page count of the synthetic gallery")
+    args = parser.parse_args()
+
+    samples = [(path, open(path, "rb").read()) for path in args.pages]
+    if not samples:
+        samples = [(f"synthetic ({args.num_pages} pages)", synthetic_page(args.num_pages))]
+
+    for name, content in samples:
+        old, old_ms = measure(legacy_extract, content, args.repeat)
+        new, new_ms = measure(find_json_parse, content, args.repeat)
+        print(f"{name}: {len(content) / 1024:.1f} KiB")
+        print(f"  soup + regex  {old_ms:8.3f}ms")
+        print(f"  bytes         {new_ms:8.3f}ms   x{old_ms / max(new_ms, 1e-9):.0f} faster")
+        print(f"  same result: {old == new}")
+
+    # The old chained unescaping decoded escapes twice, e.g. a literal "\\u00e9" in a title became "\\é"
+    tricky = {"title": "C:\\u00e9"}
+    page = f'<script>window._gallery = JSON.parse("{js_literal(json.dumps(tricky))}");</script>'.encode("utf-8")
+    print(f"title {tricky['title']!r}: soup + regex -> {legacy_decode(page)!r}, bytes -> {find_json_parse(page)!r}")
+
+
+if __name__ == "__main__":
+    main_bench()
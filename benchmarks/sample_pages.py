@@ -0,0 +1,117 @@
+"""
+Synthetic pages shaped like the ones the HTML scrapers parse, for the parser
+benchmarks. Each has the markup the scraper selects plus the surrounding
+chrome (head, navigation, sidebars, scripts, footer) real pages carry.
+
+Recorded pages can be used instead: pass `--page KIND=path.html` to a
+benchmark, where KIND is one of the keys of PAGES.
+"""
+import json
+
+
+def _chrome(body, scripts=""):
+    head = "".join(f'<meta name="m{i}" content="{"x" * 60}" /><link rel="stylesheet" href="/css/{i}.css" />'
+                   for i in range(25))
+    nav = "".join(f'<li class="nav-item"><a class="nav-link" href="/section/{i}">Section {i}</a></li>' for i in range(25))
+    footer = "".join(f'<div class="col"><h5>Links {i}</h5><ul>{"<li><a href=/x>link</a></li>" * 10}</ul></div>'
+                     for i in range(6))
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">{head}<title>Page</title></head><body>'
+        f'<header><nav class="navbar"><ul class="navbar-nav">{nav}</ul></nav></header>'
+        f'{body}<footer class="footer"><div class="row">{footer}</div></footer>{scripts}</body></html>'
+    )
+
+
+def hahomoe_listing(cards=30):
+    items = "".join(
+        f'<li><a href="/anime/abc{i}" title="Anime {i}"><img src="https://haho.moe/poster/{i}.jpg" />'
+        f'<div class="label"><span>Anime title number {i}</span></div>'
+        f'<div class="fd-infor"><span class="fdi-item">TV</span><span class="fdi-item">20{i % 25:02d}</span></div>'
+        f'</a></li>' for i in range(cards))
+    sidebar = "".join(f'<div class="widget"><h4>Tag {i}</h4><p>{"lorem ipsum " * 20}</p></div>' for i in range(20))
+    pagination = "".join(f'<li class="page-item"><a class="page-link" href="/anime?page={i}">{i}</a></li>'
+                         for i in range(1, 11))
+    return _chrome(
+        f'<main><div class="container"><ul class="anime-loop loop">{items}</ul>'
+        f'<ul class="pagination">{pagination}<li class="page-item"><a rel="next" href="/anime?page=2">›</a></li></ul>'
+        f'</div><aside class="sidebar">{sidebar}</aside></main>'
+    )
+
+
+def hahomoe_episodes(episodes=24):
+    items = "".join(
+        f'<li><a href="/anime/abc/{i}" data-thumbnail="https://haho.moe/thumb/{i}.jpg">'
+        f'<div class="episode-number">Episode {i}</div><div class="episode-label">Title {i}</div>'
+        f'<div class="date">2020-01-{i % 28 + 1:02d}</div></a></li>' for i in range(1, episodes + 1))
+    synopsis = "".join(f"<p>{'synopsis text ' * 30}</p>" for _ in range(5))
+    return _chrome(
+        f'<main><section class="details">{synopsis}</section><ul class="episode-loop">{items}</ul>'
+        f'<ul class="pagination"><li class="page-item"><a rel="next" href="/anime/abc?page=2">›</a></li></ul></main>'
+    )
+
+
+def nhentai_listing(galleries=25):
+    items = "".join(
+        f'<div class="gallery" data-tags="{" ".join(str(t) for t in range(i, i + 30))}">'
+        f'<a href="/g/{400000 + i}/" class="cover" style="padding:0 0 141% 0">'
+        f'<img class="lazyload" width="250" height="353" data-src="https://t3.nhentai.net/galleries/{i}/thumb.jpg"'
+        f' src="data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7" />'
+        f'<noscript><img src="https://t3.nhentai.net/galleries/{i}/thumb.jpg" /></noscript>'
+        f'<div class="caption">Gallery caption number {i} with a long descriptive title</div></a></div>'
+        for i in range(galleries))
+    pagination = "".join(f'<a href="?page={i}" class="page">{i}</a>' for i in range(1, 10))
+    return _chrome(
+        f'<div class="container index-container"><h2>Popular</h2>{items}</div>'
+        f'<div id="content"><div class="container index-container">{items}</div>'
+        f'<section class="pagination">{pagination}<a href="?page=2" class="next"></a>'
+        f'<a href="?page=1000" class="last"></a></section></div>'
+    )
+
+
+def hanime_video_page():
+    nuxt = json.dumps({"state": {"data": {"video": {"hentai_video": {"name": "Video 1", "tags": list(range(500))},
+                                                    "videos_manifest": {"servers": [{"streams": [
+                                                        {"url": f"https://s/{i}.m3u8", "height": 720} for i in range(50)]}]}},
+                                          "related": [{"id": i, "name": f"Related {i}", "desc": "x" * 200}
+                                                      for i in range(300)]}}})
+    tags = "".join(f'<div class="btn__content">tag{i}</div>' for i in range(20))
+    return _chrome(
+        f'<div class="hvpi"><img class="hvpi-cover" src="https://hanime/cover.jpg" />'
+        f'<h1 class="tv-title">Video 1</h1><a class="hvpimbc-text" href="/brand">Studio</a>'
+        f'<div class="hvpist-description"><p>First paragraph.</p><p>Second paragraph.</p></div>'
+        f'<div class="hvpis-text">{tags}</div></div>',
+        scripts=f"<script>window.__NUXT__={nuxt};</script>"
+    )
+
+
+def anizone_page():
+    snapshot = json.dumps({"data": {"anime": [None, {"key": 68}]}, "memo": {"id": "x", "name": "pages.anime-detail"}})
+    episodes = "".join(f'<li><a href="/anime/uyyyn4kf/{i}"><h3>Episode {i}</h3><span>24 min</span></a></li>'
+                       for i in range(1, 60))
+    return _chrome(
+        f'<main><div wire:snapshot="{snapshot.replace(chr(34), "&quot;")}" wire:id="x">'
+        f'<div class="flex items-start"><div><img src="/poster.jpg" /></div>'
+        f'<div><h1>Anime</h1><span class="flex">TV</span><span class="flex">Completed</span></div></div>'
+        f'<ul class="episodes">{episodes}</ul></div></main>'
+    )
+
+
+PAGES = {
+    "hahomoe-listing": hahomoe_listing,
+    "hahomoe-episodes": hahomoe_episodes,
+    "nhentai-listing": nhentai_listing,
+    "hanime-video": hanime_video_page,
+    "anizone-anime": anizone_page,
+}
+
+
+def load_pages(overrides):
+    """{kind: html} for every kind in PAGES, reading `KIND=path` overrides from disk."""
+    pages = {kind: build() for kind, build in PAGES.items()}
+    for override in overrides or []:
+        kind, _, path = override.partition("=")
+        if kind not in PAGES:
+            raise SystemExit(f"Unknown page kind {kind!r}, expected one of: {', '.join(PAGES)}")
+        with open(path, encoding="utf-8") as f:
+            pages[kind] = f.read()
+    return pages
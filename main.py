@@ -1,11 +1,23 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import Dict, Any, List, Optional
 from anime_scrapers.hanime_scraper import HanimeScraper
 from anime_scrapers.hahomoe_scraper import HahoMoeSearcher
 from anime_scrapers.allanime_scraper import AllAnimeScraper
 from manga_scrapers.comick import ComickScraper
 from manga_scrapers.nhentai import NHentaiScraper
+from scraper_utils.dispatch import ScraperDispatcher, SourceSaturatedError
+from scraper_utils.http_transport import get_transport
+from scraper_utils.response_cache import ResponseCache, make_key, HIT, STALE, MISS
+from scraper_utils.expiry import streams_ttl
+from scraper_utils.snapshots import SnapshotStore, InvalidCursorError
+from scraper_utils.streaming import stream_format, streaming_response, iterate_in_thread
+from scraper_utils.pagination import upstream_span
+from scraper_utils import ttl_cache, hoster_health, mirrors
+from scraper_utils.stream_selection import select_streams
+import asyncio
+import inspect
 import time
 import math
 from pydantic import BaseModel
@@ -46,6 +58,83 @@ anime_scrapers = {
     "allanime": allanime_scraper
 }
 
+# Scraper calls use their native async variant when one exists; blocking calls
+# run on per-source thread pools so a slow source can't stall the event loop
+dispatcher = ScraperDispatcher(["comick", "nhentai", "hanime", "hahomoe", "allanime"])
+
+@app.on_event("shutdown")
+async def close_http_transport():
+    await get_transport().aclose()
+
+# Responses are cached per (endpoint, source, params). The memory tier size and
+# an optional SQLite tier are configured with RESPONSE_CACHE_MAX_BYTES and
+# RESPONSE_CACHE_SQLITE_PATH.
+response_cache = ResponseCache()
+
+# Background refreshes of stale entries, at most one per cache key
+refresh_tasks: Dict[str, asyncio.Task] = {}
+
+def store_cached(endpoint: str, key: str, value, ttl=None):
+    if ttl is None:
+        ttl = response_cache.ttl_for(endpoint)
+    elif callable(ttl):
+        ttl = ttl(value)
+    response_cache.set(key, value, ttl, response_cache.stale_ttl_for(endpoint))
+
+def refresh_in_background(endpoint: str, key: str, fetch, ttl=None):
+    """Re-fetch a stale entry without making the current request wait for it."""
+    if key in refresh_tasks:
+        return
+
+    async def refresh():
+        try:
+            store_cached(endpoint, key, await fetch(), ttl)
+            response_cache.count_refresh(key)
+        except Exception as e:
+            print(f"⚠️ Background refresh failed for {key}: {str(e)}")
+        finally:
+            refresh_tasks.pop(key, None)
+
+    refresh_tasks[key] = asyncio.create_task(refresh())
+
+async def cached(endpoint: str, source: str, params: Optional[Dict[str, Any]], fetch, ttl=None,
+                 response: Optional[Response] = None):
+    """Return the cached result of an endpoint call, calling fetch() on a miss.
+
+    ttl defaults to the endpoint's TTL and may be a function of the fetched value.
+    Stale entries (see ENDPOINT_STALE_TTLS) are served as-is while a background
+    task refreshes them. The outcome is reported in the X-Cache header.
+    """
+    key = make_key(endpoint, source, params)
+    value, state = response_cache.lookup(key)
+    if response is not None:
+        response.headers["X-Cache"] = state
+
+    if state == HIT:
+        return value
+    if state == STALE:
+        refresh_in_background(endpoint, key, fetch, ttl)
+        return value
+
+    value = await fetch()
+    store_cached(endpoint, key, value, ttl)
+    return value
+
+# Result snapshots behind the `next` cursors of listing responses
+snapshots = SnapshotStore()
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(SourceSaturatedError)
+async def source_saturated_handler(request, exc: SourceSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Source '{exc.source}' is busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 class MangaResponse(BaseModel):
     totalResults: int
     page: int
@@ -53,8 +142,14 @@ class MangaResponse(BaseModel):
     source: str
     query: Optional[str] = None
     results: List[Dict[str, Any]]
+    next: Optional[str] = None
     executionTimeMs: int
 
+def accepts_params(fn, *names: str) -> bool:
+    """Whether fn takes all of the given keyword arguments."""
+    parameters = inspect.signature(fn).parameters
+    return all(name in parameters for name in names)
+
 def paginate_results(results: List[Dict[str, Any]], page: int, limit: int) -> List[Dict[str, Any]]:
     """Paginate results based on page and limit parameters."""
     start_idx = (page - 1) * limit
@@ -65,6 +160,137 @@ def paginate_results(results: List[Dict[str, Any]], page: int, limit: int) -> Li
 
     return results[start_idx:end_idx]
 
+async def fetch_listing_page(endpoint: str, source: str, scraper, method: str, args: tuple,
+                             params: Optional[Dict[str, Any]], page: int, limit: int,
+                             http_response: Optional[Response] = None):
+    """Fetch one API page of a listing as a dict of results, totalResults and hasNextPage.
+
+    Scrapers with a page-aware `<method>_page(*args, page, limit)` only fetch
+    the upstream pages that cover the window. Others return their full list,
+    which is cached once and paginated here.
+    """
+    page_method = f"{method}_page"
+    if hasattr(scraper, page_method):
+        return await cached(endpoint, source, {**(params or {}), "page": page, "limit": limit},
+                            lambda: dispatcher.call(source, scraper, page_method, *args, page, limit),
+                            response=http_response)
+
+    results = await cached(endpoint, source, params,
+                           lambda: dispatcher.call(source, scraper, method, *args),
+                           response=http_response)
+    return {
+        "results": paginate_results(results, page, limit),
+        "totalResults": len(results),
+        "hasNextPage": page * limit < len(results)
+    }
+
+async def fetch_listing(endpoint: str, source: str, scraper, method: str, args: tuple,
+                        params: Optional[Dict[str, Any]], page: int, limit: int, cursor: Optional[str],
+                        http_response: Optional[Response] = None) -> Dict[str, Any]:
+    """Fetch a listing page by page number or by cursor.
+
+    A request without a cursor fetches `page` and, if there is more, starts a
+    server-side snapshot of the listing. The `next` cursor in the response
+    points into that snapshot. Following it reads from the snapshot and only
+    fetches the next upstream page when the snapshot runs out, so clients
+    walking the listing see a stable order.
+    Returns results, totalResults, page and next.
+    """
+    scope = make_key(endpoint, source, params)
+    if cursor:
+        snapshot, offset = snapshots.resolve(cursor, scope)
+    else:
+        data = await fetch_listing_page(endpoint, source, scraper, method, args, params, page, limit, http_response)
+        if not data["hasNextPage"]:
+            return {**data, "page": page, "next": None}
+        snapshot = snapshots.create(scope, data["results"], page, limit,
+                                    exhausted=False, total_results=data["totalResults"])
+        offset = 0
+
+    async with snapshot.lock:
+        while len(snapshot.items) < offset + limit and not snapshot.exhausted:
+            data = await fetch_listing_page(endpoint, source, scraper, method, args, params,
+                                            snapshot.next_page, snapshot.page_size, http_response)
+            snapshots.extend(snapshot, data)
+
+    results = [dict(item) for item in snapshot.items[offset:offset + limit]]
+    next_offset = offset + len(results)
+    has_more = results and (next_offset < len(snapshot.items) or not snapshot.exhausted)
+    return {
+        "results": results,
+        "totalResults": snapshot.total_results,
+        "page": snapshot.base_page + offset // limit,
+        "next": snapshots.cursor(snapshot, next_offset) if has_more else None
+    }
+
+async def stream_listing(endpoint: str, source: str, scraper, method: str, args: tuple,
+                         params: Optional[Dict[str, Any]], page: int, limit: int, anime_ids: bool = False):
+    """Yield the `page`/`limit` window of a listing as ("page", ...) events, then ("done", ...).
+
+    Page-aware scrapers that report their upstream page size are read one
+    upstream page at a time: the first page is sent as soon as it is parsed
+    while the rest of the window is fetched concurrently. Other scrapers
+    produce a single page event.
+    """
+    start_time = time.time()
+    per_page = getattr(scraper, "upstream_page_size", None)
+    if not per_page or not hasattr(scraper, f"{method}_page"):
+        per_page = None
+
+    async def upstream_pages():
+        if per_page is None:
+            yield page, await fetch_listing_page(endpoint, source, scraper, method, args, params, page, limit)
+            return
+
+        first, last, _ = upstream_span(page, limit, per_page)
+        first_data = await fetch_listing_page(endpoint, source, scraper, method, args, params, first, per_page)
+        yield first, first_data
+        if not first_data["hasNextPage"] or last == first:
+            return
+
+        tasks = [(n, asyncio.create_task(fetch_listing_page(endpoint, source, scraper, method, args, params, n, per_page)))
+                 for n in range(first + 1, last + 1)]
+        try:
+            for n, task in tasks:
+                data = await task
+                yield n, data
+                if not data["hasNextPage"]:
+                    return
+        finally:
+            for _, task in tasks:
+                task.cancel()
+
+    skip = upstream_span(page, limit, per_page)[2] if per_page else 0
+    remaining = limit
+    count = 0
+    total_results = 0
+    has_next_page = False
+    async for upstream_page, data in upstream_pages():
+        results = data["results"][skip:skip + remaining]
+        has_next_page = data["hasNextPage"] or len(data["results"]) > skip + len(results)
+        skip = 0
+        remaining -= len(results)
+        count += len(results)
+        total_results = data["totalResults"]
+
+        for result in results:
+            result["source"] = source
+            if anime_ids:
+                result["id"] = result["url"].split("<&sep>")[0]
+        yield "page", {"upstreamPage": upstream_page, "results": results}
+        if remaining <= 0 or not data["results"]:
+            break
+
+    yield "done", {
+        "totalResults": max(total_results, (page - 1) * limit + count),
+        "page": page,
+        "limit": limit,
+        "source": source,
+        "count": count,
+        "hasNextPage": has_next_page,
+        "executionTimeMs": int((time.time() - start_time) * 1000)
+    }
+
 @app.get("/")
 async def root():
     return {
@@ -73,12 +299,141 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/api/stats")
+async def get_stats():
+    """Runtime statistics for the scraper pools, request coalescing, HTTP transport, caches, cursor snapshots and mirrors."""
+    return {
+        "pools": dispatcher.stats(),
+        "coalescing": dispatcher.singleflight.stats(),
+        "http": get_transport().stats(),
+        "cache": response_cache.stats(),
+        "snapshots": snapshots.stats(),
+        "scraperCaches": ttl_cache.all_stats(),
+        "mirrors": mirrors.all_stats()
+    }
+
+@app.get("/api/stats/hosters")
+async def get_hoster_stats():
+    """Health of the video hosters each source extracts from: latency, success ratio and whether it is being skipped."""
+    return hoster_health.all_stats()
+
+# Sources queried by /api/search, as (type, source). Hanime is also registered
+# as a manga source but only has anime search.
+FEDERATED_SOURCES = [("anime", name) for name in anime_scrapers] + \
+                    [("manga", name) for name in scrapers if name not in anime_scrapers]
+FEDERATED_DEFAULT_TIMEOUT = 6.0
+
+# Searches still running after a federated search returned. They are left to
+# finish so their results land in the cache for the next request.
+federated_tasks = set()
+
+def interleave(result_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge ranked lists round-robin: every source's first result, then every second one, and so on."""
+    merged = []
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results):
+                merged.append(results[rank])
+    return merged
+
+async def search_source(kind: str, source: str, q: str, limit: int) -> Dict[str, Any]:
+    """First page of one source's search, as used by the federated search."""
+    if kind == "anime":
+        data = await fetch_listing_page("anime/search", source, anime_scrapers[source], "search_anime", (q,),
+                                        {"q": q}, 1, limit)
+    else:
+        data = await fetch_listing_page("manga/search", source, scrapers[source], "search_manga", (q,),
+                                        {"q": q}, 1, limit)
+
+    for result in data["results"]:
+        result["source"] = source
+        result["type"] = kind
+        if kind == "anime":
+            result["id"] = result["url"].split("<&sep>")[0]
+    return data
+
+@app.get("/api/search")
+async def federated_search(
+    q: str = Query(..., description="Search query"),
+    sources: Optional[str] = Query(None, description="Comma-separated sources to search (default: all)"),
+    type: Optional[str] = Query("all", description="Limit to anime or manga sources (all, anime, manga)"),
+    limit: Optional[int] = Query(10, description="Results per source", ge=1, le=50),
+    timeout: Optional[float] = Query(FEDERATED_DEFAULT_TIMEOUT, description="Deadline in seconds", ge=0.5, le=30)
+):
+    """Search several sources at once.
+
+    Sources are queried concurrently. Whatever has answered when the deadline
+    passes is returned, interleaved by rank; the status and timing of each
+    source is reported under `sources`.
+    """
+    start_time = time.time()
+
+    if type not in ("all", "anime", "manga"):
+        raise HTTPException(status_code=400, detail="Invalid type. Use all, anime or manga")
+
+    selected = [(kind, name) for kind, name in FEDERATED_SOURCES if type == "all" or kind == type]
+    if sources:
+        requested = [name.strip() for name in sources.split(",") if name.strip()]
+        available = {name for _, name in selected}
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Invalid sources: {', '.join(unknown)}. Available sources: {', '.join(sorted(available))}")
+        selected = [(kind, name) for kind, name in selected if name in requested]
+
+    tasks = {}
+    finished_at = {}
+    for kind, name in selected:
+        task = asyncio.create_task(search_source(kind, name, q, limit))
+        task.add_done_callback(lambda _, name=name: finished_at.setdefault(name, time.time()))
+        tasks[name] = task
+
+    await asyncio.wait(tasks.values(), timeout=timeout)
+
+    source_status = {}
+    result_lists = []
+    for kind, name in selected:
+        task = tasks[name]
+        status = {"status": "ok", "type": kind}
+        if not task.done():
+            status.update(status="timeout", count=0, timeMs=int(timeout * 1000))
+            federated_tasks.add(task)
+            task.add_done_callback(federated_tasks.discard)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        else:
+            status["timeMs"] = int((finished_at.get(name, time.time()) - start_time) * 1000)
+            error = task.exception()
+            if error is None:
+                data = task.result()
+                result_lists.append(data["results"])
+                status.update(status="ok", count=len(data["results"]), totalResults=data["totalResults"])
+            elif isinstance(error, SourceSaturatedError):
+                status.update(status="busy", count=0)
+            else:
+                print(f"⚠️ Federated search failed for {name}: {str(error)}")
+                status.update(status="error", count=0, error=str(error))
+        source_status[name] = status
+
+    results = interleave(result_lists)
+    execution_time_ms = int((time.time() - start_time) * 1000)
+
+    return {
+        "query": q,
+        "totalResults": len(results),
+        "sources": source_status,
+        "results": results,
+        "executionTimeMs": execution_time_ms
+    }
+
 @app.get("/api/manga/search", response_model=MangaResponse)
 async def search_manga(
     q: str = Query(..., description="Search query"),
     source: str = Query(..., description="Source to search (comick, nhentai)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -89,33 +444,43 @@ async def search_manga(
     # Get the appropriate scraper
     scraper = scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("manga/search", source, scraper, "search_manga", (q,),
+                                                      {"q": q}, page, limit))
+
     try:
         # Search manga
-        results = scraper.search_manga(q)
+        listing = await fetch_listing("manga/search", source, scraper, "search_manga", (q,),
+                                      {"q": q}, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
             result["source"] = source
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
             "query": q,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching manga: {str(e)}")
 
@@ -138,34 +503,38 @@ async def get_filters(
         raise HTTPException(status_code=400, detail=f"Invalid source. Available sources: {', '.join(unique_sources)}")
 
     try:
-        if source == "comick":
-            from manga_scrapers.comick import ComickFilters
-            filters = ComickFilters.get_filters()
-        elif source == "nhentai":
-            filters = nhentai_scraper.get_filters()
-        elif source == "hanime":
-            filters = {
-                "tags": [{"id": tag["id"], "name": tag["name"]} for tag in hanime_scraper.get_tags()],
-                "brands": [{"id": brand["id"], "name": brand["name"]} for brand in hanime_scraper.get_brands()],
-                "sorts": [{"title": sort[0], "value": sort[1]} for sort in hanime_scraper.get_sortable_list()],
-                "tagsModes": [
-                    {"title": "All tags must match (AND)", "value": "AND"},
-                    {"title": "Any tag can match (OR)", "value": "OR"}
-                ],
-                "quality": hanime_scraper.QUALITY_LIST
-            }
-        elif source == "hahomoe":
-            hahomoe_scraper = anime_scrapers["hahomoe"]
-            filters = {
-                "tags": [{"id": tag["id"], "name": tag["name"]} for tag in hahomoe_scraper.get_tags()],
-                "sorts": [{"title": sort[0], "value": sort[1]} for sort in hahomoe_scraper.get_sortable_list()],
-                "quality": hahomoe_scraper.quality_list
-            }
-        elif source == "allanime":
-            allanime_scraper = anime_scrapers["allanime"]
-            filters = allanime_scraper.get_filters()
-        else:
-            raise HTTPException(status_code=400, detail=f"Filters not available for source: {source}")
+        key = make_key("filters", source, None)
+        filters = response_cache.get(key)
+        if filters is None:
+            if source == "comick":
+                from manga_scrapers.comick import ComickFilters
+                filters = ComickFilters.get_filters()
+            elif source == "nhentai":
+                filters = nhentai_scraper.get_filters()
+            elif source == "hanime":
+                filters = {
+                    "tags": [{"id": tag["id"], "name": tag["name"]} for tag in hanime_scraper.get_tags()],
+                    "brands": [{"id": brand["id"], "name": brand["name"]} for brand in hanime_scraper.get_brands()],
+                    "sorts": [{"title": sort[0], "value": sort[1]} for sort in hanime_scraper.get_sortable_list()],
+                    "tagsModes": [
+                        {"title": "All tags must match (AND)", "value": "AND"},
+                        {"title": "Any tag can match (OR)", "value": "OR"}
+                    ],
+                    "quality": hanime_scraper.QUALITY_LIST
+                }
+            elif source == "hahomoe":
+                hahomoe_scraper = anime_scrapers["hahomoe"]
+                filters = {
+                    "tags": [{"id": tag["id"], "name": tag["name"]} for tag in hahomoe_scraper.get_tags()],
+                    "sorts": [{"title": sort[0], "value": sort[1]} for sort in hahomoe_scraper.get_sortable_list()],
+                    "quality": hahomoe_scraper.quality_list
+                }
+            elif source == "allanime":
+                allanime_scraper = anime_scrapers["allanime"]
+                filters = allanime_scraper.get_filters()
+            else:
+                raise HTTPException(status_code=400, detail=f"Filters not available for source: {source}")
+            response_cache.set(key, filters, response_cache.ttl_for("filters"))
 
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
@@ -186,7 +555,11 @@ async def get_filters(
 async def get_popular_manga(
     source: str = Query(..., description="Source to fetch from (comick, nhentai)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -197,32 +570,42 @@ async def get_popular_manga(
     # Get the appropriate scraper
     scraper = scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("manga/popular", source, scraper, "get_popular_manga", (),
+                                                      None, page, limit))
+
     try:
         # Get popular manga
-        results = scraper.get_popular_manga()
+        listing = await fetch_listing("manga/popular", source, scraper, "get_popular_manga", (),
+                                      None, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
             result["source"] = source
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching popular manga: {str(e)}")
 
@@ -230,7 +613,11 @@ async def get_popular_manga(
 async def get_latest_manga(
     source: str = Query(..., description="Source to fetch from (comick, nhentai)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -241,39 +628,50 @@ async def get_latest_manga(
     # Get the appropriate scraper
     scraper = scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("manga/latest", source, scraper, "get_latest_manga", (),
+                                                      None, page, limit))
+
     try:
         # Get latest manga
-        results = scraper.get_latest_manga()
+        listing = await fetch_listing("manga/latest", source, scraper, "get_latest_manga", (),
+                                      None, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
             result["source"] = source
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching latest manga: {str(e)}")
 
 @app.get("/api/manga/details")
 async def get_details(
     source: str,
-    id: str
+    id: str,
+    http_response: Response = None
 ):
     """
     Get detailed information about a manga/anime by ID from specified source
@@ -283,30 +681,36 @@ async def get_details(
     """
     try:
         if source == "nhentai":
-            scraper = NHentaiScraper()
-            manga = {"id": id, "url": f"/g/{id}/"}
-            details = scraper.get_manga_details(manga)
+            async def fetch_details():
+                scraper = nhentai_scraper
+                manga = {"id": id, "url": f"/g/{id}/"}
+                details = await dispatcher.call(source, scraper, "get_manga_details", manga)
 
-            # Get chapter information
-            chapters = scraper.get_chapters(details)
-            details["chapters"] = chapters
+                # Get chapter information
+                chapters = await dispatcher.call(source, scraper, "get_chapters", details)
+                details["chapters"] = chapters
 
-            return details
+                return details
 
         elif source == "comick":
-            scraper = ComickScraper()
-            manga = {"id": id, "url": f"/comic/{id}#"}
-            details = scraper.get_manga_details(manga)
+            async def fetch_details():
+                scraper = comick_scraper
+                manga = {"id": id, "url": f"/comic/{id}#"}
+                details = await dispatcher.call(source, scraper, "get_manga_details", manga)
 
-            # Get chapter information
-            chapters = scraper.get_chapters(details)
-            details["chapters"] = chapters
+                # Get chapter information
+                chapters = await dispatcher.call(source, scraper, "get_chapters", details)
+                details["chapters"] = chapters
 
-            return details
+                return details
 
         else:
             raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
 
+        return await cached("manga/details", source, {"id": id}, fetch_details, response=http_response)
+
+    except SourceSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting details: {str(e)}")
 
@@ -315,6 +719,7 @@ async def get_manga_pages(
     source: str = Query(..., description="Source to fetch from (comick, nhentai)"),
     id: str = Query(..., description="ID or chapter ID of the manga"),
     #chapter_id: Optional[str] = Query(None, description="Chapter ID for multi-chapter manga (optional)")
+    http_response: Response = None
 ):
     """
     Get pages for a specific manga or chapter
@@ -327,23 +732,25 @@ async def get_manga_pages(
     chapter_id=id
     try:
         if source == "nhentai":
-            scraper = NHentaiScraper()
+            scraper = nhentai_scraper
 
             # Create a manga/chapter object with minimal info needed for the scraper
             if chapter_id:
                 # Use chapter_id if provided
                 chapter = {"id": chapter_id, "url": f"/g/{chapter_id}/"}
-                pages = scraper.get_pages(chapter)
+                pages = await cached("manga/get-pages", source, {"id": chapter_id},
+                                     lambda: dispatcher.call(source, scraper, "get_pages", chapter),
+                                     response=http_response)
             else:
                 # Otherwise, get the manga first, then its chapters, then pages of first chapter
                 manga = {"id": id, "url": f"/g/{id}/"}
-                details = scraper.get_manga_details(manga)
-                chapters = scraper.get_chapters(details)
+                details = await dispatcher.call(source, scraper, "get_manga_details", manga)
+                chapters = await dispatcher.call(source, scraper, "get_chapters", details)
 
                 if not chapters:
                     raise HTTPException(status_code=404, detail="No chapters found for this manga")
 
-                pages = scraper.get_pages(chapters[0])
+                pages = await dispatcher.call(source, scraper, "get_pages", chapters[0])
 
             # Calculate execution time
             execution_time_ms = int((time.time() - start_time) * 1000)
@@ -358,13 +765,15 @@ async def get_manga_pages(
             }
 
         elif source == "comick":
-            scraper = ComickScraper()
+            scraper = comick_scraper
 
             # Handle chapter pages request
             if chapter_id:
                 # Direct chapter request
                 chapter = {"id": chapter_id, "url": f"/comic/{id}/{chapter_id}-chapter-1-en"}
-                pages = scraper.get_pages(chapter_id)
+                pages = await cached("manga/get-pages", source, {"id": chapter_id},
+                                     lambda: dispatcher.call(source, scraper, "get_pages", chapter_id),
+                                     response=http_response)
             else:
                 # Get manga details first
                 #manga = {"id": id, "url": f"/comic/{id}#"}
@@ -372,12 +781,12 @@ async def get_manga_pages(
 
                 # Get chapters
                 #chapter = {"id": chapter_id, "url":}
-                chapters = scraper.get_chapters(chapter_id)
+                chapters = await dispatcher.call(source, scraper, "get_chapters", chapter_id)
                 if not chapters:
                     raise HTTPException(status_code=404, detail="No chapters found for this manga")
 
                 # Get pages for first chapter
-                pages = scraper.get_pages(chapters[0])
+                pages = await dispatcher.call(source, scraper, "get_pages", chapters[0])
 
             # Calculate execution time
             execution_time_ms = int((time.time() - start_time) * 1000)
@@ -394,6 +803,8 @@ async def get_manga_pages(
         else:
             raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
 
+    except SourceSaturatedError:
+        raise
     except Exception as e:
         # Log the error
         print(f"Error getting pages: {str(e)}")
@@ -406,7 +817,11 @@ async def search_anime(
     q: str = Query(..., description="Search query"),
     source: str = Query(..., description="Source to search (hanime, hahomoe, allanime)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -417,9 +832,19 @@ async def search_anime(
     # Get the appropriate scraper
     scraper = anime_scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("anime/search", source, scraper, "search_anime", (q,),
+                                                      {"q": q}, page, limit, anime_ids=True))
+
     try:
         # Search anime
-        results = scraper.search_anime(q)
+        listing = await fetch_listing("anime/search", source, scraper, "search_anime", (q,),
+                                      {"q": q}, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
@@ -427,25 +852,25 @@ async def search_anime(
             result["id"] = result["url"].split("<&sep>")[0]
             #result["id"] = result["id"].replace(f"\u0003E", ">")
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
             "query": q,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching anime: {str(e)}")
 
@@ -453,7 +878,11 @@ async def search_anime(
 async def get_popular_anime(
     source: str = Query(..., description="Source to fetch from (hanime,hahomoe, allanime)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -464,36 +893,43 @@ async def get_popular_anime(
     # Get the appropriate scraper
     scraper = anime_scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("anime/popular", source, scraper, "get_popular_anime", (),
+                                                      None, page, limit, anime_ids=True))
+
     try:
         # Get popular anime
-        if source == "hahomoe":
-            results = scraper.get_popular_anime(page)
-        else:
-            results = scraper.get_popular_anime()
+        listing = await fetch_listing("anime/popular", source, scraper, "get_popular_anime", (),
+                                      None, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
             result["source"] = source
             result["id"] = result["url"].split("<&sep>")[0]
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching popular anime: {str(e)}")
 
@@ -501,7 +937,11 @@ async def get_popular_anime(
 async def get_latest_anime(
     source: str = Query(..., description="Source to fetch from (hanime,hahomoe, allanime)"),
     page: Optional[int] = Query(1, description="Page number", ge=1),
-    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100)
+    limit: Optional[int] = Query(20, description="Results per page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the `next` field of a previous response"),
+    stream: Optional[str] = Query(None, description="Stream results as they arrive (1, ndjson or sse)"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     start_time = time.time()
 
@@ -512,43 +952,67 @@ async def get_latest_anime(
     # Get the appropriate scraper
     scraper = anime_scrapers[source]
 
+    # Stream results one upstream page at a time if asked to
+    fmt = stream_format(stream, accept)
+    if fmt:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor can't be combined with streaming")
+        return streaming_response(fmt, stream_listing("anime/latest", source, scraper, "get_latest_anime", (),
+                                                      None, page, limit, anime_ids=True))
+
     try:
         # Get latest anime
-        if source == "hahomoe":
-            results = scraper.get_latest_anime(page)
-        else:
-            results = scraper.get_latest_anime()
+        listing = await fetch_listing("anime/latest", source, scraper, "get_latest_anime", (),
+                                      None, page, limit, cursor, http_response)
+        results = listing["results"]
 
         # Add source to each result
         for result in results:
             result["source"] = source
             result["id"] = result["url"].split("<&sep>")[0]
 
-        # Paginate results
-        paginated_results = paginate_results(results, page, limit)
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
         # Prepare response
         response = {
-            "totalResults": len(results),
-            "page": page,
+            "totalResults": listing["totalResults"],
+            "page": listing["page"],
             "limit": limit,
             "source": source,
-            "results": paginated_results,
+            "results": results,
+            "next": listing["next"],
             "executionTimeMs": execution_time_ms
         }
 
         return response
 
+    except (SourceSaturatedError, InvalidCursorError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching latest anime: {str(e)}")
 
+async def fetch_anime_details(source: str, scraper, id: str, details: Optional[Dict[str, Any]] = None):
+    """Anime details with their episode list, or None if the anime wasn't found.
+
+    `details` may be passed when they were already fetched (e.g. by a batch lookup).
+    """
+    # Get anime details
+    if details is None:
+        details = await dispatcher.call(source, scraper, "get_anime_details", id)
+    if not details:
+        return None
+
+    # Get episodes for this anime, unless the source returned them with the details
+    if "episodes" not in details:
+        details["episodes"] = await dispatcher.call(source, scraper, "get_episodes", details)
+    return details
+
 @app.get("/api/anime/details")
 async def get_anime_details(
     source: str = Query(..., description="Source to fetch from (hanime, hahomoe, allanime)"),
-    id: str = Query(..., description="URL/ID of the anime")
+    id: str = Query(..., description="URL/ID of the anime"),
+    http_response: Response = None
 ):
     """
     Get detailed information about an anime including episodes
@@ -566,18 +1030,12 @@ async def get_anime_details(
     scraper = anime_scrapers[source]
 
     try:
-        # Get anime details
-        details = scraper.get_anime_details(id)
+        details = await cached("anime/details", source, {"id": id},
+                               lambda: fetch_anime_details(source, scraper, id), response=http_response)
 
         if not details:
             raise HTTPException(status_code=404, detail=f"Anime not found: {id}")
 
-        # Get episodes for this anime
-        episodes = scraper.get_episodes(details)
-
-        # Add episodes to details
-        details["episodes"] = episodes
-
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
 
@@ -586,19 +1044,138 @@ async def get_anime_details(
 
         return details
 
+    except SourceSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting anime details: {str(e)}")
 
+MAX_BATCH_IDS = 50
+
+@app.get("/api/anime/details/batch")
+async def get_anime_details_batch(
+    source: str = Query(..., description="Source to fetch from (hanime, hahomoe, allanime)"),
+    ids: str = Query(..., description="Comma-separated URLs/IDs of the anime"),
+    http_response: Response = None
+):
+    """
+    Get details (with episodes) for several anime at once
+
+    - **source**: Source name (hanime, hahomoe, allanime)
+    - **ids**: Comma-separated URLs/IDs, at most 50
+
+    Cached details are served from the cache. Sources with a batch lookup
+    (AllAnime) fetch the rest in a few combined upstream requests; other
+    sources fetch them concurrently, one per worker of the source's pool.
+    """
+    start_time = time.time()
+
+    # Validate source
+    if source not in anime_scrapers:
+        raise HTTPException(status_code=400, detail=f"Invalid source. Available sources: {', '.join(anime_scrapers.keys())}")
+
+    anime_ids = list(dict.fromkeys(anime_id.strip() for anime_id in ids.split(",") if anime_id.strip()))
+    if not anime_ids:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(anime_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids, at most {MAX_BATCH_IDS} per request")
+
+    # Get the appropriate scraper
+    scraper = anime_scrapers[source]
+
+    try:
+        details_by_id = {}
+        missing = []
+        for anime_id in anime_ids:
+            details, state = response_cache.lookup(make_key("anime/details", source, {"id": anime_id}))
+            if state == HIT:
+                details_by_id[anime_id] = details
+            else:
+                missing.append(anime_id)
+
+        # One lookup per worker at a time, so a large batch doesn't overflow the source's own queue
+        workers = asyncio.Semaphore(dispatcher.pool(source).max_workers)
+
+        async def fetch_one(anime_id: str, details: Optional[Dict[str, Any]] = None):
+            async with workers:
+                return await fetch_anime_details(source, scraper, anime_id, details)
+
+        if missing and hasattr(scraper, "get_anime_details_batch"):
+            fetched = await dispatcher.call(source, scraper, "get_anime_details_batch", missing)
+            # Ids the batch didn't find get {} so they aren't looked up again one by one
+            found = await asyncio.gather(*(fetch_one(anime_id, fetched.get(anime_id) or {}) for anime_id in missing))
+        else:
+            found = await asyncio.gather(*(fetch_one(anime_id) for anime_id in missing))
+
+        for anime_id, details in zip(missing, found):
+            store_cached("anime/details", make_key("anime/details", source, {"id": anime_id}), details)
+            details_by_id[anime_id] = details
+
+        if http_response is not None:
+            http_response.headers["X-Cache"] = MISS if missing else HIT
+
+        # Calculate execution time
+        execution_time_ms = int((time.time() - start_time) * 1000)
+
+        return {
+            "source": source,
+            "results": [details_by_id[anime_id] for anime_id in anime_ids if details_by_id.get(anime_id)],
+            "notFound": [anime_id for anime_id in anime_ids if not details_by_id.get(anime_id)],
+            "executionTimeMs": execution_time_ms
+        }
+
+    except SourceSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting anime details: {str(e)}")
+
+async def stream_episode(source: str, scraper: Any, id: str, quality: Optional[str], max_streams: Optional[int]):
+    """(event, data) pairs for a streamed get-episode request.
+
+    Scrapers with iter_video_sources report each hoster as it finishes;
+    the others resolve in one go and send a single `server` event.
+    """
+    start_time = time.time()
+    if hasattr(scraper, "iter_video_sources"):
+        events = iterate_in_thread(lambda: scraper.iter_video_sources(id, quality=quality, max_streams=max_streams),
+                                   run=lambda fn: dispatcher.run(source, fn))
+        async for event, data in events:
+            if event == "done":
+                data = {"source": source, "episode_id": id, **data,
+                        "executionTimeMs": int((time.time() - start_time) * 1000)}
+            yield event, data
+        return
+
+    video_sources = select_streams(await dispatcher.call(source, scraper, "get_video_sources", id), quality, max_streams)
+    time_ms = int((time.time() - start_time) * 1000)
+    yield "server", {"server": source, "streams": video_sources, "timeMs": time_ms}
+    yield "done", {
+        "source": source,
+        "episode_id": id,
+        "streams": video_sources,
+        "servers": {source: {"status": "ok" if video_sources else "empty", "streams": len(video_sources), "timeMs": time_ms}},
+        "executionTimeMs": time_ms
+    }
+
 @app.get("/api/anime/get-episode")
 async def get_anime_episode(
     source: str = Query(..., description="Source to fetch from (hanime, hahomoe, allanime)"),
-    id: str = Query(..., description="URL/ID of the anime episode")
+    id: str = Query(..., description="URL/ID of the anime episode"),
+    quality: Optional[str] = Query(None, description="Preferred quality, e.g. 1080 or 720p"),
+    max_streams: Optional[int] = Query(None, description="Return at most this many streams", ge=1, le=50),
+    stream: Optional[str] = Query(None, description="Stream results per hoster: ndjson, sse or 1"),
+    accept: Optional[str] = Header(None),
+    http_response: Response = None
 ):
     """
     Get streaming links for a specific anime episode
 
     - **source**: Source name (hanime, hahomoe, allanime)
     - **id**: URL/ID of the anime episode
+    - **quality**: Only return streams of this quality (all streams if none match)
+    - **max_streams**: Return at most this many streams. Sources that resolve
+      several hosters (AllAnime) stop as soon as enough matching streams were found
+    - **stream**: Send a `server` event with each hoster's streams as soon as
+      it is extracted, then a `done` event with the full result and per-hoster timings
     """
     start_time = time.time()
 
@@ -609,9 +1186,23 @@ async def get_anime_episode(
     # Get the appropriate scraper
     scraper = anime_scrapers[source]
 
+    fmt = stream_format(stream, accept)
+    if fmt:
+        return streaming_response(fmt, stream_episode(source, scraper, id, quality, max_streams))
+
     try:
         # Get video sources for the episode
-        video_sources = scraper.get_video_sources(id)
+        # Signed stream URLs expire, so the entry never outlives the earliest one
+        default_ttl = response_cache.ttl_for("anime/get-episode")
+        # Sources that can stop early get the target, the others are narrowed afterwards
+        target = {"quality": quality, "max_streams": max_streams} if quality or max_streams else {}
+        if target and not accepts_params(scraper.get_video_sources, *target):
+            target = {}
+        video_sources = await cached("anime/get-episode", source, {"id": id, "quality": quality, "max_streams": max_streams},
+                                     lambda: dispatcher.call(source, scraper, "get_video_sources", id, **target),
+                                     ttl=lambda streams: streams_ttl(streams, default_ttl),
+                                     response=http_response)
+        video_sources = select_streams(video_sources, quality, max_streams)
 
         # Calculate execution time
         execution_time_ms = int((time.time() - start_time) * 1000)
@@ -626,6 +1217,8 @@ async def get_anime_episode(
 
         return response
 
+    except SourceSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting anime episode data: {str(e)}")
 
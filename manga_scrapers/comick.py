@@ -6,6 +6,12 @@ import urllib.parse
 import requests
 import cloudscraper
 from typing import List, Dict, Any, Optional, Set
+import asyncio
+import httpx
+from scraper_utils.http_transport import get_transport
+from scraper_utils.dispatch import BlockingFallback
+from scraper_utils.pagination import page_result
+from scraper_utils.fanout import collect_pages
 from datetime import datetime
 import math
 import random
@@ -19,6 +25,7 @@ class ComickScraper:
     # API URLs
     BASE_URL = "https://comick.io"
     API_URL = "https://api.comick.fun"
+    API_HOST = "api.comick.fun"
     
     def __init__(self, session: Optional[requests.Session] = None, lang: str = "en"):
         """Initialize ComickScraper with optional session and language preference."""
@@ -105,17 +112,7 @@ class ComickScraper:
                 return []
             
             # Transform the results
-            manga_list = []
-            for item in response:
-                manga = {
-                    "id": item.get("hid", ""),
-                    "title": item.get("title", "Unknown"),
-                    "url": f"/comic/{item.get('hid')}#", 
-                    "thumbnail_url": self._parse_cover(item.get("cover_url"), item.get("md_covers", []))
-                }
-                manga_list.append(manga)
-            
-            return manga_list
+            return [self._search_item(item) for item in response]
         
         # Filter search
         url = f"{self.API_URL}/v1.0/search"
@@ -127,46 +124,85 @@ class ComickScraper:
         
         # Apply filters
         self._apply_filters(params, filters)
+        self._apply_ignored_tags(params)
+        
+        def fetch_page(page_number: int) -> Dict[str, Any]:
+            response = self._make_request(url, params={**params, "page": page_number})
+            if not response:
+                return {"results": [], "hasNextPage": False}
+            return {
+                "results": [self._filter_search_item(item) for item in response],
+                # A short page is the last one
+                "hasNextPage": len(response) >= params["limit"]
+            }
+        
+        # Fetch multiple pages if needed for filter search (limit to 5 pages).
+        # The API doesn't report a page count, so after a full first page the
+        # others are requested together and cut off at the first short one.
+        return collect_pages(fetch_page, 1, 5, self.API_HOST, key=lambda manga: manga["id"])
+    
+    def search_manga_page(self, query: str, page: int = 1, limit: int = 20,
+                          filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Search for manga, requesting just (page, limit) from the API."""
+        print(f"🔍 Searching for manga: '{query}' (page {page}, limit {limit})...")
+        
+        filters = filters or {}
         
-        # Add ignored tags from preferences
+        # Slug/id searches resolve to a single manga
+        if query.startswith(self.SLUG_SEARCH_PREFIX):
+            results = self.search_manga(query) if page == 1 else []
+            return page_result(results, page, limit, total_results=len(results), has_next_page=False)
+        
+        url = f"{self.API_URL}/v1.0/search"
+        params = {
+            "limit": limit,
+            "page": page,
+            "tachiyomi": "true"
+        }
+        if query:
+            params["q"] = query.strip()
+        else:
+            self._apply_filters(params, filters)
+            self._apply_ignored_tags(params)
+        
+        response = self._make_request(url, params=params)
+        if not response:
+            return page_result([], page, limit, has_next_page=False)
+        
+        transform = self._search_item if query else self._filter_search_item
+        return page_result([transform(item) for item in response], page, limit)
+    
+    def get_popular_manga_page(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
+        """Get one page of popular manga."""
+        return self.search_manga_page("", page=page, limit=limit, filters={"sort": "follow"})
+    
+    def get_latest_manga_page(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
+        """Get one page of latest updated manga."""
+        return self.search_manga_page("", page=page, limit=limit, filters={"sort": "uploaded"})
+    
+    def _search_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a text search result."""
+        return {
+            "id": item.get("hid", ""),
+            "title": item.get("title", "Unknown"),
+            "url": f"/comic/{item.get('hid')}#", 
+            "thumbnail_url": self._parse_cover(item.get("cover_url"), item.get("md_covers", []))
+        }
+    
+    def _filter_search_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a filter search result, which also carries description and status."""
+        manga = self._search_item(item)
+        manga["description"] = item.get("desc", "")
+        manga["status"] = self._parse_status(item.get("status"), item.get("translation_completed"))
+        return manga
+    
+    def _apply_ignored_tags(self, params: Dict[str, Any]):
+        """Add ignored tags from preferences as excluded tags."""
         if self.preferences["ignored_tags"]:
             ignored_tags = self.preferences["ignored_tags"].split(",")
             for tag in ignored_tags:
                 if tag.strip():
                     params.setdefault("excluded-tags", []).append(self._format_tag(tag.strip()))
-        
-        all_results = []
-        current_page = 1
-        has_next_page = True
-        
-        # Fetch multiple pages if needed for filter search
-        while has_next_page and current_page <= 5:  # Limit to 5 pages
-            params["page"] = current_page
-            response = self._make_request(url, params=params)
-            
-            if not response or len(response) == 0:
-                has_next_page = False
-                break
-                
-            # Transform the results
-            for item in response:
-                manga = {
-                    "id": item.get("hid", ""),
-                    "title": item.get("title", "Unknown"),
-                    "url": f"/comic/{item.get('hid')}#", 
-                    "thumbnail_url": self._parse_cover(item.get("cover_url"), item.get("md_covers", [])),
-                    "description": item.get("desc", ""),
-                    "status": self._parse_status(item.get("status"), item.get("translation_completed"))
-                }
-                all_results.append(manga)
-            
-            # Check if we should continue to next page
-            if len(response) < params["limit"]:
-                has_next_page = False
-            else:
-                current_page += 1
-        
-        return all_results
     
     def _paginate_search_results(self, page: int) -> List[Dict[str, Any]]:
         """Paginate search results."""
@@ -479,6 +515,39 @@ class ComickScraper:
                 chapter_data = response.get("chapter", {})
                 images = chapter_data.get("images", [])
         
+        return self._pages_from_images(images)
+    
+    async def async_get_pages(self, chapter: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Async variant of get_pages built on the shared transport.
+
+        Raises BlockingFallback when the API can't be reached without the
+        cloudscraper session (e.g. while a Cloudflare challenge is active), so
+        the dispatcher runs get_pages on the source's pool instead.
+        """
+        if type(chapter) == dict:
+            chapter_hid = chapter["url"].split("/")[-1].split("-")[0]
+        else:
+            chapter_hid = chapter
+        url = f"{self.API_URL}/chapter/{chapter_hid}"
+        params = {"tachiyomi": "true"}
+        
+        response = await self._async_make_request(url, params=params)
+        if response is None:
+            raise BlockingFallback("API unreachable without the cloudscraper session")
+        
+        images = response.get("chapter", {}).get("images", [])
+        
+        if not images:
+            # Try cache busting
+            params["_"] = str(int(time.time() * 1000))
+            response = await self._async_make_request(url, params=params)
+            if response:
+                images = response.get("chapter", {}).get("images", [])
+        
+        return self._pages_from_images(images)
+    
+    def _pages_from_images(self, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build the page list from a chapter's images."""
         pages = []
         for i, img in enumerate(images):
             if img.get("url"):
@@ -489,6 +558,40 @@ class ComickScraper:
         
         return pages
     
+    async def _async_make_request(self, url: str, params: Optional[Dict[str, Any]] = None, retries: int = 3) -> Any:
+        """Async GET against the API with the same retry logic as _make_request."""
+        last_error = None
+        for attempt in range(retries):
+            try:
+                response = await get_transport().get(url, params=params, headers=self.headers, timeout=30)
+                response.raise_for_status()
+                
+                data = response.json()
+                
+                # Check for API error
+                if isinstance(data, dict) and "statusCode" in data and "message" in data:
+                    print(f"❌ API error: {data['statusCode']} - {data['message']}")
+                    return None
+                
+                return data
+                
+            except httpx.HTTPStatusError as e:
+                # A 403/503 usually means a Cloudflare challenge; retrying won't help
+                if e.response.status_code in (403, 503):
+                    print(f"⚠️ Async request blocked ({e.response.status_code}), using cloudscraper session")
+                    return None
+                last_error = e
+            except (httpx.HTTPError, json.JSONDecodeError) as e:
+                last_error = e
+            
+            wait_time = 2 ** attempt  # Exponential backoff
+            print(f"⚠️ Request attempt {attempt+1}/{retries} failed: {last_error}")
+            print(f"Waiting {wait_time} seconds before retry...")
+            await asyncio.sleep(wait_time)
+        
+        print(f"❌ All {retries} request attempts failed. Last error: {last_error}")
+        return None
+    
     def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", retries: int = 3) -> Any:
         """Make a request to the API with retry logic."""
         try:
@@ -5,7 +5,29 @@ import requests
 import cloudscraper
 from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
+from scraper_utils.html_parser import elements_with_class, make_soup
 from datetime import datetime
+from scraper_utils.pagination import fetch_window
+from scraper_utils.fanout import collect_pages
+from scraper_utils.ttl_cache import TTLCache
+from scraper_utils.embedded_json import find_json_parse
+
+# Gallery metadata (titles, tags, media_id and page types) doesn't change once
+# published. Details and pages both read it from here, so opening a gallery
+# and reading it costs one upstream request. Pages we could only parse as
+# plain HTML are not cached.
+GALLERY_TTL = 6 * 3600
+gallery_cache = TTLCache("nhentai-galleries", ttl=GALLERY_TTL, max_entries=2048)
+
+
+def _gallery_ttl(gallery: Dict[str, Any]) -> float:
+    return GALLERY_TTL if gallery.get("gallery") else 0
+
+
+# Listing pages are parsed for their gallery cards and pagination only, so
+# the rest of the page is never built into a tree
+LISTING_ELEMENTS = elements_with_class(["div", "section"], ["gallery", "pagination"])
+
 
 class NHentaiScraper:
     """Scraper for nhentai based on the Kotlin implementation"""
@@ -14,6 +36,8 @@ class NHentaiScraper:
     BASE_URL = "https://nhentai.net"
     API_URL = "https://nhentai.net/api"
     ID_SEARCH_PREFIX = "id:"
+    RESULTS_PER_PAGE = 25
+    HOST = "nhentai.net"
     
     # Image type mapping
     IMAGE_TYPES = {
@@ -48,6 +72,9 @@ class NHentaiScraper:
             "display_full_title": True,
             "media_server": 1
         }
+
+        # Listing page size, used to stream results one upstream page at a time
+        self.upstream_page_size = self.RESULTS_PER_PAGE
     
     def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search for manga with filters."""
@@ -81,47 +108,95 @@ class NHentaiScraper:
         if filters.get("favorites_only", False):
             base_search_url = f"{self.BASE_URL}/favorites"
         
-        # Make the request and fetch all pages
+        # Fetch page 1, then the remaining pages (up to 5 to prevent overloading)
+        # concurrently once the pagination tells us how many there are
         try:
-            all_results = []
-            current_page = 1
-            has_next_page = True
-            
-            while has_next_page:
-                url_params["page"] = current_page
-                response = self.session.get(
-                    base_search_url, 
-                    params=url_params, 
-                    headers=self.headers,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                page_results = self._parse_search_results(soup)
-                
-                if page_results:
-                    all_results.extend(page_results)
-                    
-                    # Check if there's a next page
-                    next_page = soup.select_one("#content > section.pagination > a.next")
-                    if next_page:
-                        current_page += 1
-                    else:
-                        has_next_page = False
-                else:
-                    has_next_page = False
-                
-                # Safety check to prevent too many requests
-                if current_page > 5:  # Limit to 5 pages to prevent overloading
-                    break
-            
-            return all_results
+            return collect_pages(
+                lambda upstream_page: self._listing_upstream_page(base_search_url, {**url_params, "page": upstream_page}),
+                1, 5, self.HOST,
+                key=lambda manga: manga["id"]
+            )
             
         except Exception as e:
             print(f"❌ Error searching nhentai: {e}")
             return []
     
+    def search_manga_page(self, query: str, page: int = 1, limit: int = 20,
+                          filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Search for manga, fetching only the result pages needed for (page, limit)."""
+        print(f"🔍 Searching for doujin: '{query}' (page {page}, limit {limit})...")
+        
+        filters = filters or {}
+        
+        # ID searches resolve to a single gallery
+        if query.startswith(self.ID_SEARCH_PREFIX) or query.isdigit():
+            results = self.search_manga(query, filters=filters) if page == 1 else []
+            return {"results": results, "totalResults": len(results), "hasNextPage": False}
+        
+        base_search_url = f"{self.BASE_URL}/search"
+        url_params = {"q": self._build_search_query(query, filters)}
+        if "sort" in filters:
+            url_params["sort"] = filters["sort"]
+        if filters.get("favorites_only", False):
+            base_search_url = f"{self.BASE_URL}/favorites"
+        
+        return self._listing_window(
+            lambda upstream_page: self._listing_upstream_page(base_search_url, {**url_params, "page": upstream_page}),
+            page, limit
+        )
+    
+    def get_popular_manga_page(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
+        """Get one page of popular manga."""
+        print(f"🔍 Getting popular doujinshi (page {page}, limit {limit})...")
+        return self._listing_window(
+            lambda upstream_page: self._listing_upstream_page(f"{self.BASE_URL}/popular", {"page": upstream_page}),
+            page, limit
+        )
+    
+    def get_latest_manga_page(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
+        """Get one page of latest manga."""
+        print(f"🔍 Getting latest doujinshi (page {page}, limit {limit})...")
+        return self._listing_window(
+            lambda upstream_page: self._listing_upstream_page(self.BASE_URL, {"page": upstream_page}),
+            page, limit
+        )
+    
+    def _listing_window(self, fetch_page, page: int, limit: int) -> Dict[str, Any]:
+        """Fetch the listing pages covering API page `page` of size `limit`."""
+        try:
+            window = fetch_window(fetch_page, page, limit, self.upstream_page_size, host=self.HOST,
+                                  key=lambda manga: manga["id"])
+            window.pop("perPage")
+            return window
+        except Exception as e:
+            print(f"❌ Error fetching nhentai page {page}: {e}")
+            return {"results": [], "totalResults": 0, "hasNextPage": False}
+    
+    def _listing_upstream_page(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch and parse one listing page along with its pagination info."""
+        response = self.session.get(
+            url,
+            params=params,
+            headers=self.headers,
+            timeout=30
+        )
+        response.raise_for_status()
+        
+        soup = make_soup(response.text, parse_only=LISTING_ELEMENTS)
+        return {
+            "results": self._parse_search_results(soup),
+            "hasNextPage": soup.select_one("section.pagination > a.next") is not None,
+            "totalPages": self._last_page(soup)
+        }
+    
+    def _last_page(self, soup: BeautifulSoup) -> Optional[int]:
+        """Page number of the "last" pagination link, if present."""
+        last_link = soup.select_one("section.pagination > a.last")
+        if not last_link:
+            return None
+        match = re.search(r"[?&]page=(\d+)", last_link.get("href", ""))
+        return int(match.group(1)) if match else None
+    
     def _build_search_query(self, query: str, filters: Dict[str, Any]) -> str:
         """Build search query with filters."""
         search_parts = [query] if query else []
@@ -217,7 +292,7 @@ class NHentaiScraper:
             )
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = make_soup(response.text, parse_only=LISTING_ELEMENTS)
             return self._parse_search_results(soup)
         except Exception as e:
             print(f"❌ Error getting popular manga: {e}")
@@ -240,20 +315,73 @@ class NHentaiScraper:
             )
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = make_soup(response.text, parse_only=LISTING_ELEMENTS)
             return self._parse_search_results(soup)
         except Exception as e:
             print(f"❌ Error getting latest manga: {e}")
             return []
     
-    def get_manga_details(self, manga: Dict[str, Any]) -> Dict[str, Any]:
-        """Get detailed information about a manga."""
-        manga_id = manga.get("id", "")
+    def _manga_id(self, item: Dict[str, Any]) -> str:
+        """Gallery id of a manga or chapter dict, taken from its url if it has no id."""
+        manga_id = item.get("id", "")
         if not manga_id:
-            # Try to extract from URL
-            url = manga.get("url", "")
+            url = item.get("url", "")
             manga_id = url.split("/")[-2] if url else ""
-            
+        return str(manga_id)
+
+    def _fetch_gallery_api(self, manga_id: str) -> Optional[Dict[str, Any]]:
+        """Gallery metadata from the JSON API, or None if it can't be used."""
+        try:
+            response = self.session.get(f"{self.API_URL}/gallery/{manga_id}", headers=self.headers, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            print(f"⚠️ nhentai API failed for {manga_id}, falling back to the gallery page: {e}")
+            return None
+        if not isinstance(data, dict) or not data.get("media_id") or not data.get("images"):
+            return None
+        return data
+
+    def _fetch_gallery_page(self, manga_id: str) -> requests.Response:
+        """The gallery's HTML page."""
+        response = self.session.get(f"{self.BASE_URL}/g/{manga_id}/", headers=self.headers, timeout=30)
+        response.raise_for_status()
+        return response
+
+    def _fetch_gallery(self, manga_id: str) -> Dict[str, Any]:
+        """Fetch a gallery's metadata, from the JSON API if possible and the gallery page otherwise.
+
+        Returns {"gallery": metadata or None, "media_server": int, "html": str or None};
+        the page's html is only kept when no metadata could be found in it.
+        """
+        data = self._fetch_gallery_api(manga_id)
+        if data is not None:
+            # The preference is only a fallback for responses that don't name a server
+            media_server = str(data.get("media_server", ""))
+            media_server = int(media_server) if media_server.isdigit() else self.preferences["media_server"]
+            return {"gallery": data, "media_server": media_server, "html": None}
+
+        response = self._fetch_gallery_page(manga_id)
+
+        # Read the embedded JSON and media server straight from the bytes; the
+        # page is only parsed as HTML (by the callers) if that fails
+        media_server = self.preferences["media_server"]
+        media_server_match = re.search(rb'media_server\s*:\s*(\d+)', response.content)
+        if media_server_match:
+            media_server = int(media_server_match.group(1))
+
+        data = find_json_parse(response.content)
+        if not isinstance(data, dict) or not data.get("media_id"):
+            data = None
+        return {"gallery": data, "media_server": media_server, "html": None if data else response.text}
+
+    def _gallery(self, manga_id: str) -> Dict[str, Any]:
+        """_fetch_gallery through gallery_cache, so details and pages share one fetch."""
+        return gallery_cache.get_or_load(manga_id, lambda: self._fetch_gallery(manga_id), ttl=_gallery_ttl)
+
+    def get_manga_details(self, manga: Dict[str, Any]) -> Dict[str, Any]:
+        """Get detailed information about a manga."""
+        manga_id = self._manga_id(manga)
         if not manga_id:
             print("❌ No manga ID found")
             return {}
@@ -261,42 +389,20 @@ class NHentaiScraper:
         print(f"🔍 Getting doujin details for ID: {manga_id}")
         
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/g/{manga_id}/",
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Extract JSON data from script
-            script_data = soup.select_one("#__nuxt")
-            if not script_data:
-                script_data = soup.select_one("script:contains(JSON.parse)")
-            
-            if not script_data:
-                return self._parse_manga_details_html(soup, manga_id)
-            
-            # Try to extract JSON data using regex
-            json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
-            if not json_match:
-                return self._parse_manga_details_html(soup, manga_id)
-            
-            # Parse the JSON data
-            json_str = json_match.group(1)
-            # Unescape unicode
-            json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
-            # Unescape other escape sequences
-            json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
-            
-            data = json.loads(json_str)
-            return self._parse_manga_details_json(data, manga_id)
+            gallery = self._gallery(manga_id)
+            if gallery["gallery"]:
+                try:
+                    return self._parse_manga_details_json(gallery["gallery"], manga_id)
+                except Exception as e:
+                    print(f"❌ Error parsing gallery JSON, falling back to HTML: {e}")
+
+            # Metadata from the API comes without the page, so fetch it for the fallback
+            html = gallery["html"] or self._fetch_gallery_page(manga_id).text
+            return self._parse_manga_details_html(make_soup(html), manga_id)
             
         except Exception as e:
             print(f"❌ Error getting manga details: {e}")
-            # Try fallback to HTML parsing
-            return self._parse_manga_details_html(soup, manga_id)
+            return {}
     
     def _parse_manga_details_json(self, data: Dict[str, Any], manga_id: str) -> Dict[str, Any]:
         """Parse manga details from JSON data."""
@@ -490,76 +596,38 @@ class NHentaiScraper:
             "source": "nhentai"
         }]
     
+    def _pages_from_gallery(self, data: Dict[str, Any], media_server: int) -> List[Dict[str, Any]]:
+        """Image urls of every page, from the gallery's media_id and page types."""
+        media_id = data.get("media_id", "")
+        pages_data = []
+        for i, page in enumerate(data.get("images", {}).get("pages", [])):
+            extension = self.IMAGE_TYPES.get(page.get("t", "j"), "jpg")
+            pages_data.append({
+                "index": i,
+                "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.{extension}"
+            })
+        return pages_data
+
     def get_pages(self, chapter: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get pages for a chapter."""
         print(f"🔍 Getting pages for chapter: {chapter.get('name', chapter.get('url', 'Unknown'))}")
         
-        manga_id = chapter.get("id", "")
-        if not manga_id:
-            url = chapter.get("url", "")
-            manga_id = url.split("/")[-2] if url else ""
-        
+        manga_id = self._manga_id(chapter)
         if not manga_id:
             print("❌ No manga ID found for pages")
             return []
         
         try:
-            response = self.session.get(
-                f"{self.BASE_URL}/g/{manga_id}/",
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # First try to extract from script
+            # Usually already cached by the details request
+            gallery = self._gallery(manga_id)
+            media_server = gallery["media_server"]
             media_id = None
-            pages_data = []
-            
-            # Try to find media server
-            media_server = self.preferences["media_server"]
-            media_server_match = re.search(r'media_server\s*:\s*(\d+)', response.text)
-            if media_server_match:
-                media_server = int(media_server_match.group(1))
-            
-            # Try to extract JSON data
-            script_data = None
-            for script in soup.select("script"):
-                if script.string and "JSON.parse" in script.string:
-                    script_data = script
-                    break
-                    
-            if script_data:
-                json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
-                if json_match:
-                    json_str = json_match.group(1)
-                    json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
-                    json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
-                    
-                    try:
-                        data = json.loads(json_str)
-                        media_id = data.get("media_id", "")
-                        
-                        # Extract image data
-                        images = data.get("images", {})
-                        pages = images.get("pages", [])
-                        
-                        for i, page in enumerate(pages):
-                            page_type = page.get("t", "j")
-                            extension = self.IMAGE_TYPES.get(page_type, "jpg")
-                            pages_data.append({
-                                "index": i,
-                                "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.{extension}"
-                            })
-                    except json.JSONDecodeError:
-                        print(f"Error parsing JSON data: {json_str[:100]}...")
-                    except Exception as e:
-                        print(f"Error processing JSON data: {e}")
+            pages_data = self._pages_from_gallery(gallery["gallery"], media_server) if gallery["gallery"] else []
             
             # If we couldn't extract from JSON, try HTML
-            if not pages_data:
+            if not pages_data and gallery["html"]:
                 print("Falling back to HTML parsing for pages...")
+                soup = make_soup(gallery["html"])
                 # Try to get media ID from thumbnail
                 thumb_element = soup.select_one("#cover img")
                 if thumb_element:
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from scraper_utils.singleflight import SingleFlight, call_key
+
+# Defaults used when a source has no explicit configuration
+DEFAULT_POOL_SIZE = 4
+DEFAULT_QUEUE_DEPTH = 16
+
+# Per-source overrides (workers, queue depth). Sources behind Cloudflare or with
+# slow multi-page scrapes get a little more head room.
+SOURCE_DEFAULTS = {
+    "comick": (4, 16),
+    "nhentai": (4, 16),
+    "hanime": (4, 16),
+    "hahomoe": (4, 16),
+    "allanime": (6, 24),
+}
+
+
+class SourceSaturatedError(Exception):
+    """Raised when a source's worker pool and queue are both full."""
+
+    def __init__(self, source: str, capacity: int):
+        self.source = source
+        self.capacity = capacity
+        super().__init__(f"Source '{source}' is saturated ({capacity} requests in flight)")
+
+
+class BlockingFallback(Exception):
+    """Raised by an `async_<method>` that can't do its job without the blocking `<method>`.
+
+    ScraperDispatcher.call then runs `<method>` on the source's pool, under
+    the same admission limit as any other blocking call.
+    """
+
+
+class SourcePool:
+    """Bounded thread pool for the blocking scraper calls of a single source."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"scraper-{name}")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise SourceSaturatedError(self.name, self.capacity)
+            self._in_flight += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on this pool without blocking the event loop."""
+        self._acquire()
+        try:
+            future = self.executor.submit(partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        # Release the slot when the thread finishes, not when the caller stops
+        # waiting, so a disconnected client can't free capacity early.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def run_async(self, coro_fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await a native async scraper call under the same admission limit."""
+        self._acquire()
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "workers": self.max_workers,
+                "queueDepth": self.max_queue,
+                "inFlight": in_flight,
+                "queued": max(0, in_flight - self.max_workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+class ScraperDispatcher:
+    """Routes blocking scraper calls onto per-source bounded thread pools.
+
+    Pool sizes can be overridden per source with the environment variables
+    SCRAPER_POOL_<SOURCE> (worker threads) and SCRAPER_QUEUE_<SOURCE>
+    (requests allowed to wait for a worker), e.g. SCRAPER_POOL_NHENTAI=8.
+
+    Identical concurrent calls made through call() are coalesced, so a burst
+    of requests for the same ID costs one upstream scrape.
+    """
+
+    def __init__(self, sources: Iterable[str] = ()):
+        self._pools: Dict[str, SourcePool] = {}
+        self._lock = threading.Lock()
+        self.singleflight = SingleFlight()
+        for source in sources:
+            self.pool(source)
+
+    def _config_for(self, source: str):
+        workers, queue = SOURCE_DEFAULTS.get(source, (DEFAULT_POOL_SIZE, DEFAULT_QUEUE_DEPTH))
+        key = source.upper()
+        workers = int(os.environ.get(f"SCRAPER_POOL_{key}", workers))
+        queue = int(os.environ.get(f"SCRAPER_QUEUE_{key}", queue))
+        return max(1, workers), max(0, queue)
+
+    def pool(self, source: str) -> SourcePool:
+        """Get (or lazily create) the pool for a source."""
+        with self._lock:
+            pool = self._pools.get(source)
+            if pool is None:
+                workers, queue = self._config_for(source)
+                pool = SourcePool(source, workers, queue)
+                self._pools[source] = pool
+            return pool
+
+    def configure(self, source: str, max_workers: int, max_queue: Optional[int] = None) -> SourcePool:
+        """Replace a source's pool with a new size. In-flight calls finish on the old pool."""
+        with self._lock:
+            old = self._pools.get(source)
+            if max_queue is None:
+                max_queue = old.max_queue if old else DEFAULT_QUEUE_DEPTH
+            self._pools[source] = SourcePool(source, max(1, max_workers), max(0, max_queue))
+        if old:
+            old.executor.shutdown(wait=False)
+        return self._pools[source]
+
+    async def run(self, source: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking scraper call on the source's pool.
+
+        Raises SourceSaturatedError if the pool and its queue are full.
+        """
+        return await self.pool(source).run(fn, *args, **kwargs)
+
+    async def call(self, source: str, scraper: Any, method: str, *args, **kwargs) -> Any:
+        """Call a scraper method, preferring its native `async_<method>` variant.
+
+        Scrapers without an async variant, or whose async variant raises
+        BlockingFallback, run on the source's thread pool.
+        Callers asking for the same (source, method, args) while a call is in
+        flight share its result.
+        """
+        key = call_key(source, method, args, kwargs)
+        return await self.singleflight.do(
+            key, lambda: self._call(source, scraper, method, *args, **kwargs), group=source
+        )
+
+    async def _call(self, source: str, scraper: Any, method: str, *args, **kwargs) -> Any:
+        async_fn = getattr(scraper, f"async_{method}", None)
+        if async_fn is not None:
+            try:
+                return await self.pool(source).run_async(async_fn, *args, **kwargs)
+            except BlockingFallback as e:
+                print(f"↩️ {source} {method}: {str(e)}, retrying on the thread pool")
+        return await self.run(source, getattr(scraper, method), *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.executor.shutdown(wait=wait)
@@ -0,0 +1,87 @@
+import json
+import re
+from typing import Any, Optional
+
+_JSON_PARSE_CALL = re.compile(rb'JSON\.parse\(\s*(["\'])')
+
+_SIMPLE_ESCAPES = {
+    "n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "v": "\v", "0": "\0",
+    "\\": "\\", "'": "'", '"': '"', "/": "/", "\n": "", "\r": "",
+}
+
+
+def decode_js_string(literal: str) -> str:
+    """Decode the body of a JS string literal (without its quotes) in one pass.
+
+    Most literals only use escapes JSON also has, so they go through the C
+    JSON decoder. JS-only escapes (\\x41, \\', \\v, line continuations) are
+    handled by a small fallback.
+    """
+    try:
+        return json.loads(f'"{literal}"')
+    except ValueError:
+        pass
+
+    out = []
+    i = 0
+    length = len(literal)
+    while i < length:
+        backslash = literal.find("\\", i)
+        if backslash < 0:
+            out.append(literal[i:])
+            break
+        out.append(literal[i:backslash])
+        escape = literal[backslash + 1:backslash + 2]
+        if escape == "u" and literal[backslash + 2:backslash + 3] == "{":
+            end = literal.index("}", backslash)
+            out.append(chr(int(literal[backslash + 3:end], 16)))
+            i = end + 1
+        elif escape == "u":
+            code = int(literal[backslash + 2:backslash + 6], 16)
+            i = backslash + 6
+            # Join surrogate pairs
+            if 0xD800 <= code < 0xDC00 and literal[i:i + 2] == "\\u":
+                low = int(literal[i + 2:i + 6], 16)
+                if 0xDC00 <= low < 0xE000:
+                    code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                    i += 6
+            out.append(chr(code))
+        elif escape == "x":
+            out.append(chr(int(literal[backslash + 2:backslash + 4], 16)))
+            i = backslash + 4
+        else:
+            out.append(_SIMPLE_ESCAPES.get(escape, escape))
+            i = backslash + 2
+    return "".join(out)
+
+
+def find_json_parse(content: bytes) -> Optional[Any]:
+    """The value of the first JSON.parse("...") call in a page, straight from its bytes.
+
+    Returns None if there is no such call or it doesn't decode.
+    """
+    start = content.find(b"JSON.parse(")
+    if start < 0:
+        return None
+    match = _JSON_PARSE_CALL.match(content, start)
+    if not match:
+        return None
+
+    # The literal ends at the first quote not escaped by an odd run of backslashes
+    quote = match.group(1)
+    end = match.end()
+    while True:
+        end = content.find(quote, end)
+        if end < 0:
+            return None
+        backslashes = 0
+        while content[end - 1 - backslashes] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            break
+        end += 1
+
+    try:
+        return json.loads(decode_js_string(content[match.end():end].decode("utf-8", errors="replace")))
+    except ValueError:
+        return None
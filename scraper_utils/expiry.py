@@ -0,0 +1,80 @@
+import re
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+# Query parameters that carry an absolute unix expiry timestamp
+EXPIRY_PARAMS = ("expires", "expire", "expiry", "exp", "e", "Expires", "deadline", "validto", "valid_to")
+
+# Some CDNs put the expiry in the path instead, e.g. /exp=1700000000~acl=.../
+PATH_EXPIRY_RE = re.compile(r"(?:exp|expires)=(\d{10})")
+
+# Anything further out than this is ignored rather than trusted
+MAX_EXPIRY_SECONDS = 30 * 24 * 3600
+
+
+def _as_timestamp(value: str, now: float) -> Optional[float]:
+    """Parse a unix timestamp (seconds or milliseconds) that lies in the future."""
+    if not value or not value.isdigit():
+        return None
+    ts = float(value)
+    if ts > 1e12:
+        ts /= 1000.0
+    if now < ts <= now + MAX_EXPIRY_SECONDS:
+        return ts
+    return None
+
+
+def url_expiry(url: str, now: Optional[float] = None) -> Optional[float]:
+    """Return the unix time a signed stream URL stops working, if it says so.
+
+    Understands plain expiry parameters (`expires=`, `exp=`, `e=` ...), S3
+    style `X-Amz-Date` + `X-Amz-Expires` and expiry tokens in the path.
+    Returns None for URLs without a recognisable expiry.
+    """
+    if not url:
+        return None
+    now = time.time() if now is None else now
+    parsed = urllib.parse.urlparse(url)
+    params = urllib.parse.parse_qs(parsed.query)
+
+    for name in EXPIRY_PARAMS:
+        for value in params.get(name, []):
+            ts = _as_timestamp(value, now)
+            if ts is not None:
+                return ts
+
+    amz_date = params.get("X-Amz-Date", [None])[0]
+    amz_expires = params.get("X-Amz-Expires", [None])[0]
+    if amz_date and amz_expires and amz_expires.isdigit():
+        try:
+            signed_at = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            ts = signed_at.timestamp() + int(amz_expires)
+            if ts > now:
+                return ts
+        except ValueError:
+            pass
+
+    match = PATH_EXPIRY_RE.search(parsed.path)
+    if match:
+        return _as_timestamp(match.group(1), now)
+
+    return None
+
+
+def streams_ttl(streams: Iterable[Dict[str, Any]], default_ttl: float, margin: float = 60.0) -> float:
+    """TTL for a list of streams: the default, capped by the earliest URL expiry.
+
+    `margin` seconds are taken off so clients never get a link that dies
+    while they are starting playback. Returns 0 if a link is about to expire.
+    """
+    now = time.time()
+    ttl = default_ttl
+    for stream in streams:
+        if not isinstance(stream, dict):
+            continue
+        expires_at = url_expiry(stream.get("url", ""), now)
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - now - margin)
+    return max(0.0, ttl)
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Most page requests that may be in flight against one host at a time, across
+# all API requests. Hosts behind Cloudflare get a lower cap.
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    "search.htv-services.com": 4,
+    "haho.moe": 3,
+    "nhentai.net": 3,
+    "api.comick.fun": 3,
+}
+
+_host_locks: Dict[str, threading.BoundedSemaphore] = {}
+_host_locks_guard = threading.Lock()
+
+# asyncio semaphores belong to one event loop, so the async ones are kept per loop
+_async_host_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def host_concurrency(host: str) -> int:
+    return HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+
+
+def host_semaphore(host: str) -> threading.BoundedSemaphore:
+    """Process-wide semaphore limiting concurrent page fetches for a host."""
+    with _host_locks_guard:
+        semaphore = _host_locks.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(host_concurrency(host))
+            _host_locks[host] = semaphore
+        return semaphore
+
+
+def async_host_semaphore(host: str) -> asyncio.Semaphore:
+    """host_semaphore for coroutines, shared by every caller on the running event loop."""
+    semaphores = _async_host_locks.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(host_concurrency(host))
+        semaphores[host] = semaphore
+    return semaphore
+
+
+def fetch_pages(fetch_page: Callable[[int], T], pages: Iterable[int], host: str) -> Iterator[Tuple[int, T]]:
+    """Fetch upstream pages concurrently, yielding (page, result) in page order.
+
+    At most host_concurrency(host) fetches run at once for the host, shared
+    with every other caller. An exception raised by fetch_page is re-raised
+    when its page comes up. Pages not yet started are cancelled when the
+    caller stops iterating (e.g. after an empty page).
+    """
+    pages = list(pages)
+    if not pages:
+        return
+    if len(pages) == 1:
+        with host_semaphore(host):
+            result = fetch_page(pages[0])
+        yield pages[0], result
+        return
+
+    semaphore = host_semaphore(host)
+
+    def limited(page: int) -> T:
+        with semaphore:
+            return fetch_page(page)
+
+    executor = ThreadPoolExecutor(max_workers=min(len(pages), host_concurrency(host)),
+                                  thread_name_prefix=f"fanout-{host}")
+    try:
+        futures = [(page, executor.submit(limited, page)) for page in pages]
+        for page, future in futures:
+            yield page, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def unique(items: Iterable[T], key: Callable[[T], Hashable], seen: Optional[set] = None) -> List[T]:
+    """Items whose key hasn't been seen yet, in order. Updates `seen` in place."""
+    seen = set() if seen is None else seen
+    result = []
+    for item in items:
+        item_key = key(item)
+        if item_key in seen:
+            continue
+        seen.add(item_key)
+        result.append(item)
+    return result
+
+
+def _remaining_pages(first: Dict[str, Any], first_page: int, max_pages: int) -> range:
+    """The pages collect_pages still needs after the first one."""
+    if not first.get("results") or not first.get("hasNextPage") or max_pages <= 1:
+        return range(0)
+    last_page = first_page + max_pages - 1
+    if first.get("totalPages"):
+        last_page = min(last_page, int(first["totalPages"]))
+    return range(first_page + 1, last_page + 1)
+
+
+def _merge_pages(results: List[Any], pages: Iterable[Dict[str, Any]], key: Callable[[Any], Hashable],
+                 seen: set, host: str) -> List[Any]:
+    """Append the results of pages (in page order) until an empty or final page."""
+    try:
+        for data in pages:
+            page_results = data.get("results", [])
+            if not page_results:
+                break
+            results.extend(unique(page_results, key, seen))
+            if not data.get("hasNextPage"):
+                break
+    except Exception as e:
+        print(f"⚠️ Stopped fetching {host} pages after an error: {e}")
+    return results
+
+
+def collect_pages(fetch_page: Callable[[int], Dict[str, Any]], first_page: int, max_pages: int, host: str,
+                  key: Callable[[Any], Hashable]) -> List[Any]:
+    """Collect the results of up to max_pages listing pages starting at first_page.
+
+    fetch_page(n) returns a dict with `results`, `hasNextPage` and optionally
+    `totalPages` (see scraper_utils.pagination). The first page is fetched
+    alone to learn how many pages exist; the rest are fetched concurrently.
+    If the page count is unknown, the remaining pages are requested
+    speculatively and anything after the first empty or final page is
+    dropped. Results are merged in page order and de-duplicated across pages.
+    A failing page after the first ends the walk with what was collected.
+    """
+    seen: set = set()
+    with host_semaphore(host):
+        first = fetch_page(first_page)
+    results = unique(first.get("results", []), key, seen)
+    pages = (data for _, data in fetch_pages(fetch_page, _remaining_pages(first, first_page, max_pages), host))
+    return _merge_pages(results, pages, key, seen, host)
+
+
+async def async_collect_pages(fetch_page: Callable[[int], Awaitable[Dict[str, Any]]], first_page: int,
+                              max_pages: int, host: str, key: Callable[[Any], Hashable]) -> List[Any]:
+    """collect_pages for an async fetch_page.
+
+    The remaining pages are requested together, at most host_concurrency(host)
+    at a time across all callers. As in collect_pages, a failing page after
+    the first ends the walk with what was collected before it.
+    """
+    semaphore = async_host_semaphore(host)
+
+    async def limited(page: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await fetch_page(page)
+
+    seen: set = set()
+    first = await limited(first_page)
+    results = unique(first.get("results", []), key, seen)
+    remaining = _remaining_pages(first, first_page, max_pages)
+    if not remaining:
+        return results
+    fetched = await asyncio.gather(*(limited(page) for page in remaining), return_exceptions=True)
+
+    pages = []
+    for data in fetched:
+        if isinstance(data, BaseException):
+            print(f"⚠️ Stopped fetching {host} pages after an error: {data}")
+            break
+        pages.append(data)
+    return _merge_pages(results, pages, key, seen, host)
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Weight of the newest sample in the latency and success averages
+LATENCY_ALPHA = 0.3
+SUCCESS_ALPHA = 0.2
+# What a hoster we have never tried is assumed to look like
+PRIOR_LATENCY = 3.0
+PRIOR_SUCCESS = 0.75
+# Consecutive failures before a hoster is skipped, and for how long (doubling
+# on every further trip up to the max)
+FAILURE_THRESHOLD = int(os.environ.get("HOSTER_FAILURE_THRESHOLD", 3))
+COOLDOWN = float(os.environ.get("HOSTER_COOLDOWN", 120))
+MAX_COOLDOWN = float(os.environ.get("HOSTER_MAX_COOLDOWN", 30 * 60))
+# Enough parallel hosters that at least one should succeed with this probability
+FANOUT_TARGET = 0.95
+MAX_FANOUT = int(os.environ.get("HOSTER_MAX_FANOUT", 6))
+
+# Every HosterHealth created, by name, for /api/stats/hosters
+_models: Dict[str, "HosterHealth"] = {}
+
+
+class _Hoster:
+    def __init__(self):
+        self.latency = PRIOR_LATENCY
+        self.success = PRIOR_SUCCESS
+        self.samples = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probe_at = 0.0
+        self.skipped = 0
+        self.last_error: Optional[str] = None
+
+    def cost(self) -> float:
+        """Expected seconds until this hoster gives us streams."""
+        return self.latency / max(self.success, 0.05)
+
+
+class HosterHealth:
+    """Rolling health of the hosters a scraper extracts streams from.
+
+    Every extraction is recorded with its latency and outcome. Hosters are
+    tried cheapest first (latency EWMA divided by success ratio), hosters
+    that failed FAILURE_THRESHOLD times in a row are skipped for a cooldown
+    and then get a single probe, and the number of hosters extracted in
+    parallel is sized from their success ratios.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._hosters: Dict[str, _Hoster] = {}
+        _models[name] = self
+
+    def _hoster(self, hoster: str) -> _Hoster:
+        # Caller holds self._lock
+        state = self._hosters.get(hoster)
+        if state is None:
+            state = self._hosters[hoster] = _Hoster()
+        return state
+
+    def record(self, hoster: str, seconds: float, ok: bool, error: Optional[str] = None) -> None:
+        """Record one extraction from hoster."""
+        with self._lock:
+            state = self._hoster(hoster)
+            state.probe_at = 0.0
+            if not ok:
+                # A quick failure still costs the request a trip to another hoster
+                seconds = max(seconds, PRIOR_LATENCY)
+            if state.samples == 0:
+                state.latency = seconds
+            else:
+                state.latency += LATENCY_ALPHA * (seconds - state.latency)
+            state.success += SUCCESS_ALPHA * ((1.0 if ok else 0.0) - state.success)
+            state.samples += 1
+            if ok:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.trips = 0
+                state.open_until = 0.0
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            state.last_error = error
+            if state.consecutive_failures >= FAILURE_THRESHOLD:
+                state.trips += 1
+                state.open_until = time.time() + min(COOLDOWN * 2 ** (state.trips - 1), MAX_COOLDOWN)
+
+    def _available(self, state: _Hoster, now: float) -> bool:
+        # Caller holds self._lock
+        if state.open_until <= 0:
+            return True
+        # Cooled down: let one request at a time probe it. A probe that never
+        # reports back (its request stopped early) is given up after a cooldown.
+        if state.open_until > now or state.probe_at > now - COOLDOWN:
+            return False
+        state.probe_at = now
+        return True
+
+    def plan(self, candidates: Sequence[T], hoster_of: Callable[[T], str],
+             rank: Optional[Callable[[T], Any]] = None) -> List[T]:
+        """Drop hosters that are currently failing and order the rest, best first.
+
+        `rank` gives a key that takes precedence over health (e.g. a user's
+        preferred server); ties go to the cheaper hoster and then keep the
+        candidates' own order. If every candidate is failing they are all
+        returned, so a request is never left with nothing to try.
+        """
+        now = time.time()
+        with self._lock:
+            pairs = [(candidate, self._hoster(hoster_of(candidate))) for candidate in candidates]
+            kept = [(candidate, state) for candidate, state in pairs if self._available(state, now)]
+            if kept:
+                for candidate, state in pairs:
+                    if state.open_until > now:
+                        state.skipped += 1
+            else:
+                kept = pairs
+            order = {id(candidate): position for position, candidate in enumerate(candidates)}
+            kept.sort(key=lambda pair: ((rank(pair[0]) if rank else 0), pair[1].cost(), order[id(pair[0])]))
+        return [candidate for candidate, _ in kept]
+
+    def fanout(self, hosters: Sequence[str]) -> int:
+        """How many of these hosters (in order) to extract in parallel.
+
+        Adds hosters until at least one of them should succeed with
+        FANOUT_TARGET probability, capped at MAX_FANOUT.
+        """
+        if not hosters:
+            return 1
+        with self._lock:
+            all_fail = 1.0
+            workers = 0
+            for hoster in hosters[:MAX_FANOUT]:
+                state = self._hosters.get(hoster)
+                all_fail *= 1.0 - (state.success if state else PRIOR_SUCCESS)
+                workers += 1
+                if 1.0 - all_fail >= FANOUT_TARGET:
+                    break
+        return max(1, workers)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            hosters = {}
+            for hoster, state in sorted(self._hosters.items()):
+                if state.open_until > now:
+                    status = "skipped"
+                elif state.open_until > 0:
+                    status = "probing"
+                else:
+                    status = "healthy"
+                hosters[hoster] = {
+                    "status": status,
+                    "latencyMs": int(state.latency * 1000) if state.samples else None,
+                    "successRatio": round(state.success, 3),
+                    "samples": state.samples,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "consecutiveFailures": state.consecutive_failures,
+                    "skipped": state.skipped,
+                    "retryInSeconds": max(0, int(state.open_until - now)) if state.open_until > now else 0,
+                    "lastError": state.last_error,
+                }
+            return hosters
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every HosterHealth, keyed by name."""
+    return {name: model.stats() for name, model in sorted(_models.items())}
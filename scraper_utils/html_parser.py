@@ -0,0 +1,48 @@
+import os
+from typing import Iterable, Optional
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+# lxml builds the same trees as html.parser, faster. Set
+# HTML_PARSER_BACKEND to any backend BeautifulSoup knows ("html.parser",
+# "lxml", "html5lib") to override it.
+DEFAULT_BACKEND = "lxml"
+FALLBACK_BACKEND = "html.parser"
+
+
+def resolve_backend(name: str) -> str:
+    """name if BeautifulSoup can use it here, else html.parser."""
+    try:
+        BeautifulSoup("", name)
+        return name
+    except FeatureNotFound:
+        print(f"⚠️ HTML parser backend '{name}' is not available, falling back to {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+
+
+BACKEND = resolve_backend(os.environ.get("HTML_PARSER_BACKEND", DEFAULT_BACKEND))
+
+
+def elements_with_class(tags: Iterable[str], classes: Iterable[str]) -> SoupStrainer:
+    """Strainer keeping only `tags` elements that carry any of `classes`, with everything inside them.
+
+    While parsing, the class attribute is still a single string ("anime-loop
+    loop"), which SoupStrainer's own class matching would compare whole.
+    """
+    wanted = frozenset(classes)
+
+    def has_class(value) -> bool:
+        if not value:
+            return False
+        return not wanted.isdisjoint(value.split() if isinstance(value, str) else value)
+
+    return SoupStrainer(list(tags), class_=has_class)
+
+
+def make_soup(markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse markup with the configured backend. Scrapers should use this instead of BeautifulSoup().
+
+    With parse_only, only the elements it matches (and their subtrees) are
+    built, so selectors must not reach above them (no "#content > ...").
+    """
+    return BeautifulSoup(markup, BACKEND, parse_only=parse_only)
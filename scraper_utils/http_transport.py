@@ -0,0 +1,226 @@
+import asyncio
+import os
+import time
+import urllib.parse
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Hedged requests: at most this fraction of a host's requests may be
+# duplicated (plus a small burst), and a host needs this many latency samples
+# before its own p90 is trusted over HostConfig.hedge_delay
+HEDGE_BUDGET = float(os.environ.get("HTTP_HEDGE_BUDGET", 0.1))
+HEDGE_BURST = 5.0
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+
+
+class HostConfig:
+    """Connection pool and timeout settings for a single upstream host."""
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10, timeout: float = 15.0,
+                 connect_timeout: float = 5.0, http2: bool = True, hedge: bool = False, hedge_delay: float = 3.0):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.http2 = http2
+        # Send a duplicate request when the first one is slower than the
+        # host's p90 (hedge_delay until enough latencies are known)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+
+
+DEFAULT_HOST_CONFIG = HostConfig()
+
+# Per-host settings for the upstreams the scrapers talk to
+HOST_CONFIGS = {
+    "search.htv-services.com": HostConfig(max_connections=20, timeout=15.0),
+    "hanime.tv": HostConfig(max_connections=20, timeout=15.0),
+    "haho.moe": HostConfig(max_connections=10, timeout=20.0),
+    "api.allanime.day": HostConfig(max_connections=50, timeout=20.0, hedge=True),
+    "allanime.day": HostConfig(max_connections=20, timeout=20.0),
+    "allanime.to": HostConfig(max_connections=20, timeout=20.0),
+    "api.comick.fun": HostConfig(max_connections=20, timeout=30.0),
+}
+
+
+class AsyncTransport:
+    """Shared asyncio HTTP transport for the scrapers.
+
+    Keeps one keep-alive connection pool per upstream host so a slow or busy
+    host can't exhaust the connections of the others. HTTP/2 is negotiated
+    through ALPN when the host supports it and the `h2` package is installed.
+    """
+
+    def __init__(self, host_configs: Optional[Dict[str, HostConfig]] = None,
+                 default_config: HostConfig = DEFAULT_HOST_CONFIG):
+        self.host_configs = dict(HOST_CONFIGS)
+        if host_configs:
+            self.host_configs.update(host_configs)
+        self.default_config = default_config
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop = None
+        self._requests = 0
+        self._errors = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._hedge_tokens: Dict[str, float] = {}
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._hedges_over_budget = 0
+
+    def config_for(self, host: str) -> HostConfig:
+        return self.host_configs.get(host, self.default_config)
+
+    def set_host_config(self, host: str, config: HostConfig) -> None:
+        """Change a host's settings. Takes effect for new clients only."""
+        self.host_configs[host] = config
+
+    def _client_for(self, host: str) -> httpx.AsyncClient:
+        # Connection pools are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._clients = {}
+            self._loop = loop
+
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            config = self.config_for(host)
+            client = httpx.AsyncClient(
+                http2=config.http2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive,
+                ),
+                timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+                headers={"User-Agent": DEFAULT_USER_AGENT},
+                follow_redirects=True,
+            )
+            self._clients[host] = client
+        return client
+
+    def _record_latency(self, host: str, seconds: float) -> None:
+        window = self._latencies.get(host)
+        if window is None:
+            window = self._latencies[host] = deque(maxlen=LATENCY_WINDOW)
+        window.append(seconds)
+
+    def p90(self, host: str) -> Optional[float]:
+        """The host's observed 90th percentile latency, once enough requests were seen."""
+        window = self._latencies.get(host)
+        if not window or len(window) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        return ordered[int(len(ordered) * 0.9)]
+
+    def _take_hedge_token(self, host: str) -> bool:
+        """Whether the hedging budget allows one more duplicate request to host."""
+        if self._hedge_tokens.get(host, HEDGE_BURST) >= 1.0:
+            self._hedge_tokens[host] = self._hedge_tokens.get(host, HEDGE_BURST) - 1.0
+            return True
+        self._hedges_over_budget += 1
+        return False
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urllib.parse.urlparse(url).netloc
+        client = self._client_for(host)
+        self._requests += 1
+        started = time.monotonic()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._errors += 1
+            raise
+        except asyncio.CancelledError:
+            # A request that lost a hedge race was at least this slow
+            self._record_latency(host, time.monotonic() - started)
+            raise
+        self._record_latency(host, time.monotonic() - started)
+        return response
+
+    async def request(self, method: str, url: str, hedge: Optional[bool] = None,
+                      mirrors: Optional[List[str]] = None, **kwargs) -> httpx.Response:
+        """Send a request through the pool of the URL's host.
+
+        With hedging (HostConfig.hedge, or `hedge=True` for this call) a
+        request still running after the host's p90 latency gets a duplicate,
+        sent to the first of `mirrors` if given and to the same URL otherwise,
+        and whichever answers first wins. Only hedge requests that are safe
+        to send twice.
+        """
+        host = urllib.parse.urlparse(url).netloc
+        config = self.config_for(host)
+        # Every request earns a fraction of a hedge
+        self._hedge_tokens[host] = min(HEDGE_BURST, self._hedge_tokens.get(host, HEDGE_BURST) + HEDGE_BUDGET)
+        if not (config.hedge if hedge is None else hedge):
+            return await self._send(method, url, **kwargs)
+
+        delay = self.p90(host) or config.hedge_delay
+        primary = asyncio.ensure_future(self._send(method, url, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._take_hedge_token(host):
+            return await primary
+
+        self._hedges += 1
+        hedge_url = mirrors[0] if mirrors else url
+        duplicate = asyncio.ensure_future(self._send(method, hedge_url, **kwargs))
+        pending = {primary, duplicate}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Take the first success; an error only counts once both failed
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    if duplicate in succeeded and primary not in succeeded:
+                        self._hedge_wins += 1
+                    return succeeded[0].result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "hosts": sorted(self._clients.keys()),
+            "requests": self._requests,
+            "errors": self._errors,
+            "hedges": self._hedges,
+            "hedgeWins": self._hedge_wins,
+            "hedgesOverBudget": self._hedges_over_budget,
+            "p90Ms": {host: int(p90 * 1000) for host in sorted(self._latencies)
+                      if (p90 := self.p90(host)) is not None},
+        }
+
+
+_transport: Optional[AsyncTransport] = None
+
+
+def get_transport() -> AsyncTransport:
+    """Process-wide transport shared by all scrapers."""
+    global _transport
+    if _transport is None:
+        _transport = AsyncTransport()
+    return _transport
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+import urllib.parse
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+# Weight of the newest sample in a mirror's latency average
+LATENCY_ALPHA = 0.3
+# Another mirror has to be this much faster before traffic moves to it, so
+# requests don't flap between mirrors with similar latency
+SWITCH_MARGIN = 0.8
+# Consecutive failed requests or probes before a mirror is marked unhealthy,
+# so one timeout doesn't move all traffic away from it
+FAILURE_THRESHOLD = int(os.environ.get("MIRROR_FAILURE_THRESHOLD", 3))
+DEFAULT_PROBE_INTERVAL = float(os.environ.get("MIRROR_PROBE_INTERVAL", 300))
+DEFAULT_PROBE_TIMEOUT = 10.0
+
+# Every MirrorSelector created, by name, for /api/stats
+_selectors: Dict[str, "MirrorSelector"] = {}
+
+Probe = Callable[[requests.Session, str, float], bool]
+
+
+def mirror_list(env_var: str, default: List[str]) -> List[str]:
+    """Comma separated base urls from env_var, or default."""
+    value = os.environ.get(env_var, "")
+    mirrors = [mirror.strip().rstrip("/") for mirror in value.split(",") if mirror.strip()]
+    return mirrors or list(default)
+
+
+def status_probe(path: str = "/", max_status: int = 499) -> Probe:
+    """Probe that GETs base + path and counts any status up to max_status as healthy."""
+    def probe(session: requests.Session, base: str, timeout: float) -> bool:
+        return session.get(f"{base}{path}", timeout=timeout).status_code <= max_status
+    return probe
+
+
+class _Mirror:
+    def __init__(self, base: str):
+        self.base = base
+        self.latency: Optional[float] = None
+        self.healthy = True
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+
+
+class MirrorSelector:
+    """Routes requests to the fastest healthy one of several equivalent base urls.
+
+    Latency comes from real responses (see observe) and from probes a
+    background thread sends every probe_interval seconds. FAILURE_THRESHOLD
+    failures in a row, from either, mark the mirror unhealthy until a request
+    or probe succeeds again. The first mirror is
+    preferred until another is clearly faster. With a single mirror nothing
+    is probed.
+    """
+
+    def __init__(self, name: str, mirrors: List[str], probe: Probe,
+                 probe_interval: float = DEFAULT_PROBE_INTERVAL, probe_timeout: float = DEFAULT_PROBE_TIMEOUT):
+        if not mirrors:
+            raise ValueError(f"{name}: at least one mirror is required")
+        self.name = name
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._mirrors = [_Mirror(base.rstrip("/")) for base in mirrors]
+        self._by_host = {urllib.parse.urlparse(mirror.base).netloc: mirror for mirror in self._mirrors}
+        self._current = self._mirrors[0]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._session = requests.Session()
+        _selectors[name] = self
+
+    def _choose(self) -> None:
+        # Caller holds self._lock
+        healthy = [mirror for mirror in self._mirrors if mirror.healthy]
+        if not healthy:
+            # Nothing known to work, so fall back to the preferred mirror
+            self._current = self._mirrors[0]
+            return
+        if not self._current.healthy:
+            self._current = healthy[0]
+        known = [mirror for mirror in healthy if mirror.latency is not None]
+        if not known or self._current.latency is None:
+            return
+        fastest = min(known, key=lambda mirror: mirror.latency)
+        if fastest.latency < self._current.latency * SWITCH_MARGIN:
+            print(f"🔀 {self.name}: switching to {fastest.base} ({int(fastest.latency * 1000)}ms)")
+            self._current = fastest
+
+    def _record(self, mirror: _Mirror, seconds: Optional[float], ok: bool, error: Optional[str] = None) -> None:
+        with self._lock:
+            if ok:
+                mirror.successes += 1
+                mirror.consecutive_failures = 0
+                mirror.healthy = True
+                if seconds is not None:
+                    mirror.latency = seconds if mirror.latency is None else \
+                        mirror.latency + LATENCY_ALPHA * (seconds - mirror.latency)
+            else:
+                mirror.failures += 1
+                mirror.consecutive_failures += 1
+                mirror.last_error = error
+                if mirror.consecutive_failures >= FAILURE_THRESHOLD:
+                    mirror.healthy = False
+            self._choose()
+
+    def observe(self, url: str, seconds: float, ok: bool = True) -> None:
+        """Feed the latency of a real request to url into the model (other hosts are ignored)."""
+        mirror = self._by_host.get(urllib.parse.urlparse(url).netloc)
+        if mirror is not None:
+            self._record(mirror, seconds, ok, None if ok else "Request failed")
+
+    @property
+    def preferred(self) -> str:
+        """The first configured mirror."""
+        return self._mirrors[0].base
+
+    def current(self) -> str:
+        """Base url of the mirror requests should go to right now."""
+        self._ensure_probing()
+        with self._lock:
+            return self._current.base
+
+    def alternates(self) -> List[str]:
+        """The other healthy mirrors, fastest first (e.g. for hedged requests)."""
+        with self._lock:
+            others = [mirror for mirror in self._mirrors if mirror is not self._current and mirror.healthy]
+            others.sort(key=lambda mirror: mirror.latency if mirror.latency is not None else float("inf"))
+            return [mirror.base for mirror in others]
+
+    def probe_all(self) -> None:
+        """Probe every mirror once."""
+        for mirror in self._mirrors:
+            started = time.time()
+            try:
+                ok = self.probe(self._session, mirror.base, self.probe_timeout)
+                error = None if ok else "Unhealthy response"
+            except Exception as e:
+                ok, error = False, str(e)
+            self._record(mirror, time.time() - started, ok, error)
+
+    def _probe_loop(self) -> None:
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                print(f"⚠️ Probing {self.name} mirrors failed: {str(e)}")
+            time.sleep(self.probe_interval)
+
+    def _ensure_probing(self) -> None:
+        if self._thread is not None or len(self._mirrors) < 2 or self.probe_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._probe_loop, daemon=True, name=f"probe-{self.name}")
+                self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "current": self._current.base,
+                "mirrors": {
+                    mirror.base: {
+                        "healthy": mirror.healthy,
+                        "latencyMs": int(mirror.latency * 1000) if mirror.latency is not None else None,
+                        "successes": mirror.successes,
+                        "failures": mirror.failures,
+                        "consecutiveFailures": mirror.consecutive_failures,
+                        "lastError": mirror.last_error,
+                    }
+                    for mirror in self._mirrors
+                },
+            }
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every MirrorSelector, keyed by name."""
+    return {name: selector.stats() for name, selector in sorted(_selectors.items())}
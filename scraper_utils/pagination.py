@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from scraper_utils.fanout import fetch_pages, unique
+
+# fetch_page(n) returns one upstream page (1-based) as a dict:
+#   results      items on that page
+#   hasNextPage  whether upstream has a page after it
+#   totalPages   optional, page count reported by upstream
+#   totalResults optional, item count reported by upstream
+#   perPage      optional, upstream page size if the page reports it
+FetchPage = Callable[[int], Dict[str, Any]]
+
+
+def upstream_span(page: int, limit: int, per_page: int) -> Tuple[int, int, int]:
+    """Map an API page onto upstream pages.
+
+    Returns (first upstream page, last upstream page, offset of the first
+    requested item within the first upstream page).
+    """
+    start = (page - 1) * limit
+    end = start + limit
+    first = start // per_page + 1
+    last = (end - 1) // per_page + 1
+    return first, last, start - (first - 1) * per_page
+
+
+def estimate_total(first_data: Dict[str, Any], last_data: Dict[str, Any], last_page: int, per_page: int) -> int:
+    """Estimate the total number of results from upstream page metadata."""
+    for data in (first_data, last_data):
+        if data.get("totalResults") is not None:
+            return int(data["totalResults"])
+
+    if not last_data.get("hasNextPage") and last_data.get("results"):
+        # We reached the last upstream page, so the count is exact
+        return (last_page - 1) * per_page + len(last_data["results"])
+
+    total_pages = last_data.get("totalPages") or first_data.get("totalPages")
+    if total_pages:
+        return int(total_pages) * per_page
+
+    if last_data.get("hasNextPage"):
+        # Unknown length: report at least one more page
+        return (last_page + 1) * per_page
+
+    return max(0, (last_page - 1) * per_page)
+
+
+def fetch_window(fetch_page: FetchPage, page: int, limit: int, per_page: int, host: Optional[str] = None,
+                 key: Optional[Callable[[Any], Hashable]] = None) -> Dict[str, Any]:
+    """Fetch only the upstream pages that cover API page `page` of size `limit`.
+
+    per_page is the expected upstream page size. If the first page fetched
+    reports a different size, the mapping is recomputed with that one. When
+    the window spans several upstream pages and `host` is given, the pages
+    after the first are fetched concurrently under that host's cap. `key`
+    de-duplicates items that show up on two neighbouring pages.
+    Returns a dict with results, totalResults, hasNextPage and perPage.
+    """
+    fetched: Dict[int, Dict[str, Any]] = {}
+
+    def get(n: int) -> Dict[str, Any]:
+        if n not in fetched:
+            fetched[n] = fetch_page(n)
+        return fetched[n]
+
+    first, last, offset = upstream_span(page, limit, per_page)
+    first_data = get(first)
+    reported = first_data.get("perPage")
+    if reported and reported != per_page:
+        per_page = reported
+        first, last, offset = upstream_span(page, limit, per_page)
+        first_data = get(first)
+
+    fetched_pages = [(first, first_data)]
+    if first_data.get("hasNextPage") and last > first:
+        if first_data.get("totalPages"):
+            last = min(last, int(first_data["totalPages"]))
+        rest = range(first + 1, last + 1)
+        pages = fetch_pages(get, rest, host) if host else ((n, get(n)) for n in rest)
+        for n, data in pages:
+            fetched_pages.append((n, data))
+            if not data.get("hasNextPage"):
+                break
+
+    items: List[Any] = []
+    for _, data in fetched_pages:
+        items.extend(data.get("results", []))
+    if key is not None:
+        # Before cutting the window, so repeats don't leave it short or fake a next page
+        items = unique(items, key)
+    last_page, last_data = fetched_pages[-1]
+
+    window = items[offset:offset + limit]
+    total = estimate_total(first_data, last_data, last_page, per_page)
+    has_next = len(items) > offset + limit or bool(last_data.get("hasNextPage"))
+    return {
+        "results": window,
+        "totalResults": max(total, (page - 1) * limit + len(window)),
+        "hasNextPage": has_next,
+        "perPage": per_page,
+    }
+
+
+def page_result(results: List[Any], page: int, limit: int, total_results: Optional[int] = None,
+                has_next_page: Optional[bool] = None) -> Dict[str, Any]:
+    """Result of a page-aware method for sources that accept (page, limit) directly."""
+    if has_next_page is None:
+        has_next_page = len(results) >= limit
+    if total_results is None:
+        total_results = (page - 1) * limit + len(results) + (limit if has_next_page else 0)
+    return {
+        "results": results,
+        "totalResults": total_results,
+        "hasNextPage": has_next_page,
+    }
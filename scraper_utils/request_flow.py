@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generator, Hashable, TypeVar
+
+import httpx
+import requests
+
+T = TypeVar("T")
+
+# What either HTTP stack raises for a timeout, or for any failed request
+TIMEOUT_ERRORS = (requests.exceptions.Timeout, httpx.TimeoutException)
+REQUEST_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+
+
+class Request:
+    """An HTTP request a flow wants sent: method, url and keyword arguments for the client."""
+
+    def __init__(self, method: str, url: str, **kwargs):
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+
+class Blocking:
+    """Blocking work a flow wants done (e.g. a hoster extractor), kept off the event loop by run_async."""
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class Cached:
+    """A value a flow wants from a TTLCache, filled on a miss by running the sub-flow load().
+
+    run_sync loads through cache.get_or_load and run_async through
+    cache.async_get_or_load, so concurrent misses share one load either way.
+    """
+
+    def __init__(self, cache: Any, key: Hashable, load: Callable[[], "Flow"], ttl: Any = None):
+        self.cache = cache
+        self.key = key
+        self.load = load
+        self.ttl = ttl
+
+
+# A scraper operation written once for both HTTP stacks: a generator that
+# yields Request/Blocking/Cached steps, is sent back each step's result and
+# returns the operation's result. An exception raised by a step is thrown
+# back into the flow where it yielded, so the flow's own try/except handles it.
+Flow = Generator[Any, Any, T]
+
+
+def run_sync(flow: Flow, send: Callable[[Request], Any]) -> T:
+    """Run a flow, sending its requests with the blocking send(request) (e.g. a requests.Session)."""
+    value, error = None, None
+    while True:
+        try:
+            step = flow.send(value) if error is None else flow.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            if isinstance(step, Blocking):
+                value = step.fn(*step.args, **step.kwargs)
+            elif isinstance(step, Cached):
+                value = step.cache.get_or_load(step.key, lambda: run_sync(step.load(), send), ttl=step.ttl)
+            else:
+                value = send(step)
+        except Exception as e:
+            error = e
+
+
+async def run_async(flow: Flow, send: Callable[[Request], Awaitable[Any]]) -> T:
+    """Run a flow, awaiting send(request) for its requests (e.g. the shared transport).
+
+    Blocking steps run in a worker thread.
+    """
+    value, error = None, None
+    while True:
+        try:
+            step = flow.send(value) if error is None else flow.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            if isinstance(step, Blocking):
+                value = await asyncio.to_thread(step.fn, *step.args, **step.kwargs)
+            elif isinstance(step, Cached):
+                value = await step.cache.async_get_or_load(step.key, lambda: run_async(step.load(), send), ttl=step.ttl)
+            else:
+                value = await send(step)
+        except Exception as e:
+            error = e
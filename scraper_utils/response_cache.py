@@ -0,0 +1,274 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Default TTLs (seconds) per endpoint. Listings change often, metadata rarely.
+ENDPOINT_TTLS = {
+    "filters": 24 * 3600,
+    "manga/details": 6 * 3600,
+    "anime/details": 6 * 3600,
+    "manga/get-pages": 6 * 3600,
+    "manga/search": 15 * 60,
+    "anime/search": 15 * 60,
+    "manga/popular": 10 * 60,
+    "anime/popular": 10 * 60,
+    "manga/latest": 3 * 60,
+    "anime/latest": 3 * 60,
+    # Upper bound only, the stream URL expiry usually wins (see scraper_utils.expiry)
+    "anime/get-episode": 30 * 60,
+}
+DEFAULT_TTL = 5 * 60
+
+# How long listings may still be served after their TTL while a background
+# refresh runs (stale-while-revalidate). Endpoints not listed are never stale.
+ENDPOINT_STALE_TTLS = {
+    "manga/popular": 6 * 3600,
+    "anime/popular": 6 * 3600,
+    "manga/latest": 3600,
+    "anime/latest": 3600,
+}
+
+# Cache lookup outcomes, also used as the X-Cache response header
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Parameters whose value doesn't depend on case (search terms)
+CASE_INSENSITIVE_PARAMS = {"q", "query"}
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> str:
+    """Canonical string for request parameters.
+
+    Drops unset values, trims and collapses whitespace in strings, lower-cases
+    search terms and sorts keys, so equivalent requests share a cache entry.
+    """
+    normalized = {}
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            if name in CASE_INSENSITIVE_PARAMS:
+                value = value.casefold()
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def is_empty(value: Any) -> bool:
+    """Empty results (including page results without items) are never cached."""
+    if isinstance(value, dict) and "results" in value:
+        return not value["results"]
+    return not value
+
+
+def make_key(endpoint: str, source: str, params: Optional[Dict[str, Any]] = None) -> str:
+    return f"{endpoint}|{source}|{normalize_params(params)}"
+
+
+class SQLiteTier:
+    """Optional on-disk second tier so cached responses survive restarts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, fresh_until REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._writes = 0
+
+    def get(self, key: str, now: float) -> Optional[Tuple[bytes, float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fresh_until, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[2] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return row[0], row[1], row[2]
+
+    def set(self, key: str, payload: bytes, fresh_until: float, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, fresh_until, expires_at) VALUES (?, ?, ?, ?)",
+                (key, payload, fresh_until, expires_at),
+            )
+            self._writes += 1
+            # Sweep expired rows every so often instead of on every write
+            if self._writes % 500 == 0:
+                self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier cache for API responses.
+
+    The first tier is an in-process LRU bounded by the total size of the
+    serialized values. If a SQLite path is given (or RESPONSE_CACHE_SQLITE_PATH
+    is set) entries are also written to disk, and memory misses are looked up
+    there before going upstream. Values are stored as JSON, so callers always
+    get a fresh copy they are free to mutate.
+
+    Entries have a soft and a hard expiry. Past the soft one (the TTL) an
+    entry is still returned by lookup() but marked STALE until the hard
+    expiry, so callers can serve it while refreshing it in the background.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, sqlite_path: Optional[str] = None,
+                 ttls: Optional[Dict[str, float]] = None, stale_ttls: Optional[Dict[str, float]] = None):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if sqlite_path is None:
+            sqlite_path = os.environ.get("RESPONSE_CACHE_SQLITE_PATH") or None
+        self.max_bytes = max_bytes
+        # A single entry may use at most a quarter of the memory tier
+        self.max_entry_bytes = max_bytes // 4
+        self.ttls = dict(ENDPOINT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.stale_ttls = dict(ENDPOINT_STALE_TTLS)
+        if stale_ttls:
+            self.stale_ttls.update(stale_ttls)
+        self.disk = SQLiteTier(sqlite_path) if sqlite_path else None
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[bytes, float, float]]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._endpoint_stats: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, DEFAULT_TTL)
+
+    def stale_ttl_for(self, endpoint: str) -> float:
+        return self.stale_ttls.get(endpoint, 0)
+
+    def _count(self, key: str, outcome: str) -> None:
+        endpoint = key.split("|", 1)[0]
+        counters = self._endpoint_stats.setdefault(
+            endpoint, {"hits": 0, "diskHits": 0, "staleHits": 0, "misses": 0, "refreshes": 0}
+        )
+        counters[outcome] += 1
+
+    def count_refresh(self, key: str) -> None:
+        with self._lock:
+            self._count(key, "refreshes")
+
+    def _store(self, key: str, payload: bytes, fresh_until: float, expires_at: float) -> None:
+        # Caller holds self._lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        if len(payload) > self.max_entry_bytes:
+            return
+        self._entries[key] = (payload, fresh_until, expires_at)
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes and self._entries:
+            _, (evicted, _, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._evictions += 1
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], str]:
+        """Return (value, HIT), (value, STALE) or (None, MISS) for key."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, fresh_until, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    state = HIT if fresh_until > now else STALE
+                    self._count(key, "hits" if state == HIT else "staleHits")
+                    return json.loads(payload), state
+                del self._entries[key]
+                self._bytes -= len(payload)
+
+        if self.disk is not None:
+            row = self.disk.get(key, now)
+            if row is not None:
+                payload, fresh_until, expires_at = row
+                state = HIT if fresh_until > now else STALE
+                with self._lock:
+                    self._store(key, payload, fresh_until, expires_at)
+                    self._count(key, "diskHits" if state == HIT else "staleHits")
+                return json.loads(payload), state
+
+        with self._lock:
+            self._count(key, "misses")
+        return None, MISS
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or stale."""
+        value, state = self.lookup(key)
+        return value if state == HIT else None
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        """Cache value for ttl seconds, then serve it as stale for stale_ttl more.
+
+        Empty values and non-positive TTLs are skipped.
+        """
+        if is_empty(value) or ttl <= 0:
+            return
+        payload = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+        fresh_until = time.time() + ttl
+        expires_at = fresh_until + max(0, stale_ttl)
+        with self._lock:
+            self._store(key, payload, fresh_until, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, payload, fresh_until, expires_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._endpoint_stats.items()}
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+        stats["hits"] = sum(c["hits"] for c in endpoints.values())
+        stats["diskHits"] = sum(c["diskHits"] for c in endpoints.values())
+        stats["staleHits"] = sum(c["staleHits"] for c in endpoints.values())
+        stats["misses"] = sum(c["misses"] for c in endpoints.values())
+        stats["refreshes"] = sum(c["refreshes"] for c in endpoints.values())
+        served = stats["hits"] + stats["diskHits"] + stats["staleHits"]
+        lookups = served + stats["misses"]
+        stats["hitRatio"] = round(served / lookups, 3) if lookups else 0.0
+        stats["disk"] = {"path": self.disk.path, "entries": self.disk.count()} if self.disk else None
+        stats["endpoints"] = endpoints
+        return stats
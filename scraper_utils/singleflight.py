@@ -0,0 +1,62 @@
+import asyncio
+import copy
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def call_key(source: str, method: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """Stable key for a scraper call. Arguments may be dicts (e.g. a details payload)."""
+    return json.dumps([source, method, args, kwargs], sort_keys=True, default=str, separators=(",", ":"))
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into a single in-flight one.
+
+    The first caller for a key starts the call as its own task; callers that
+    arrive while it is running wait for that task instead of starting
+    another. Everyone gets the same outcome. Waiters get a deep copy of the
+    result so the routes can keep adding fields to what they get back.
+    Cancelling one caller (a client disconnecting) doesn't cancel the call
+    for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, group: str, name: str) -> None:
+        counters = self._stats.setdefault(group, {"calls": 0, "executed": 0, "collapsed": 0})
+        counters[name] += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], group: str = "default") -> Any:
+        """Run fn() for key, or join the call already running for it."""
+        self._count(group, "calls")
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._count(group, "collapsed")
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self._count(group, "executed")
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            if self._in_flight.get(key) is finished:
+                del self._in_flight[key]
+            # Mark the exception as retrieved in case every caller went away
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, Any]:
+        groups = {name: dict(counters) for name, counters in self._stats.items()}
+        totals = {"calls": 0, "executed": 0, "collapsed": 0}
+        for counters in groups.values():
+            for name in totals:
+                totals[name] += counters[name]
+        return {**totals, "inFlight": self.in_flight(), "sources": groups}
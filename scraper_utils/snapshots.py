@@ -0,0 +1,153 @@
+import asyncio
+import base64
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_SNAPSHOT_TTL = 15 * 60
+DEFAULT_SNAPSHOT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class InvalidCursorError(Exception):
+    """Raised for cursors that are malformed, expired or used on another listing."""
+
+
+def item_key(item: Dict[str, Any]) -> Hashable:
+    return item.get("url") or item.get("id") or json.dumps(item, sort_keys=True, default=str)
+
+
+def _size_of(items: List[Any]) -> int:
+    return len(json.dumps(items, separators=(",", ":"), default=str))
+
+
+class Snapshot:
+    """The results of one listing as seen by a client walking it with cursors.
+
+    Items are appended as further upstream pages are needed, so following a
+    cursor never re-runs the listing from the start and the order clients
+    see doesn't shift between pages.
+    """
+
+    def __init__(self, scope: str, items: List[Dict[str, Any]], base_page: int, page_size: int,
+                 exhausted: bool, total_results: int):
+        self.id = secrets.token_urlsafe(12)
+        self.scope = scope
+        self.items: List[Dict[str, Any]] = []
+        self.seen: set = set()
+        self.base_page = base_page
+        self.page_size = page_size
+        self.next_page = base_page + 1
+        self.exhausted = exhausted
+        self.total_results = total_results
+        self.size = 0
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+        self.append(items)
+
+    def append(self, items: List[Dict[str, Any]]) -> int:
+        """Add items not already in the snapshot. Returns how many were new."""
+        new_items = []
+        for item in items:
+            key = item_key(item)
+            if key not in self.seen:
+                self.seen.add(key)
+                new_items.append(item)
+        self.items.extend(new_items)
+        self.size += _size_of(new_items) if new_items else 0
+        return len(new_items)
+
+
+class SnapshotStore:
+    """In-memory snapshots with a sliding TTL and an LRU cap on their total size.
+
+    Configured with SNAPSHOT_TTL (seconds) and SNAPSHOT_MAX_BYTES.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.ttl = float(ttl if ttl is not None else os.environ.get("SNAPSHOT_TTL", DEFAULT_SNAPSHOT_TTL))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.environ.get("SNAPSHOT_MAX_BYTES", DEFAULT_SNAPSHOT_MAX_BYTES))
+        self._snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._created = 0
+        self._evicted = 0
+        self._expired = 0
+
+    def _evict(self, now: float) -> None:
+        # Caller holds self._lock
+        for snapshot_id in [sid for sid, snap in self._snapshots.items() if snap.expires_at <= now]:
+            self._bytes -= self._snapshots.pop(snapshot_id).size
+            self._expired += 1
+        while self._bytes > self.max_bytes and len(self._snapshots) > 1:
+            _, oldest = self._snapshots.popitem(last=False)
+            self._bytes -= oldest.size
+            self._evicted += 1
+
+    def create(self, scope: str, items: List[Dict[str, Any]], base_page: int, page_size: int,
+               exhausted: bool, total_results: int) -> Snapshot:
+        snapshot = Snapshot(scope, items, base_page, page_size, exhausted, total_results)
+        now = time.time()
+        snapshot.expires_at = now + self.ttl
+        with self._lock:
+            self._snapshots[snapshot.id] = snapshot
+            self._bytes += snapshot.size
+            self._created += 1
+            self._evict(now)
+        return snapshot
+
+    def extend(self, snapshot: Snapshot, page_data: Dict[str, Any]) -> None:
+        """Append the next upstream page (a page result dict) to a snapshot."""
+        before = snapshot.size
+        added = snapshot.append(page_data.get("results", []))
+        snapshot.next_page += 1
+        if not page_data.get("hasNextPage") or added == 0:
+            snapshot.exhausted = True
+        if page_data.get("totalResults"):
+            snapshot.total_results = max(page_data["totalResults"], len(snapshot.items))
+        with self._lock:
+            if snapshot.id in self._snapshots:
+                self._bytes += snapshot.size - before
+                self._evict(time.time())
+
+    def cursor(self, snapshot: Snapshot, offset: int) -> str:
+        """Opaque cursor pointing at `offset` within the snapshot."""
+        raw = json.dumps([snapshot.id, offset], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def resolve(self, cursor: str, scope: str) -> Tuple[Snapshot, int]:
+        """Return (snapshot, offset) for a cursor issued for the listing `scope`."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            snapshot_id, offset = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            snapshot_id, offset = str(snapshot_id), int(offset)
+        except (ValueError, TypeError, UnicodeError):
+            raise InvalidCursorError("Malformed cursor")
+
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+            if snapshot is None or snapshot.expires_at <= now:
+                raise InvalidCursorError("Cursor has expired, start again without a cursor")
+            if snapshot.scope != scope:
+                raise InvalidCursorError("Cursor belongs to a different listing")
+            snapshot.expires_at = now + self.ttl
+            self._snapshots.move_to_end(snapshot_id)
+        if offset < 0:
+            raise InvalidCursorError("Malformed cursor")
+        return snapshot, offset
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+                "created": self._created,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
@@ -0,0 +1,35 @@
+import re
+from typing import Any, Dict, List, Optional
+
+
+def normalize_quality(quality: Optional[str]) -> Optional[str]:
+    """"1080", "1080p" and "1080P" all mean 1080p. Other labels are matched as given."""
+    if not quality:
+        return None
+    quality = quality.strip().lower()
+    return f"{quality}p" if quality.isdigit() else quality
+
+
+def quality_matches(stream: Dict[str, Any], quality: Optional[str]) -> bool:
+    """Whether a stream's quality label matches the requested quality (always true without one)."""
+    quality = normalize_quality(quality)
+    if quality is None:
+        return True
+    label = str(stream.get("quality", "")).lower()
+    if quality.endswith("p") and quality[:-1].isdigit():
+        return re.search(rf"(?<!\d){quality[:-1]}p?(?!\d)", label) is not None
+    return quality in label
+
+
+def select_streams(streams: List[Dict[str, Any]], quality: Optional[str] = None,
+                   max_streams: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Streams matching `quality` (all of them if none match), at most max_streams.
+
+    The input is assumed to be sorted best first already.
+    """
+    if quality:
+        matching = [stream for stream in streams if quality_matches(stream, quality)]
+        streams = matching or streams
+    if max_streams:
+        streams = streams[:max_streams]
+    return streams
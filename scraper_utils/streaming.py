@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+NDJSON = "ndjson"
+SSE = "sse"
+
+MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    SSE: "text/event-stream",
+}
+
+# Values of the `stream` query parameter that turn streaming on
+STREAM_TRUE = {"1", "true", "yes", "on"}
+
+
+def stream_format(stream: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """Pick the streaming format for a request, or None for a normal JSON response.
+
+    `?stream=ndjson` and `?stream=sse` choose explicitly. `?stream=1` streams
+    NDJSON unless the client accepts text/event-stream. Without `stream`, an
+    Accept header asking for either media type turns streaming on.
+    """
+    accept = (accept or "").lower()
+    wants_sse = MEDIA_TYPES[SSE] in accept
+    if stream is not None:
+        stream = stream.strip().lower()
+        if stream in (NDJSON, SSE):
+            return stream
+        if stream in STREAM_TRUE:
+            return SSE if wants_sse else NDJSON
+        return None
+    if wants_sse:
+        return SSE
+    if MEDIA_TYPES[NDJSON] in accept:
+        return NDJSON
+    return None
+
+
+_END = object()
+
+
+async def iterate_in_thread(iterator_fn: Callable[[], Iterator[Any]],
+                            run: Optional[Callable[[Callable[[], None]], Awaitable[Any]]] = None) -> AsyncIterator[Any]:
+    """Drive a blocking generator on a worker thread and yield its items here.
+
+    `run` schedules the blocking drain (asyncio.to_thread by default; pass
+    a dispatcher pool to keep the source's admission limit). Exceptions from
+    the generator are re-raised. If the consumer stops early the generator
+    is closed before its next item.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def drain() -> None:
+        iterator = iterator_fn()
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def finished(task: "asyncio.Future") -> None:
+        queue.put_nowait(task.exception() if not task.cancelled() and task.exception() else _END)
+
+    task = asyncio.ensure_future((run or asyncio.to_thread)(drain))
+    task.add_done_callback(finished)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def encode_event(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    """Serialize one event. NDJSON lines carry the event name in an `event` field."""
+    if fmt == SSE:
+        return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, **data}, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+async def encode_events(fmt: str, events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encode (event, data) pairs as they are produced.
+
+    The status line has already gone out by the time a later page fails, so
+    errors are reported as a final `error` event instead.
+    """
+    try:
+        async for event, data in events:
+            yield encode_event(fmt, event, data)
+    except Exception as e:
+        print(f"⚠️ Stream ended with an error: {str(e)}")
+        detail = getattr(e, "detail", None) or str(e)
+        yield encode_event(fmt, "error", {"detail": detail})
+
+
+def streaming_response(fmt: str, events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> StreamingResponse:
+    return StreamingResponse(
+        encode_events(fmt, events),
+        media_type=MEDIA_TYPES[fmt],
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,202 @@
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from scraper_utils.singleflight import SingleFlight
+
+Loader = Callable[[], Any]
+AsyncLoader = Callable[[], Awaitable[Any]]
+TTL = Union[float, Callable[[Any], float]]
+
+# Every TTLCache created, by name, for /api/stats
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Thread-safe in-process cache for values scrapers fetch over and over.
+
+    get_or_load() returns a fresh value straight away. Past its TTL a value is
+    still returned for up to stale_ttl more seconds while one background
+    thread reloads it, so callers never wait for a refresh. On a miss the
+    first thread loads the value and threads asking for the same key
+    meanwhile wait for that load instead of starting their own. Failed loads
+    are not cached. Entries are capped at max_entries (least recently used
+    go first). async_get_or_load() does the same for coroutine loaders, with
+    concurrent misses awaiting one load.
+
+    Values are deep-copied on the way in and out, so callers may mutate what
+    they get back.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, max_entries: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, fresh_until, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._refreshing: set = set()
+        self._flight = SingleFlight()
+        self._refresh_tasks: set = set()
+        self._stats = {"hits": 0, "staleHits": 0, "misses": 0, "loads": 0, "refreshes": 0, "errors": 0}
+        _caches[name] = self
+
+    def _lookup(self, key: Hashable, now: float) -> Tuple[Optional[Any], str]:
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, "miss"
+        value, fresh_until, expires_at = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None, "miss"
+        self._entries.move_to_end(key)
+        return value, "hit" if fresh_until > now else "stale"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value for key if it is still fresh, else None."""
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+            return copy.deepcopy(value) if state == "hit" else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[TTL] = None) -> None:
+        """Cache value for ttl seconds (default self.ttl). ttl may be a function of the value."""
+        if callable(ttl):
+            ttl = ttl(value)
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        fresh_until = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(value), fresh_until, fresh_until + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, key: Hashable, loader: Loader, ttl: Optional[TTL]) -> Any:
+        value = loader()
+        with self._lock:
+            self._stats["loads"] += 1
+        self.set(key, value, ttl)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Loader, ttl: Optional[TTL]) -> None:
+        try:
+            self._load(key, loader, ttl)
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"⚠️ Background refresh of {self.name} failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, key: Hashable, loader: Loader, ttl: Optional[TTL] = None) -> Any:
+        """Return the cached value for key, calling loader() to fill or refresh it."""
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+            if state == "hit":
+                self._stats["hits"] += 1
+                return copy.deepcopy(value)
+            if state == "stale":
+                self._stats["staleHits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, loader, ttl), daemon=True,
+                                     name=f"refresh-{self.name}").start()
+                return copy.deepcopy(value)
+            self._stats["misses"] += 1
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                value, state = self._lookup(key, time.time())
+            if state != "miss":
+                return copy.deepcopy(value)
+            try:
+                return copy.deepcopy(self._load(key, loader, ttl))
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is load_lock:
+                        del self._loading[key]
+
+    async def _async_load(self, key: Hashable, loader: AsyncLoader, ttl: Optional[TTL]) -> Any:
+        # A load for this key may have finished between our lookup and now
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+        if state != "miss":
+            return value
+        try:
+            value = await loader()
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        with self._lock:
+            self._stats["loads"] += 1
+        self.set(key, value, ttl)
+        return value
+
+    async def _async_refresh(self, key: Hashable, loader: AsyncLoader, ttl: Optional[TTL]) -> None:
+        try:
+            value = await loader()
+            self.set(key, value, ttl)
+            with self._lock:
+                self._stats["loads"] += 1
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"⚠️ Background refresh of {self.name} failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def async_get_or_load(self, key: Hashable, loader: AsyncLoader, ttl: Optional[TTL] = None) -> Any:
+        """get_or_load for a coroutine loader; concurrent misses for key share one load."""
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+            if state == "hit":
+                self._stats["hits"] += 1
+                return copy.deepcopy(value)
+            if state == "stale":
+                self._stats["staleHits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = asyncio.ensure_future(self._async_refresh(key, loader, ttl))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return copy.deepcopy(value)
+            self._stats["misses"] += 1
+
+        value = await self._flight.do(key, lambda: self._async_load(key, loader, ttl), group=self.name)
+        return copy.deepcopy(value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "maxEntries": self.max_entries, **self._stats}
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every TTLCache, keyed by name."""
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
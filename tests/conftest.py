@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Clock:
+    """Stands in for the `time` module of the code under test, so expiry can be stepped through."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """clock(*modules) swaps the `time` of those modules for one shared Clock."""
+    fake = Clock()
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "time", fake)
+        return fake
+
+    return install
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A TestClient for main.app with fresh dispatcher, cache, refresh and snapshot state.
+
+    Tests swap in stub scrapers with monkeypatch.setitem(main.anime_scrapers, ...).
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    from scraper_utils.dispatch import ScraperDispatcher
+    from scraper_utils.response_cache import ResponseCache
+    from scraper_utils.snapshots import SnapshotStore
+
+    monkeypatch.delenv("RESPONSE_CACHE_SQLITE_PATH", raising=False)
+    monkeypatch.setattr(main, "dispatcher", ScraperDispatcher())
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    monkeypatch.setattr(main, "refresh_tasks", {})
+    monkeypatch.setattr(main, "snapshots", SnapshotStore())
+    return TestClient(main.app)
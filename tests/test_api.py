@@ -0,0 +1,454 @@
+import json
+import threading
+import time
+
+import main
+from scraper_utils import expiry, response_cache
+from scraper_utils.pagination import page_result
+
+
+class StubSource:
+    """Anime scraper stand-in that counts its upstream calls."""
+
+    def __init__(self, results=None, streams=None):
+        self.results = results if results is not None else [{"title": f"Show {n}", "url": f"/watch/{n}"} for n in range(45)]
+        self.streams = streams or []
+        self.calls = []
+
+    def search_anime(self, q):
+        self.calls.append(("search_anime", q))
+        return [dict(result) for result in self.results]
+
+    def get_popular_anime(self):
+        self.calls.append(("get_popular_anime",))
+        return [dict(result) for result in self.results]
+
+    def get_video_sources(self, id):
+        self.calls.append(("get_video_sources", id))
+        return [dict(stream) for stream in self.streams]
+
+
+def install(monkeypatch, source="hanime", **kwargs):
+    stub = StubSource(**kwargs)
+    monkeypatch.setitem(main.anime_scrapers, source, stub)
+    return stub
+
+
+def search(api, q, **params):
+    return api.get("/api/anime/search", params={"q": q, "source": "hanime", **params})
+
+
+def test_equivalent_searches_share_a_cache_entry(api, monkeypatch):
+    stub = install(monkeypatch)
+    assert search(api, "Love Live").status_code == 200
+    assert search(api, "  love   LIVE ").status_code == 200
+    assert stub.calls == [("search_anime", "Love Live")]
+
+    search(api, "love live!")
+    assert len(stub.calls) == 2
+
+
+def test_pages_of_a_listing_share_one_entry(api, monkeypatch):
+    stub = install(monkeypatch)
+    first = search(api, "pages", page=1, limit=20).json()
+    third = search(api, "pages", page=3, limit=20).json()
+
+    assert [r["url"] for r in first["results"]] == [f"/watch/{n}" for n in range(20)]
+    assert [r["url"] for r in third["results"]] == [f"/watch/{n}" for n in range(40, 45)]
+    assert third["totalResults"] == 45
+    assert len(stub.calls) == 1
+
+
+def test_search_entries_expire_after_the_search_ttl(api, monkeypatch, clock):
+    stub = install(monkeypatch)
+    now = clock(response_cache)
+    ttl = main.response_cache.ttl_for("anime/search")
+
+    search(api, "ttl")
+    now.advance(ttl - 1)
+    search(api, "ttl")
+    assert len(stub.calls) == 1
+
+    now.advance(2)
+    search(api, "ttl")
+    assert len(stub.calls) == 2
+
+
+def test_empty_results_are_not_cached(api, monkeypatch):
+    stub = install(monkeypatch, results=[])
+    search(api, "nothing")
+    search(api, "nothing")
+    assert len(stub.calls) == 2
+
+
+def test_episode_entries_expire_before_their_stream_urls(api, monkeypatch, clock):
+    now = clock(response_cache, expiry)
+    stub = install(monkeypatch, streams=[{"url": f"https://cdn.example/ep.m3u8?expires={int(now.now) + 600}", "quality": "720p"}])
+
+    def episode():
+        return api.get("/api/anime/get-episode", params={"source": "hanime", "id": "ep-1"})
+
+    assert episode().json()["streams"][0]["quality"] == "720p"
+    # 600s until the URL expires, minus the 60s safety margin
+    now.advance(539)
+    episode()
+    assert len(stub.calls) == 1
+
+    now.advance(2)
+    episode()
+    assert len(stub.calls) == 2
+
+
+def test_cache_counters_are_reported_per_endpoint(api, monkeypatch):
+    install(monkeypatch)
+    search(api, "stats")
+    search(api, "stats")
+
+    stats = api.get("/api/stats").json()["cache"]
+    assert stats["endpoints"]["anime/search"] == {"hits": 1, "diskHits": 0, "staleHits": 0, "misses": 1, "refreshes": 0}
+
+
+def test_stale_listing_is_served_while_one_refresh_runs(api, monkeypatch, clock):
+    stub = install(monkeypatch)
+    now = clock(response_cache)
+
+    def popular():
+        return api.get("/api/anime/popular", params={"source": "hanime"})
+
+    # Keep one event loop across requests so the background refresh can finish
+    with api:
+        assert popular().headers["X-Cache"] == "MISS"
+        stub.results = stub.results[:3]
+        now.advance(main.response_cache.ttl_for("anime/popular") + 1)
+
+        stale = popular()
+        assert stale.headers["X-Cache"] == "STALE"
+        assert stale.json()["totalResults"] == 45
+
+        deadline = time.monotonic() + 5
+        while main.refresh_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        fresh = popular()
+        assert fresh.headers["X-Cache"] == "HIT"
+        assert fresh.json()["totalResults"] == 3
+    assert stub.calls == [("get_popular_anime",), ("get_popular_anime",)]
+
+
+def test_search_entries_are_never_served_stale(api, monkeypatch, clock):
+    install(monkeypatch)
+    now = clock(response_cache)
+    search(api, "fresh only")
+    now.advance(main.response_cache.ttl_for("anime/search") + 1)
+    assert search(api, "fresh only").headers["X-Cache"] == "MISS"
+
+
+class PagedSource(StubSource):
+    """StubSource with a page-aware search, as the page-aware scrapers have."""
+
+    def search_anime_page(self, q, page, limit):
+        self.calls.append(("search_anime_page", q, page, limit))
+        start = (page - 1) * limit
+        return page_result(self.results[start:start + limit], page, limit,
+                           total_results=len(self.results), has_next_page=start + limit < len(self.results))
+
+
+def test_page_aware_sources_are_asked_for_the_window_only(api, monkeypatch):
+    stub = PagedSource()
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+
+    second = search(api, "window", page=2, limit=10).json()
+    assert [r["url"] for r in second["results"]] == [f"/watch/{n}" for n in range(10, 20)]
+    assert second["totalResults"] == 45
+    search(api, "window", page=2, limit=10)
+    search(api, "window", page=3, limit=10)
+    assert stub.calls == [("search_anime_page", "window", 2, 10), ("search_anime_page", "window", 3, 10)]
+
+
+def walk(api, q, limit):
+    """Follow `next` cursors from page 1 to the end, returning every page."""
+    pages = [search(api, q, limit=limit).json()]
+    while pages[-1]["next"]:
+        pages.append(search(api, q, limit=limit, cursor=pages[-1]["next"]).json())
+    return pages
+
+
+def test_cursor_walk_is_stable_while_upstream_shifts(api, monkeypatch):
+    stub = PagedSource()
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+
+    first = search(api, "shifting", limit=10).json()
+    # A new item lands on top, pushing everything one place down upstream
+    stub.results.insert(0, {"title": "New", "url": "/watch/new"})
+    pages = [first]
+    while pages[-1]["next"]:
+        pages.append(search(api, "shifting", limit=10, cursor=pages[-1]["next"]).json())
+
+    urls = [r["url"] for page in pages for r in page["results"]]
+    assert urls == [f"/watch/{n}" for n in range(45)]
+    assert [page["page"] for page in pages] == [1, 2, 3, 4, 5]
+
+
+def test_last_page_has_no_cursor(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", PagedSource())
+    pages = walk(api, "to the end", 20)
+    assert [len(page["results"]) for page in pages] == [20, 20, 5]
+    assert pages[-1]["next"] is None
+
+
+def test_cursors_only_work_on_their_own_listing(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", PagedSource())
+    cursor = search(api, "one listing", limit=10).json()["next"]
+
+    assert search(api, "another listing", limit=10, cursor=cursor).status_code == 400
+    assert search(api, "one listing", limit=10, cursor="not-a-cursor").status_code == 400
+
+
+class SearchStub:
+    """Search-only source for the federated search, optionally slow or failing."""
+
+    def __init__(self, name, count=2, error=None, gate=None):
+        self.results = [{"title": f"{name} {n}", "url": f"/{name}/{n}"} for n in range(count)]
+        self.error = error
+        self.gate = gate
+
+    def search(self, q):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error:
+            raise self.error
+        return [dict(result) for result in self.results]
+
+    search_anime = search
+    search_manga = search
+
+
+def install_federated(monkeypatch, **overrides):
+    for kind, name in main.FEDERATED_SOURCES:
+        registry = main.anime_scrapers if kind == "anime" else main.scrapers
+        monkeypatch.setitem(registry, name, overrides.get(name) or SearchStub(name))
+
+
+def test_federated_search_interleaves_sources_by_rank(api, monkeypatch):
+    install_federated(monkeypatch)
+    data = api.get("/api/search", params={"q": "mix", "sources": "hanime,comick"}).json()
+
+    assert [r["url"] for r in data["results"]] == ["/hanime/0", "/comick/0", "/hanime/1", "/comick/1"]
+    assert {r["type"] for r in data["results"]} == {"anime", "manga"}
+    assert data["sources"]["hanime"]["status"] == "ok"
+    assert data["sources"]["comick"]["count"] == 2
+    assert set(data["sources"]) == {"hanime", "comick"}
+
+
+def test_federated_search_returns_what_answered_by_the_deadline(api, monkeypatch):
+    gate = threading.Event()
+    install_federated(monkeypatch, allanime=SearchStub("allanime", gate=gate),
+                      nhentai=SearchStub("nhentai", error=ValueError("blocked")))
+    with api:
+        try:
+            data = api.get("/api/search", params={"q": "deadline", "timeout": 0.5}).json()
+        finally:
+            gate.set()
+
+    statuses = {name: source["status"] for name, source in data["sources"].items()}
+    assert statuses == {"hanime": "ok", "hahomoe": "ok", "allanime": "timeout", "comick": "ok", "nhentai": "error"}
+    assert data["sources"]["nhentai"]["error"] == "blocked"
+    assert data["totalResults"] == 6
+
+
+def test_federated_search_rejects_unknown_sources(api, monkeypatch):
+    install_federated(monkeypatch)
+    assert api.get("/api/search", params={"q": "x", "sources": "hanime,nowhere"}).status_code == 400
+    assert api.get("/api/search", params={"q": "x", "type": "music"}).status_code == 400
+    # nhentai is a manga source
+    assert api.get("/api/search", params={"q": "x", "type": "anime", "sources": "nhentai"}).status_code == 400
+
+
+class StreamedSource(PagedSource):
+    """PagedSource that reports its upstream page size, so listings stream page by page."""
+
+    upstream_page_size = 10
+
+    def __init__(self, fail_page=None):
+        super().__init__()
+        self.fail_page = fail_page
+
+    def search_anime_page(self, q, page, limit):
+        if page == self.fail_page:
+            raise ValueError(f"page {page} failed")
+        return super().search_anime_page(q, page, limit)
+
+
+def ndjson_events(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_listing_streams_one_event_per_upstream_page(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", StreamedSource())
+    response = search(api, "streamed", page=2, limit=15, stream="ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = ndjson_events(response)
+    assert [(e["event"], e.get("upstreamPage")) for e in events] == [("page", 2), ("page", 3), ("done", None)]
+    assert [r["url"] for e in events[:2] for r in e["results"]] == [f"/watch/{n}" for n in range(15, 30)]
+    assert all(r["source"] == "hanime" and r["id"] == r["url"] for r in events[0]["results"])
+    done = events[-1]
+    assert (done["count"], done["totalResults"], done["hasNextPage"]) == (15, 45, True)
+
+
+def test_sse_is_chosen_from_the_accept_header(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", StreamedSource())
+    response = api.get("/api/anime/search", params={"q": "sse", "source": "hanime", "limit": 5},
+                       headers={"Accept": "text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [line for line in response.text.splitlines() if line.startswith("event:")] == \
+        ["event: page", "event: done"]
+
+
+def test_failure_after_the_first_page_ends_the_stream_with_an_error_event(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", StreamedSource(fail_page=2))
+    events = ndjson_events(search(api, "broken", limit=20, stream="1"))
+    assert [e["event"] for e in events] == ["page", "error"]
+    assert events[-1]["detail"] == "page 2 failed"
+
+
+def test_streaming_does_not_take_a_cursor(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", StreamedSource())
+    assert search(api, "cursor", stream="ndjson", cursor="abc").status_code == 400
+
+
+class DetailsSource:
+    """Details lookups for known ids, optionally with a batch lookup."""
+
+    def __init__(self, known):
+        self.known = set(known)
+        self.calls = []
+
+    def get_anime_details(self, id):
+        self.calls.append(("get_anime_details", id))
+        return {"title": f"Show {id}", "url": id} if id in self.known else {}
+
+    def get_episodes(self, details):
+        self.calls.append(("get_episodes", details["url"]))
+        return [{"title": "Episode 1", "url": f"{details['url']}/1"}]
+
+
+class BatchDetailsSource(DetailsSource):
+    def get_anime_details_batch(self, ids):
+        self.calls.append(("get_anime_details_batch", tuple(ids)))
+        return {id: {"title": f"Show {id}", "url": id, "episodes": []} for id in ids if id in self.known}
+
+
+def batch(api, ids):
+    return api.get("/api/anime/details/batch", params={"source": "hanime", "ids": ids})
+
+
+def test_batch_details_reuses_cached_entries(api, monkeypatch):
+    stub = DetailsSource({"a", "b"})
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+    api.get("/api/anime/details", params={"source": "hanime", "id": "a"})
+    stub.calls.clear()
+
+    data = batch(api, "a, b,missing,b").json()
+    assert [d["url"] for d in data["results"]] == ["a", "b"]
+    assert data["results"][1]["episodes"] == [{"title": "Episode 1", "url": "b/1"}]
+    assert data["notFound"] == ["missing"]
+    assert ("get_anime_details", "a") not in stub.calls
+    assert sorted(call for call in stub.calls if call[0] == "get_anime_details") == \
+        [("get_anime_details", "b"), ("get_anime_details", "missing")]
+
+
+def test_batch_capable_sources_fetch_missing_ids_in_one_call(api, monkeypatch):
+    stub = BatchDetailsSource({"a", "b"})
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+
+    data = batch(api, "a,b,missing").json()
+    assert stub.calls == [("get_anime_details_batch", ("a", "b", "missing"))]
+    assert [d["url"] for d in data["results"]] == ["a", "b"]
+    assert data["notFound"] == ["missing"]
+
+    # The found entries are now cached for single lookups too
+    api.get("/api/anime/details", params={"source": "hanime", "id": "b"})
+    assert len(stub.calls) == 1
+
+
+def test_batch_size_is_limited(api, monkeypatch):
+    monkeypatch.setitem(main.anime_scrapers, "hanime", DetailsSource(set()))
+    ids = [f"id-{n}" for n in range(main.MAX_BATCH_IDS)]
+
+    assert batch(api, ",".join(ids)).status_code == 200
+    # Repeated ids count once
+    assert batch(api, ",".join(ids + ids[:5])).status_code == 200
+    too_many = batch(api, ",".join(ids + ["one-more"]))
+    assert too_many.status_code == 400
+    assert str(main.MAX_BATCH_IDS) in too_many.json()["detail"]
+    assert batch(api, " , ").status_code == 400
+
+
+class TargetedSource(StubSource):
+    """StubSource whose get_video_sources can stop early, like AllAnime's."""
+
+    def get_video_sources(self, id, quality=None, max_streams=None):
+        self.calls.append(("get_video_sources", id, quality, max_streams))
+        return [dict(stream) for stream in self.streams]
+
+
+EPISODE_STREAMS = [{"url": f"https://cdn.example/{n}.mp4", "quality": quality}
+                   for n, quality in enumerate(["1080p", "720p", "720p", "480p"])]
+
+
+def episode(api, **params):
+    return api.get("/api/anime/get-episode", params={"source": "hanime", "id": "ep-1", **params})
+
+
+def test_episode_streams_are_narrowed_to_quality_and_count(api, monkeypatch):
+    stub = install(monkeypatch, streams=EPISODE_STREAMS)
+
+    assert [s["url"] for s in episode(api, quality="720").json()["streams"]] == \
+        ["https://cdn.example/1.mp4", "https://cdn.example/2.mp4"]
+    assert [s["quality"] for s in episode(api, quality="2160", max_streams=2).json()["streams"]] == ["1080p", "720p"]
+    # The source can't stop early, so it is called without the target
+    assert stub.calls[0] == ("get_video_sources", "ep-1")
+
+
+def test_sources_that_stop_early_get_the_target(api, monkeypatch):
+    stub = TargetedSource(streams=EPISODE_STREAMS)
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+
+    episode(api, quality="720p", max_streams=1)
+    episode(api)
+    assert stub.calls == [("get_video_sources", "ep-1", "720p", 1), ("get_video_sources", "ep-1", None, None)]
+
+
+def test_max_streams_is_bounded(api, monkeypatch):
+    install(monkeypatch, streams=EPISODE_STREAMS)
+    assert episode(api, max_streams=0).status_code == 422
+    assert episode(api, max_streams=51).status_code == 422
+
+
+class HosterSource(StubSource):
+    """StubSource that reports its hosters one by one, like AllAnime's iter_video_sources."""
+
+    def iter_video_sources(self, id, quality=None, max_streams=None):
+        self.calls.append(("iter_video_sources", id, quality, max_streams))
+        for n, stream in enumerate(self.streams):
+            yield "server", {"server": f"hoster-{n}", "streams": [stream], "timeMs": n}
+        yield "done", {"streams": self.streams, "servers": {}}
+
+
+def test_episode_streams_one_event_per_hoster(api, monkeypatch):
+    stub = HosterSource(streams=EPISODE_STREAMS[:2])
+    monkeypatch.setitem(main.anime_scrapers, "hanime", stub)
+
+    events = ndjson_events(episode(api, stream="ndjson", quality="720"))
+    assert [(e["event"], e.get("server")) for e in events] == [("server", "hoster-0"), ("server", "hoster-1"), ("done", None)]
+    assert (events[-1]["source"], events[-1]["episode_id"]) == ("hanime", "ep-1")
+    assert stub.calls == [("iter_video_sources", "ep-1", "720", None)]
+
+
+def test_episode_stream_from_a_single_shot_source(api, monkeypatch):
+    install(monkeypatch, streams=EPISODE_STREAMS)
+    events = ndjson_events(episode(api, stream="1", max_streams=1))
+    assert [e["event"] for e in events] == ["server", "done"]
+    assert events[0]["streams"] == EPISODE_STREAMS[:1]
+    assert events[-1]["servers"]["hanime"]["streams"] == 1
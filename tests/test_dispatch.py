@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scraper_utils.dispatch import BlockingFallback, ScraperDispatcher, SourcePool, SourceSaturatedError
+
+
+def test_pool_admits_workers_plus_queue_then_rejects():
+    pool = SourcePool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(SourceSaturatedError):
+                await pool.run(release.wait, 5)
+            return pool.stats()
+        finally:
+            release.set()
+            await asyncio.gather(*running)
+
+    busy = asyncio.run(scenario())
+    assert busy["inFlight"] == 2
+    assert busy["queued"] == 1
+    assert busy["rejected"] == 1
+
+    done = pool.stats()
+    assert done["inFlight"] == 0
+    assert done["completed"] == 2
+
+
+def test_failed_calls_free_their_slot():
+    pool = SourcePool("test", max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("upstream down")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert pool.stats()["inFlight"] == 0
+
+
+def test_pool_sizes_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SCRAPER_POOL_EXAMPLE", "3")
+    monkeypatch.setenv("SCRAPER_QUEUE_EXAMPLE", "7")
+    dispatcher = ScraperDispatcher(["example"])
+    stats = dispatcher.stats()["example"]
+    assert (stats["workers"], stats["queueDepth"]) == (3, 7)
+    dispatcher.shutdown()
+
+
+def test_saturated_source_answers_503(api, monkeypatch):
+    import main
+
+    started = threading.Event()
+    release = threading.Event()
+
+    class SlowSource:
+        def search_anime(self, q):
+            started.set()
+            release.wait(5)
+            return [{"title": q, "url": f"/watch/{q}"}]
+
+    monkeypatch.setitem(main.anime_scrapers, "hanime", SlowSource())
+    main.dispatcher.configure("hanime", 1, 0)
+
+    with ThreadPoolExecutor(1) as executor:
+        try:
+            first = executor.submit(api.get, "/api/anime/search", params={"q": "slow", "source": "hanime"})
+            assert started.wait(5)
+            busy = api.get("/api/anime/search", params={"q": "other", "source": "hanime"})
+        finally:
+            release.set()
+        assert first.result().status_code == 200
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert busy.json() == {"detail": "Source 'hanime' is busy, please retry shortly"}
+    assert main.dispatcher.stats()["hanime"]["rejected"] == 1
+
+
+def test_identical_calls_share_one_scrape():
+    dispatcher = ScraperDispatcher()
+    calls = []
+    release = threading.Event()
+
+    class Source:
+        def get_anime_details(self, id):
+            calls.append(id)
+            release.wait(5)
+            return {"id": id}
+
+    async def scenario():
+        source = Source()
+        same = [asyncio.ensure_future(dispatcher.call("test", source, "get_anime_details", "a")) for _ in range(3)]
+        other = asyncio.ensure_future(dispatcher.call("test", source, "get_anime_details", "b"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*same, other)
+
+    assert asyncio.run(scenario()) == [{"id": "a"}] * 3 + [{"id": "b"}]
+    assert sorted(calls) == ["a", "b"]
+    assert dispatcher.stats()["test"]["completed"] == 2
+    dispatcher.shutdown()
+
+
+def test_blocking_fallback_reruns_the_call_on_the_pool():
+    dispatcher = ScraperDispatcher()
+
+    class Source:
+        async def async_get_pages(self, chapter):
+            raise BlockingFallback("needs the blocking session")
+
+        def get_pages(self, chapter):
+            return [threading.current_thread().name, chapter]
+
+    thread, chapter = asyncio.run(dispatcher.call("test", Source(), "get_pages", "chapter-1"))
+    assert thread.startswith("scraper-test")
+    assert chapter == "chapter-1"
+    # The async attempt and the blocking rerun were both admitted
+    assert dispatcher.stats()["test"]["completed"] == 2
+    dispatcher.shutdown()
+
+
+def test_comick_pages_fall_back_to_the_blocking_session(monkeypatch):
+    from manga_scrapers.comick import ComickScraper
+
+    scraper = ComickScraper()
+
+    async def unreachable(url, params=None, retries=3):
+        return None
+
+    monkeypatch.setattr(scraper, "_async_make_request", unreachable)
+    monkeypatch.setattr(scraper, "get_pages", lambda chapter: [{"index": 0, "url": f"https://cdn.example/{chapter}.jpg"}])
+
+    dispatcher = ScraperDispatcher()
+    pages = asyncio.run(dispatcher.call("comick", scraper, "get_pages", "abc"))
+    assert pages == [{"index": 0, "url": "https://cdn.example/abc.jpg"}]
+    dispatcher.shutdown()
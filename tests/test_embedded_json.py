@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from scraper_utils.embedded_json import decode_js_string, find_json_parse
+
+
+@pytest.mark.parametrize("literal, expected", [
+    (r'{\"a\":1}', '{"a":1}'),
+    (r'line\nbreak\ttab', "line\nbreak\ttab"),
+    (r'\u00e9t\u00e9', "été"),
+    (r'\x41\x42', "AB"),
+    (r"it\'s", "it's"),
+    (r'\v', "\v"),
+    ("con\\\ntinued", "continued"),
+    (r'\ud83d\ude00', "\U0001F600"),
+    (r'\u{1F600}', "\U0001F600"),
+    (r'mixed \x41 and \"quotes\"', 'mixed A and "quotes"'),
+])
+def test_decode_js_string(literal, expected):
+    assert decode_js_string(literal) == expected
+
+
+def page(script):
+    return f"<html><body><script>{script}</script></body></html>".encode("utf-8")
+
+
+def test_finds_a_double_quoted_json_parse():
+    data = {"id": 1, "title": {"english": "Say \"hi\""}, "tags": ["a/b"]}
+    literal = json.dumps(json.dumps(data))
+    assert find_json_parse(page(f"window._gallery = JSON.parse({literal});")) == data
+
+
+def test_finds_a_single_quoted_json_parse_with_js_escapes():
+    content = page(r"""var g = JSON.parse('{\"name\":\"it\'s \x41\",\"n\":\u0032}');""")
+    assert find_json_parse(content) == {"name": "it's A", "n": 2}
+
+
+def test_escaped_backslash_before_the_closing_quote_ends_the_literal():
+    content = page(r'x = JSON.parse("{\"path\":\"C:\\\\\"}"); y = "unrelated"')
+    assert find_json_parse(content) == {"path": "C:\\"}
+
+
+@pytest.mark.parametrize("script", [
+    "var a = 1;",
+    "JSON.parse(data)",
+    'JSON.parse("{not json}")',
+    'JSON.parse("{\\"unterminated',
+])
+def test_returns_none_without_a_usable_call(script):
+    assert find_json_parse(page(script)) is None
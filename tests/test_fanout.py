@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+from scraper_utils import fanout
+from scraper_utils.fanout import async_collect_pages, collect_pages, fetch_pages, unique
+
+
+def numbered_pages(pages, per_page=3, total_pages=None, fail=()):
+    """fetch_page over `pages` pages of numbered items, recording the pages asked for."""
+    calls = []
+
+    def fetch_page(n):
+        calls.append(n)
+        if n in fail:
+            raise ValueError(f"page {n} failed")
+        if n > pages:
+            return {"results": [], "hasNextPage": False}
+        data = {"results": list(range((n - 1) * per_page, n * per_page)), "hasNextPage": n < pages}
+        if total_pages:
+            data["totalPages"] = total_pages
+        return data
+
+    return fetch_page, calls
+
+
+def test_pages_are_merged_in_order_without_duplicates():
+    def fetch_page(n):
+        # Neighbouring pages share an item, as listings do when they shift
+        return {"results": [n * 10 - 1, n * 10], "hasNextPage": n < 3}
+
+    assert collect_pages(fetch_page, 1, 5, "test-host", key=lambda item: item) == [9, 10, 19, 20, 29, 30]
+
+
+def test_reported_page_count_limits_the_fanout():
+    fetch_page, calls = numbered_pages(3, total_pages=3)
+    assert collect_pages(fetch_page, 1, 10, "test-host", key=lambda item: item) == list(range(9))
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_results_after_an_empty_page_are_dropped():
+    fetch_page, _ = numbered_pages(2)
+    # Without totalPages the remaining pages are requested speculatively
+    assert collect_pages(fetch_page, 1, 4, "test-host", key=lambda item: item) == list(range(6))
+
+
+def test_a_failing_page_keeps_what_was_collected():
+    fetch_page, _ = numbered_pages(5, fail={3})
+    assert collect_pages(fetch_page, 1, 5, "test-host", key=lambda item: item) == list(range(6))
+
+
+def test_concurrent_fetches_stay_under_the_host_cap(monkeypatch):
+    monkeypatch.setitem(fanout.HOST_CONCURRENCY, "capped-host", 2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fetch_page(n):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return {"results": [n], "hasNextPage": True}
+
+    results = [page for page, _ in fetch_pages(fetch_page, range(1, 9), "capped-host")]
+    assert results == list(range(1, 9))
+    assert peak == 2
+
+
+def test_unique_shares_seen_keys_between_calls():
+    seen = set()
+    assert unique([1, 2, 2], lambda item: item, seen) == [1, 2]
+    assert unique([2, 3], lambda item: item, seen) == [3]
+
+
+def test_async_pages_are_merged_in_order():
+    fetch, calls = numbered_pages(3, total_pages=3)
+
+    async def fetch_page(n):
+        return fetch(n)
+
+    results = asyncio.run(async_collect_pages(fetch_page, 1, 10, "test-host", key=lambda item: item))
+    assert results == list(range(9))
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_async_fetches_stay_under_the_host_cap(monkeypatch):
+    monkeypatch.setitem(fanout.HOST_CONCURRENCY, "async-capped-host", 2)
+    running = 0
+    peak = 0
+
+    async def fetch_page(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"results": [n], "hasNextPage": True}
+
+    async def scenario():
+        # Two walks at once share the host's cap
+        return await asyncio.gather(*(async_collect_pages(fetch_page, 1, 6, "async-capped-host", key=lambda item: item)
+                                      for _ in range(2)))
+
+    assert asyncio.run(scenario()) == [list(range(1, 7))] * 2
+    assert peak == 2
+
+
+def test_a_failing_async_page_keeps_what_was_collected():
+    fetch, _ = numbered_pages(5, fail={3})
+
+    async def fetch_page(n):
+        return fetch(n)
+
+    results = asyncio.run(async_collect_pages(fetch_page, 1, 5, "test-host", key=lambda item: item))
+    assert results == list(range(6))
@@ -0,0 +1,73 @@
+from scraper_utils import hoster_health
+from scraper_utils.hoster_health import COOLDOWN, FAILURE_THRESHOLD, HosterHealth
+
+
+def fail(model, hoster, times=FAILURE_THRESHOLD):
+    for _ in range(times):
+        model.record(hoster, 1.0, False, "No videos found")
+
+
+def test_hoster_is_skipped_after_consecutive_failures(clock):
+    clock(hoster_health)
+    model = HosterHealth("test-skip")
+    fail(model, "dood", FAILURE_THRESHOLD - 1)
+    assert model.plan(["dood", "okru"], str) == ["okru", "dood"]
+
+    fail(model, "dood", 1)
+    assert model.plan(["dood", "okru"], str) == ["okru"]
+    assert model.stats()["dood"]["status"] == "skipped"
+    assert model.stats()["dood"]["skipped"] == 1
+
+
+def test_one_probe_after_the_cooldown(clock):
+    now = clock(hoster_health)
+    model = HosterHealth("test-probe")
+    fail(model, "dood")
+
+    now.advance(COOLDOWN + 1)
+    assert model.plan(["dood", "okru"], str) == ["okru", "dood"]
+    # The probe is in flight, other requests keep skipping the hoster
+    assert model.plan(["dood", "okru"], str) == ["okru"]
+
+    model.record("dood", 0.5, True)
+    assert "dood" in model.plan(["dood", "okru"], str)
+    assert "dood" in model.plan(["dood", "okru"], str)
+    assert model.stats()["dood"]["status"] == "healthy"
+
+
+def test_cooldown_doubles_when_the_probe_fails(clock):
+    now = clock(hoster_health)
+    model = HosterHealth("test-double")
+    fail(model, "dood")
+    assert model.stats()["dood"]["retryInSeconds"] == int(COOLDOWN)
+
+    now.advance(COOLDOWN + 1)
+    model.plan(["dood"], str)
+    fail(model, "dood", 1)
+    assert model.stats()["dood"]["retryInSeconds"] == int(2 * COOLDOWN)
+
+
+def test_every_candidate_is_returned_when_all_are_failing(clock):
+    clock(hoster_health)
+    model = HosterHealth("test-all-failing")
+    fail(model, "dood")
+    fail(model, "okru")
+    assert sorted(model.plan(["dood", "okru"], str)) == ["dood", "okru"]
+
+
+def test_rank_beats_health_and_cost_breaks_ties(clock):
+    clock(hoster_health)
+    model = HosterHealth("test-rank")
+    model.record("slow", 8.0, True)
+    model.record("fast", 0.5, True)
+    assert model.plan(["slow", "fast"], str) == ["fast", "slow"]
+    assert model.plan(["slow", "fast"], str, rank=lambda hoster: hoster != "slow") == ["slow", "fast"]
+
+
+def test_fanout_adds_hosters_until_one_should_succeed():
+    model = HosterHealth("test-fanout")
+    for _ in range(20):
+        model.record("reliable", 1.0, True)
+    assert model.fanout(["reliable", "other"]) == 1
+    assert model.fanout(["unknown-1", "unknown-2", "unknown-3"]) == 3
+    assert model.fanout([]) == 1
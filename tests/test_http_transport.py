@@ -0,0 +1,91 @@
+import asyncio
+import math
+
+import pytest
+
+from scraper_utils import http_transport
+from scraper_utils.http_transport import HEDGE_BURST, AsyncTransport, HostConfig
+
+HOST = "api.example.com"
+
+
+class FakeResponse:
+    def __init__(self, url):
+        self.url = url
+
+
+def transport(delays):
+    """AsyncTransport whose _send sleeps delays[url] instead of going to the network."""
+    sent = []
+    instance = AsyncTransport({HOST: HostConfig(hedge=True, hedge_delay=0.01)})
+
+    async def send(method, url, **kwargs):
+        sent.append(url)
+        await asyncio.sleep(delays.get(url, 0))
+        return FakeResponse(url)
+
+    instance._send = send
+    return instance, sent
+
+
+def test_slow_request_is_hedged_to_the_mirror():
+    instance, sent = transport({f"https://{HOST}/api": 1.0, "https://mirror.example.com/api": 0})
+    response = asyncio.run(instance.request("POST", f"https://{HOST}/api", mirrors=["https://mirror.example.com/api"]))
+    assert response.url == "https://mirror.example.com/api"
+    assert sent == [f"https://{HOST}/api", "https://mirror.example.com/api"]
+    assert instance.stats()["hedgeWins"] == 1
+
+
+def test_fast_request_is_not_hedged():
+    instance, sent = transport({})
+    asyncio.run(instance.request("GET", f"https://{HOST}/fast"))
+    assert sent == [f"https://{HOST}/fast"]
+    assert instance.stats()["hedges"] == 0
+
+
+def test_hedges_stop_when_the_bucket_is_empty():
+    instance, _ = transport({f"https://{HOST}/slow": 0.03})
+
+    async def run(count):
+        for _ in range(count):
+            await instance.request("GET", f"https://{HOST}/slow")
+
+    asyncio.run(run(int(HEDGE_BURST) + 3))
+    stats = instance.stats()
+    # The requests themselves earned less than one more hedge
+    assert stats["hedges"] == int(HEDGE_BURST)
+    assert stats["hedgesOverBudget"] == 3
+
+
+def test_each_request_earns_a_fraction_of_a_hedge():
+    instance, _ = transport({})
+    instance._hedge_tokens[HOST] = 0.0
+    earning = math.ceil(1 / http_transport.HEDGE_BUDGET) + 1
+
+    async def run():
+        for _ in range(earning):
+            await instance.request("GET", f"https://{HOST}/fast")
+
+    asyncio.run(run())
+    assert instance._take_hedge_token(HOST)
+    assert not instance._take_hedge_token(HOST)
+
+
+def test_bucket_is_capped_at_the_burst():
+    instance, _ = transport({})
+
+    async def run():
+        for _ in range(100):
+            await instance.request("GET", f"https://{HOST}/fast")
+
+    asyncio.run(run())
+    assert instance._hedge_tokens[HOST] == HEDGE_BURST
+
+
+def test_p90_needs_enough_samples():
+    instance = AsyncTransport()
+    for seconds in range(1, http_transport.HEDGE_MIN_SAMPLES):
+        instance._record_latency(HOST, seconds / 100)
+    assert instance.p90(HOST) is None
+    instance._record_latency(HOST, 0.2)
+    assert instance.p90(HOST) == pytest.approx(0.19)
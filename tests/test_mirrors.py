@@ -0,0 +1,85 @@
+import pytest
+
+from scraper_utils.mirrors import FAILURE_THRESHOLD, MirrorSelector, mirror_list
+
+PRIMARY = "https://api.example.com"
+MIRROR = "https://api.example.net"
+OTHER = "https://api.example.org"
+
+
+def selector(*mirrors):
+    return MirrorSelector("test", list(mirrors), probe=lambda session, base, timeout: True, probe_interval=0)
+
+
+def fail(mirrors, base, times=FAILURE_THRESHOLD):
+    for _ in range(times):
+        mirrors.observe(f"{base}/api", 0.2, ok=False)
+
+
+def test_switches_only_to_a_clearly_faster_mirror():
+    mirrors = selector(PRIMARY, MIRROR)
+    mirrors.observe(f"{PRIMARY}/api", 1.0)
+    mirrors.observe(f"{MIRROR}/api", 0.9)
+    assert mirrors.current() == PRIMARY
+    mirrors.observe(f"{MIRROR}/api", 0.1)
+    assert mirrors.current() == MIRROR
+
+
+def test_repeated_failures_move_traffic_to_a_healthy_mirror():
+    mirrors = selector(PRIMARY, MIRROR)
+    fail(mirrors, PRIMARY)
+    assert mirrors.current() == MIRROR
+    fail(mirrors, MIRROR)
+    # Nothing known to work: back to the preferred mirror
+    assert mirrors.current() == PRIMARY
+
+
+def test_alternates_are_the_other_healthy_mirrors_fastest_first():
+    mirrors = selector(PRIMARY, MIRROR, OTHER)
+    mirrors.observe(f"{MIRROR}/api", 0.5)
+    mirrors.observe(f"{OTHER}/api", 0.3)
+    assert mirrors.alternates() == [OTHER, MIRROR]
+    fail(mirrors, OTHER)
+    assert mirrors.alternates() == [MIRROR]
+
+
+def test_isolated_failures_keep_a_mirror_in_use():
+    mirrors = selector(PRIMARY, MIRROR)
+    fail(mirrors, PRIMARY, FAILURE_THRESHOLD - 1)
+    mirrors.observe(f"{PRIMARY}/api", 0.2)
+    fail(mirrors, PRIMARY, FAILURE_THRESHOLD - 1)
+    assert mirrors.current() == PRIMARY
+    assert mirrors.stats()["mirrors"][PRIMARY]["healthy"]
+    assert mirrors.stats()["mirrors"][PRIMARY]["failures"] == 2 * (FAILURE_THRESHOLD - 1)
+
+
+def test_unknown_hosts_are_ignored():
+    mirrors = selector(PRIMARY, MIRROR)
+    mirrors.observe("https://elsewhere.example.com/api", 0.01)
+    assert mirrors.current() == PRIMARY
+    assert all(stats["latencyMs"] is None for stats in mirrors.stats()["mirrors"].values())
+
+
+def test_probe_failures_mark_mirrors_unhealthy():
+    def probe(session, base, timeout):
+        if base == PRIMARY:
+            raise ConnectionError("refused")
+        return True
+
+    mirrors = MirrorSelector("test-probe", [PRIMARY, MIRROR], probe=probe, probe_interval=0)
+    for _ in range(FAILURE_THRESHOLD):
+        mirrors.probe_all()
+    assert mirrors.current() == MIRROR
+    assert mirrors.stats()["mirrors"][PRIMARY]["lastError"] == "refused"
+
+
+def test_mirror_list_reads_the_environment(monkeypatch):
+    monkeypatch.setenv("TEST_MIRRORS", f" {PRIMARY}/ ,{MIRROR},,")
+    assert mirror_list("TEST_MIRRORS", [OTHER]) == [PRIMARY, MIRROR]
+    monkeypatch.delenv("TEST_MIRRORS")
+    assert mirror_list("TEST_MIRRORS", [OTHER]) == [OTHER]
+
+
+def test_at_least_one_mirror_is_required():
+    with pytest.raises(ValueError):
+        MirrorSelector("test-empty", [], probe=lambda session, base, timeout: True)
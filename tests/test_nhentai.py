@@ -0,0 +1,63 @@
+import json
+
+from manga_scrapers.nhentai import NHentaiScraper
+
+GALLERY_PAGE = """
+<div id="info"><h1>Fallback Title</h1><div>12 pages</div></div>
+<section id="tags"><div class="tag-container"><span class="tags">Artists:</span>
+<a class="tag"><span class="name">someone</span></a></div></section>
+"""
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.text = body if isinstance(body, str) else json.dumps(body)
+        self.content = self.text.encode("utf-8")
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """Serves fixed bodies by url and records what was requested."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        return FakeResponse(self.bodies[url])
+
+
+def scraper_with(bodies):
+    scraper = NHentaiScraper()
+    scraper.session = FakeSession(bodies)
+    return scraper
+
+
+def test_details_come_from_the_gallery_api():
+    gallery = {"id": 900001, "media_id": "42", "images": {"pages": [{"t": "j"}]},
+               "title": {"english": "API Title", "pretty": "API Title"}, "tags": [], "num_pages": 1}
+    scraper = scraper_with({f"{NHentaiScraper.API_URL}/gallery/900001": gallery})
+
+    details = scraper.get_manga_details({"id": "900001"})
+    assert details["title"] == "API Title"
+    assert scraper.session.requested == [f"{NHentaiScraper.API_URL}/gallery/900001"]
+
+
+def test_unparseable_gallery_json_falls_back_to_the_page():
+    # Usable enough to be cached, but the title isn't an object
+    gallery = {"id": 900002, "media_id": "42", "images": {"pages": [{"t": "j"}]}, "title": "broken"}
+    scraper = scraper_with({
+        f"{NHentaiScraper.API_URL}/gallery/900002": gallery,
+        f"{NHentaiScraper.BASE_URL}/g/900002/": GALLERY_PAGE,
+    })
+
+    details = scraper.get_manga_details({"id": "900002"})
+    assert details["title"] == "Fallback Title"
+    assert scraper.session.requested[-1] == f"{NHentaiScraper.BASE_URL}/g/900002/"
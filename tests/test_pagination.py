@@ -0,0 +1,106 @@
+import pytest
+
+from scraper_utils.pagination import estimate_total, fetch_window, page_result, upstream_span
+
+
+@pytest.mark.parametrize("page, limit, per_page, expected", [
+    (1, 20, 20, (1, 1, 0)),
+    (2, 20, 20, (2, 2, 0)),
+    (1, 20, 48, (1, 1, 0)),
+    (3, 20, 48, (1, 2, 40)),
+    (2, 30, 48, (1, 2, 30)),
+    (4, 10, 7, (5, 6, 2)),
+    (1, 100, 25, (1, 4, 0)),
+])
+def test_upstream_span(page, limit, per_page, expected):
+    assert upstream_span(page, limit, per_page) == expected
+
+
+def listing(total, per_page, report_per_page=False):
+    """fetch_page over `total` numbered items, recording the pages asked for."""
+    calls = []
+    pages = -(-total // per_page)
+
+    def fetch_page(n):
+        calls.append(n)
+        data = {
+            "results": list(range((n - 1) * per_page, min(n * per_page, total))),
+            "hasNextPage": n < pages,
+            "totalPages": pages,
+        }
+        if report_per_page:
+            data["perPage"] = per_page
+        return data
+
+    return fetch_page, calls
+
+
+def test_window_within_one_page_fetches_only_that_page():
+    fetch_page, calls = listing(200, 48)
+    window = fetch_window(fetch_page, 3, 20, 48)
+    assert window["results"] == list(range(40, 60))
+    assert calls == [1, 2]
+    window = fetch_window(fetch_page, 2, 10, 48)
+    assert window["results"] == list(range(10, 20))
+    assert calls == [1, 2, 1]
+
+
+def test_window_spanning_pages_is_stitched_in_order():
+    fetch_page, calls = listing(200, 48)
+    window = fetch_window(fetch_page, 2, 30, 48, host="test-host")
+    assert window["results"] == list(range(30, 60))
+    assert sorted(calls) == [1, 2]
+    assert window["hasNextPage"]
+    assert window["totalResults"] == 5 * 48
+
+
+def test_reported_page_size_replaces_the_guess():
+    fetch_page, calls = listing(200, 25, report_per_page=True)
+    window = fetch_window(fetch_page, 2, 20, 48)
+    assert window["results"] == list(range(20, 40))
+    assert window["perPage"] == 25
+    assert calls == [1, 2]
+
+
+def test_last_window_is_short_and_exact():
+    fetch_page, _ = listing(95, 48)
+    window = fetch_window(fetch_page, 5, 20, 48)
+    assert window["results"] == list(range(80, 95))
+    assert not window["hasNextPage"]
+    assert window["totalResults"] == 95
+
+
+def test_key_drops_items_repeated_across_pages():
+    pages = {1: {"results": [1, 2, 3], "hasNextPage": True}, 2: {"results": [3, 4, 5], "hasNextPage": False}}
+    window = fetch_window(pages.__getitem__, 1, 6, 3, key=lambda item: item)
+    assert window["results"] == [1, 2, 3, 4, 5]
+
+
+def test_repeated_items_do_not_shorten_the_window():
+    pages = {
+        1: {"results": [1, 2, 3], "hasNextPage": True},
+        2: {"results": [3, 4, 5], "hasNextPage": True},
+        3: {"results": [6, 7, 8], "hasNextPage": False},
+    }
+    window = fetch_window(pages.__getitem__, 1, 5, 3, key=lambda item: item)
+    assert window["results"] == [1, 2, 3, 4, 5]
+    assert window["hasNextPage"]
+
+
+def test_repeated_items_do_not_fake_a_next_page():
+    pages = {1: {"results": [1, 2, 3], "hasNextPage": True}, 2: {"results": [3, 4], "hasNextPage": False}}
+    window = fetch_window(pages.__getitem__, 1, 4, 3, key=lambda item: item)
+    assert window["results"] == [1, 2, 3, 4]
+    assert not window["hasNextPage"]
+
+
+def test_estimate_total_prefers_reported_counts():
+    assert estimate_total({"totalResults": 321}, {}, 1, 20) == 321
+    assert estimate_total({}, {"results": [1] * 5, "hasNextPage": False}, 3, 20) == 45
+    assert estimate_total({"totalPages": 7}, {"results": [1], "hasNextPage": True}, 2, 20) == 140
+    assert estimate_total({}, {"results": [1], "hasNextPage": True}, 2, 20) == 60
+
+
+def test_page_result_guesses_the_next_page_from_a_full_window():
+    assert page_result([1] * 20, 2, 20) == {"results": [1] * 20, "totalResults": 60, "hasNextPage": True}
+    assert page_result([1] * 5, 2, 20) == {"results": [1] * 5, "totalResults": 25, "hasNextPage": False}
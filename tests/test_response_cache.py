@@ -0,0 +1,79 @@
+from scraper_utils import response_cache
+from scraper_utils.response_cache import HIT, MISS, STALE, ResponseCache, make_key
+
+
+def test_entry_is_fresh_until_its_ttl(clock):
+    now = clock(response_cache)
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    cache.set("anime/search|hanime|{}", {"results": [1]}, ttl=60)
+
+    now.advance(59)
+    assert cache.get("anime/search|hanime|{}") == {"results": [1]}
+    now.advance(2)
+    assert cache.get("anime/search|hanime|{}") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_stale_entry_is_served_until_its_hard_expiry(clock):
+    now = clock(response_cache)
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    cache.set("anime/popular|hanime|{}", {"results": [1]}, ttl=60, stale_ttl=600)
+
+    now.advance(61)
+    assert cache.lookup("anime/popular|hanime|{}") == ({"results": [1]}, STALE)
+    # get() only returns fresh values
+    assert cache.get("anime/popular|hanime|{}") is None
+    now.advance(600)
+    assert cache.lookup("anime/popular|hanime|{}") == (None, MISS)
+    assert cache.stats()["staleHits"] == 2
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ResponseCache(max_bytes=150)
+    value = {"results": ["x" * 20]}  # 36 bytes serialized
+    for key in ("a", "b", "c", "d"):
+        cache.set(key, value, ttl=60)
+    cache.get("a")
+    cache.set("e", value, ttl=60)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == value for key in ("a", "c", "d", "e"))
+    assert cache.stats()["bytes"] <= 150
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_over_a_quarter_of_the_budget_are_not_kept():
+    cache = ResponseCache(max_bytes=100)
+    cache.set("big", {"results": ["x" * 30]}, ttl=60)
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_empty_results_and_non_positive_ttls_are_not_cached():
+    cache = ResponseCache(max_bytes=1024)
+    cache.set("empty", [], ttl=60)
+    cache.set("empty-page", {"results": [], "hasNextPage": False}, ttl=60)
+    cache.set("no-ttl", {"results": [1]}, ttl=0)
+    assert cache.stats()["entries"] == 0
+
+
+def test_values_are_copies():
+    cache = ResponseCache(max_bytes=1024)
+    cache.set("k", {"results": [1]}, ttl=60)
+    cache.get("k")["results"].append(2)
+    assert cache.get("k") == {"results": [1]}
+
+
+def test_disk_tier_fills_memory_misses(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(max_bytes=1024, sqlite_path=path).set("k", {"results": [1]}, ttl=60)
+
+    restarted = ResponseCache(max_bytes=1024, sqlite_path=path)
+    assert restarted.get("k") == {"results": [1]}
+    assert restarted.stats()["diskHits"] == 1
+
+
+def test_equivalent_params_share_a_key():
+    assert make_key("anime/search", "hanime", {"q": "  Love   Live ", "page": 1, "genre": None}) == \
+        make_key("anime/search", "hanime", {"page": 1, "q": "love live"})
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from scraper_utils.singleflight import SingleFlight, call_key
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"results": [1]}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", fetch, group="hanime") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"results": [1]}] * 5
+    # Waiters get their own copies
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats()["sources"]["hanime"] == {"calls": 5, "executed": 1, "collapsed": 4}
+    assert flight.in_flight() == 0
+
+
+def test_every_caller_gets_the_error():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+
+
+def test_cancelling_a_caller_keeps_the_call_running_for_the_others():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 1
+
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return 1
+
+    async def run():
+        await flight.do("k", fetch)
+        await flight.do("k", fetch)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_call_key_ignores_dict_order():
+    assert call_key("allanime", "get_episodes", ({"a": 1, "b": 2},), {}) == \
+        call_key("allanime", "get_episodes", ({"b": 2, "a": 1},), {})
+    assert call_key("allanime", "search_anime", ("a",), {}) != call_key("allanime", "search_anime", ("b",), {})
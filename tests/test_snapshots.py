@@ -0,0 +1,87 @@
+import base64
+import json
+
+import pytest
+
+from scraper_utils import snapshots as snapshots_module
+from scraper_utils.snapshots import InvalidCursorError, SnapshotStore
+
+
+def items(*ids):
+    return [{"url": f"/anime/{i}"} for i in ids]
+
+
+def test_cursor_resolves_to_its_snapshot_and_offset():
+    store = SnapshotStore(ttl=60)
+    snapshot = store.create("anime/search|hanime|{}", items(1, 2, 3), base_page=1, page_size=3,
+                            exhausted=False, total_results=30)
+    cursor = store.cursor(snapshot, 3)
+
+    assert "=" not in cursor
+    assert store.resolve(cursor, "anime/search|hanime|{}") == (snapshot, 3)
+
+
+def test_cursor_is_rejected_on_another_listing():
+    store = SnapshotStore(ttl=60)
+    snapshot = store.create("anime/search|hanime|{\"q\":\"a\"}", items(1), 1, 1, False, 10)
+    with pytest.raises(InvalidCursorError, match="different listing"):
+        store.resolve(store.cursor(snapshot, 1), "anime/search|hanime|{\"q\":\"b\"}")
+
+
+def encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("cursor", [
+    lambda snapshot_id: "not a cursor",
+    lambda snapshot_id: encode(None),
+    lambda snapshot_id: encode([snapshot_id, "x"]),
+    lambda snapshot_id: encode([snapshot_id, -1]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    store = SnapshotStore(ttl=60)
+    snapshot = store.create("scope", items(1), 1, 1, False, 10)
+    with pytest.raises(InvalidCursorError, match="Malformed"):
+        store.resolve(cursor(snapshot.id), "scope")
+
+
+def test_cursor_expires_after_the_sliding_ttl(clock):
+    now = clock(snapshots_module)
+    store = SnapshotStore(ttl=60)
+    snapshot = store.create("scope", items(1), 1, 1, False, 10)
+    cursor = store.cursor(snapshot, 1)
+
+    now.advance(50)
+    store.resolve(cursor, "scope")  # extends the TTL
+    now.advance(50)
+    store.resolve(cursor, "scope")
+    now.advance(61)
+    with pytest.raises(InvalidCursorError, match="expired"):
+        store.resolve(cursor, "scope")
+
+
+def test_extend_skips_duplicates_and_marks_the_end():
+    store = SnapshotStore(ttl=60)
+    snapshot = store.create("scope", items(1, 2), 1, 2, False, 10)
+
+    store.extend(snapshot, {"results": items(2, 3), "hasNextPage": True, "totalResults": 12})
+    assert [item["url"] for item in snapshot.items] == ["/anime/1", "/anime/2", "/anime/3"]
+    assert snapshot.next_page == 3
+    assert snapshot.total_results == 12
+    assert not snapshot.exhausted
+
+    # A page with nothing new ends the walk even if upstream claims more
+    store.extend(snapshot, {"results": items(3), "hasNextPage": True})
+    assert snapshot.exhausted
+
+
+def test_oldest_snapshots_are_evicted_over_the_byte_cap():
+    store = SnapshotStore(ttl=60, max_bytes=100)
+    first = store.create("scope", [{"url": "x" * 40}], 1, 1, False, 1)
+    store.create("scope", [{"url": "y" * 40}], 1, 1, False, 1)
+    store.create("scope", [{"url": "z" * 40}], 1, 1, False, 1)
+
+    assert store.stats()["evicted"] >= 1
+    assert store.stats()["bytes"] <= 100
+    with pytest.raises(InvalidCursorError):
+        store.resolve(store.cursor(first, 0), "scope")
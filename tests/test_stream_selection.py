@@ -0,0 +1,38 @@
+import pytest
+
+from scraper_utils.stream_selection import normalize_quality, quality_matches, select_streams
+
+STREAMS = [
+    {"url": "a", "quality": "1080p"},
+    {"url": "b", "quality": "720p - Mp4"},
+    {"url": "c", "quality": "720P"},
+    {"url": "d", "quality": "Auto (HLS)"},
+]
+
+
+@pytest.mark.parametrize("quality, expected", [
+    (None, None),
+    ("", None),
+    ("1080", "1080p"),
+    (" 720P ", "720p"),
+    ("HLS", "hls"),
+])
+def test_normalize_quality(quality, expected):
+    assert normalize_quality(quality) == expected
+
+
+def test_resolutions_match_whole_numbers_only():
+    assert quality_matches({"quality": "720p - Mp4"}, "720")
+    assert not quality_matches({"quality": "1720p"}, "720")
+    assert not quality_matches({"quality": "7200"}, "720p")
+    assert quality_matches({"quality": "Auto (HLS)"}, "hls")
+
+
+def test_streams_of_the_requested_quality_are_kept_in_order():
+    assert [s["url"] for s in select_streams(STREAMS, "720")] == ["b", "c"]
+    assert [s["url"] for s in select_streams(STREAMS, "720", max_streams=1)] == ["b"]
+
+
+def test_all_streams_are_kept_when_none_match():
+    assert select_streams(STREAMS, "480") == STREAMS
+    assert [s["url"] for s in select_streams(STREAMS, max_streams=2)] == ["a", "b"]
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from scraper_utils.streaming import NDJSON, SSE, encode_event, iterate_in_thread, stream_format
+
+
+@pytest.mark.parametrize("stream, accept, expected", [
+    (None, None, None),
+    ("ndjson", None, NDJSON),
+    ("SSE", None, SSE),
+    ("1", None, NDJSON),
+    ("true", "text/event-stream", SSE),
+    ("0", "text/event-stream", None),
+    (None, "text/event-stream", SSE),
+    (None, "application/x-ndjson", NDJSON),
+    (None, "application/json", None),
+])
+def test_stream_format(stream, accept, expected):
+    assert stream_format(stream, accept) == expected
+
+
+def test_events_are_encoded_per_format():
+    assert encode_event(NDJSON, "page", {"results": [1]}) == b'{"event":"page","results":[1]}\n'
+    assert encode_event(SSE, "done", {"count": 1}) == b'event: done\ndata: {"count":1}\n\n'
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_blocking_generator_items_arrive_in_order():
+    assert asyncio.run(collect(iterate_in_thread(lambda: iter(range(5))))) == list(range(5))
+
+
+def test_generator_errors_are_raised_after_its_items():
+    def failing():
+        yield 1
+        raise ValueError("hoster down")
+
+    async def scenario():
+        items = []
+        with pytest.raises(ValueError, match="hoster down"):
+            async for item in iterate_in_thread(failing):
+                items.append(item)
+        return items
+
+    assert asyncio.run(scenario()) == [1]
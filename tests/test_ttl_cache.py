@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+from scraper_utils import ttl_cache
+from scraper_utils.ttl_cache import TTLCache
+
+
+def test_stale_value_is_returned_while_one_refresh_runs(clock):
+    now = clock(ttl_cache)
+    cache = TTLCache("test-stale", ttl=10, stale_ttl=100)
+    cache.set("k", 1)
+    now.advance(11)
+
+    refreshed = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        refreshed.set()
+        return 2
+
+    assert cache.get_or_load("k", loader) == 1
+    assert cache.get_or_load("k", loader) == 1
+    release.set()
+    assert refreshed.wait(5)
+    for _ in range(100):
+        if cache.get("k") == 2:
+            break
+        time.sleep(0.01)
+    assert cache.get("k") == 2
+    assert len(loads) == 1
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache("test-misses", ttl=60)
+    started = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"value": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert results == [{"value": 1}] * 8
+
+
+def test_failed_loads_are_not_cached():
+    cache = TTLCache("test-errors", ttl=60)
+
+    def failing():
+        raise ValueError("upstream down")
+
+    try:
+        cache.get_or_load("k", failing)
+    except ValueError:
+        pass
+    assert cache.get_or_load("k", lambda: 1) == 1
+
+
+def test_async_misses_share_one_load():
+    cache = TTLCache("test-async", ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return [1]
+
+    async def run():
+        return await asyncio.gather(*(cache.async_get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == [[1]] * 5
+    assert len(loads) == 1